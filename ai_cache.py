@@ -0,0 +1,195 @@
+"""Content-addressed on-disk cache for AI responses.
+
+Responses are keyed by a SHA-256 of provider, model and prompt, so re-running
+an AI action on unchanged data is answered locally without spending tokens.
+Entries expire after a TTL, and the least recently used ones are evicted once
+the cache grows past its size budget.
+"""
+import hashlib
+import sqlite3
+import time
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+
+def cache_key(provider, model, prompt):
+    digest = hashlib.sha256()
+    for part in (provider, model, prompt):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        provider TEXT NOT NULL,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created REAL NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access);
+    CREATE TABLE IF NOT EXISTS stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, provider, model, prompt):
+        """Return the cached response, or None on a miss or expired entry"""
+        key = cache_key(provider, model, prompt)
+        now = time.time()
+        with self.conn:
+            row = self.conn.execute('SELECT response, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self.conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                self._bump('hits')
+                return row[0]
+            if row:
+                self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self._bump('misses')
+        return None
+
+    def put(self, provider, model, prompt, response):
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (key, provider, model, response, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (cache_key(provider, model, prompt), provider, model, response,
+                 len(response.encode('utf-8')), now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self.conn.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl,))
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+            self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _bump(self, name):
+        self.conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1',
+            (name,)
+        )
+
+    def stats(self):
+        counters = dict(self.conn.execute('SELECT name, value FROM stats'))
+        entries, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'entries': entries,
+            'bytes': size,
+        }
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute('DELETE FROM responses')
+            self.conn.execute('DELETE FROM stats')
+
+
+DEFAULT_VALIDATION_TTL = 24 * 3600
+
+
+def key_fingerprint(provider, api_key):
+    """Identify a credential without storing the key itself"""
+    return hashlib.sha256(f'{provider}\0{api_key}'.encode('utf-8')).hexdigest()[:16]
+
+
+class CredentialCache:
+    """Remembers which provider keys were recently confirmed to work.
+
+    Stored next to the response cache so a validated key does not need a
+    connection test before every AI request.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS credentials (
+        fingerprint TEXT PRIMARY KEY,
+        provider TEXT NOT NULL,
+        validated REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path, ttl=DEFAULT_VALIDATION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def is_valid(self, provider, api_key):
+        row = self.conn.execute(
+            'SELECT validated FROM credentials WHERE fingerprint = ?', (key_fingerprint(provider, api_key),)
+        ).fetchone()
+        return bool(row) and time.time() - row[0] <= self.ttl
+
+    def mark_valid(self, provider, api_key):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO credentials (fingerprint, provider, validated) VALUES (?, ?, ?)',
+                (key_fingerprint(provider, api_key), provider, time.time())
+            )
+
+    def invalidate(self, provider, api_key):
+        with self.conn:
+            self.conn.execute('DELETE FROM credentials WHERE fingerprint = ?', (key_fingerprint(provider, api_key),))
+
+
+class SummaryCache:
+    """Durable store of journal chunk summaries, keyed by a hash of the chunk prompt.
+
+    Unlike responses these never expire: a chunk whose text is unchanged
+    always has the same summary, so whole-history analysis only pays for
+    chunks that are new or were edited.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS summaries (
+        key TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        created REAL NOT NULL
+    );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, key):
+        row = self.conn.execute('SELECT summary FROM summaries WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, summary):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO summaries (key, summary, created) VALUES (?, ?, ?)',
+                (key, summary, time.time())
+            )
@@ -0,0 +1,247 @@
+"""Provider clients that are built once per process and reused.
+
+``get_client`` keeps one client per provider, key and model. The OpenRouter
+client holds a keep-alive ``requests.Session`` so back-to-back calls reuse the
+TLS connection, and the Gemini client holds a configured ``GenerativeModel``.
+Both retry rate limits and server errors with exponential backoff and jitter.
+Token usage reported by the provider and the number of retries are added to
+the caller's open metrics span.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import annotate
+
+# Any OpenAI-compatible endpoint can stand in, e.g. the benchmark stub server
+OPENROUTER_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+POOL_SIZE = 8
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class RetryableError(Exception):
+    def __init__(self, message, retry_after=None, status=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status = status
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, honouring a server-provided Retry-After"""
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def with_retries(call, retries=MAX_RETRIES):
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except RetryableError as e:
+            if attempt == retries:
+                raise
+            annotate(retries=attempt + 1)
+            time.sleep(backoff_delay(attempt, e.retry_after))
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def record_usage(usage):
+    """Add an OpenAI-style usage report to the current metrics span"""
+    if isinstance(usage, dict) and 'prompt_tokens' in usage:
+        annotate(tokens_in=usage.get('prompt_tokens'), tokens_out=usage.get('completion_tokens'))
+
+
+def record_gemini_usage(response):
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None and getattr(usage, 'prompt_token_count', None):
+        annotate(tokens_in=usage.prompt_token_count, tokens_out=getattr(usage, 'candidates_token_count', None))
+
+
+class OpenRouterClient:
+    def __init__(self, api_key, model_name):
+        self.model_name = model_name
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://github.com/ameymalpurkar/Hacker_Diaries",
+            "X-Title": "Hacker Diaries",
+        })
+
+    def _post(self, data, stream=False):
+        response = self.session.post(
+            f"{OPENROUTER_URL}/chat/completions", data=json.dumps(data), timeout=30, stream=stream
+        )
+        if response.status_code in RETRY_STATUSES:
+            raise RetryableError(
+                f"OpenRouter API error (Status {response.status_code}): {response.text}",
+                _retry_after(response), response.status_code
+            )
+        return response
+
+    def _payload(self, prompt, max_tokens, stream=False):
+        data = {
+            "model": self.model_name,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens
+        }
+        if stream:
+            data["stream"] = True
+            # Ask for a final usage event so streamed calls report tokens too
+            data["stream_options"] = {"include_usage": True}
+        return data
+
+    def generate(self, prompt, max_tokens=1500):
+        data = self._payload(prompt, max_tokens)
+        response = with_retries(lambda: self._post(data))
+        if response.status_code != 200:
+            raise Exception(f"OpenRouter API error (Status {response.status_code}): {response.text}")
+        result = response.json()
+        record_usage(result.get('usage'))
+        try:
+            return result['choices'][0]['message']['content']
+        except (KeyError, IndexError):
+            raise Exception(f"Unexpected response structure from OpenRouter: {json.dumps(result)}")
+
+    def stream(self, prompt, max_tokens=1500):
+        """Yield text chunks from the server-sent event stream as they arrive"""
+        data = self._payload(prompt, max_tokens, stream=True)
+        response = with_retries(lambda: self._post(data, stream=True))
+        with response:
+            if response.status_code != 200:
+                raise Exception(f"OpenRouter API error (Status {response.status_code}): {response.text}")
+            # SSE is always UTF-8; decode per line rather than trusting the Content-Type charset
+            for raw in response.iter_lines(chunk_size=None):
+                line = raw.decode('utf-8')
+                # Blank keep-alives and ": OPENROUTER PROCESSING" comments carry no data
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[5:].strip()
+                if payload == '[DONE]':
+                    break
+                event = json.loads(payload)
+                if 'error' in event:
+                    raise Exception(f"OpenRouter stream error: {event['error']}")
+                record_usage(event.get('usage'))
+                try:
+                    text = event['choices'][0]['delta'].get('content')
+                except (KeyError, IndexError):
+                    continue
+                if text:
+                    yield text
+
+    def verify(self):
+        """Check the key without spending tokens; returns (ok, message)"""
+        response = self.session.get(f"{OPENROUTER_URL}/key", timeout=15)
+        if response.status_code == 200:
+            return True, "OpenRouter API key is valid"
+        return False, f"OpenRouter API Error: Status {response.status_code}\n{response.text}"
+
+
+class GeminiClient:
+    def __init__(self, api_key, model_name):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def _call(self, call):
+        try:
+            return call()
+        except Exception as e:
+            # google.api_core exceptions carry the HTTP status as .code
+            if getattr(e, 'code', None) in RETRY_STATUSES:
+                raise RetryableError(str(e), status=e.code) from e
+            raise
+
+    def generate(self, prompt):
+        response = with_retries(lambda: self._call(lambda: self.model.generate_content(prompt)))
+        record_gemini_usage(response)
+        return response.text if hasattr(response, 'text') else str(response)
+
+    def stream(self, prompt):
+        response = with_retries(lambda: self._call(lambda: self.model.generate_content(prompt, stream=True)))
+        for chunk in response:
+            record_gemini_usage(chunk)
+            text = getattr(chunk, 'text', '')
+            if text:
+                yield text
+
+    def verify(self):
+        self.genai.get_model(f"models/{self.model_name}")
+        return True, "Gemini API key is valid"
+
+
+class LocalClient:
+    """Offline provider: answers prompts with the NumPy analysis in local_engine"""
+
+    def __init__(self, api_key, model_name):
+        from local_engine import LocalAnalyzer
+        self.model_name = model_name
+        self.analyzer = LocalAnalyzer()
+
+    def generate(self, prompt):
+        return self.analyzer.generate(prompt)
+
+    def stream(self, prompt):
+        yield self.generate(prompt)
+
+    def verify(self):
+        return True, "Local analysis needs no API key"
+
+
+CLIENTS = {
+    'gemini': GeminiClient,
+    'openrouter': OpenRouterClient,
+    'local': LocalClient,
+}
+
+
+def is_unreachable(error):
+    """True when a request failed because the provider could not be reached at all"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    # Server errors that outlasted the retries mean the provider is down
+    if isinstance(error, RetryableError) and (error.status or 0) >= 500:
+        return True
+    # google.api_core raises these when the Gemini endpoint cannot be reached
+    return type(error).__name__ in ('ServiceUnavailable', 'DeadlineExceeded', 'RetryError')
+
+
+def is_transient(error):
+    """True when a failure says nothing about the API key: rate limits, server errors, no connection"""
+    return isinstance(error, RetryableError) or is_unreachable(error)
+
+
+def get_client(provider, api_key, model_name):
+    """Return the process-wide client for this provider, key and model"""
+    if provider not in CLIENTS:
+        raise Exception(f"Unknown API provider: {provider}")
+    key = (provider, api_key, model_name)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = CLIENTS[provider](api_key, model_name)
+        return client
@@ -0,0 +1,86 @@
+"""Process-level view of config.json.
+
+The parsed config is cached and only re-read when the file's identity
+(inode, size or mtime) changes, so hot paths such as each AI request cost a
+``stat`` instead of an open and a JSON parse. Saves go to a temp file in the
+same directory and are swapped in with ``os.replace``, so a crash mid-write
+leaves the previous config intact. API key environment overrides are read
+once per process.
+"""
+import copy
+import json
+import os
+import threading
+
+ENV_API_KEYS = {
+    'gemini': 'GEMINI_API_KEY',
+    'openrouter': 'OPENROUTER_API_KEY',
+}
+
+
+def _identity(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class ConfigFile:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._identity = None
+        self._config = {}
+        self._loaded = False
+        self._env = None
+
+    def load(self):
+        """Return a deep copy of the config, re-reading the file only if it changed.
+
+        Nested settings such as ``context_budgets`` are copied too, so a caller
+        editing one in place cannot change what other callers see.
+        """
+        identity = _identity(self.path)
+        with self._lock:
+            if not self._loaded or identity != self._identity:
+                self._config = self._read() if identity else {}
+                self._identity = identity
+                self._loaded = True
+            return copy.deepcopy(self._config)
+
+    def _read(self):
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def save(self, config):
+        """Atomically replace the file with ``config``"""
+        import tempfile
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(prefix='.config-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(config, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self._config = copy.deepcopy(config)
+            self._identity = _identity(self.path)
+            self._loaded = True
+
+    def env_api_key(self, provider):
+        """The provider's API key from the environment, read once per process"""
+        if self._env is None:
+            self._env = {name: os.getenv(var) for name, var in ENV_API_KEYS.items()}
+        return self._env.get(provider)
+
+    def api_key(self, config, provider):
+        """Environment override first, then the key saved in config"""
+        if provider not in ENV_API_KEYS:
+            return None
+        return self.env_api_key(provider) or config.get(f'{provider}_api_key')
@@ -0,0 +1,204 @@
+"""Streaming export and import of journal entries and tasks.
+
+Records flow through generator pipelines one at a time, so memory stays flat
+however large the archive is. Archives are JSON Lines or CSV (both escape
+pipes, quotes and newlines properly), optionally gzip-compressed, chosen from
+the file name (``.jsonl``, ``.csv``, plus ``.gz``) or given explicitly.
+
+Imports commit in batches and record their progress in ``<archive>.progress``
+after every batch, so an interrupted import resumes where it stopped instead
+of adding the same records twice.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+
+from journal_store import in_date_range, is_timestamp, until_key
+
+KINDS = ('journal', 'tasks')
+FORMATS = ('jsonl', 'csv')
+FIELDS = {
+    'journal': ('date', 'text'),
+    'tasks': ('id', 'priority', 'description', 'status'),
+}
+BATCH_SIZE = 5000
+
+
+def detect_format(path, fmt=None):
+    """Return ``(format, gzipped)`` for an archive path"""
+    name = path[:-3] if path.endswith('.gz') else path
+    if fmt is None:
+        fmt = 'csv' if name.endswith('.csv') else 'jsonl'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    return fmt, path.endswith('.gz')
+
+
+def _open_text(path, mode, gzipped):
+    if gzipped:
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def export_rows(store, kind, since=None, until=None):
+    """Yield plain dicts for every record of ``kind``, filtered by date for journal entries"""
+    if kind == 'journal':
+        if not store.journal_exists():
+            return
+        entries = store.entries_between(since, until) if since or until else store.iter_entries()
+        for entry in entries:
+            yield {'date': entry.date, 'text': entry.text}
+    else:
+        if not store.tasks_exist():
+            return
+        for task in store.iter_tasks():
+            yield {'id': task.id, 'priority': task.priority, 'description': task.description, 'status': task.status}
+
+
+def write_rows(rows, path, kind, fmt=None, on_progress=None):
+    """Stream rows into an archive; returns the number written"""
+    fmt, gzipped = detect_format(path, fmt)
+    count = 0
+    with _open_text(path, 'w', gzipped) as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=FIELDS[kind])
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            write = lambda row: f.write(json.dumps(row, ensure_ascii=False) + '\n')
+        for row in rows:
+            write(row)
+            count += 1
+            if on_progress and count % BATCH_SIZE == 0:
+                on_progress(count)
+    return count
+
+
+def read_rows(path, kind, fmt=None, position=None):
+    """Yield rows from an archive; ``position(raw_offset)`` is called with compressed bytes read"""
+    fmt, gzipped = detect_format(path, fmt)
+    with open(path, 'rb') as raw:
+        stream = gzip.GzipFile(fileobj=raw) if gzipped else raw
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        if fmt == 'csv':
+            rows = csv.DictReader(text)
+            missing = [field for field in FIELDS[kind] if field != 'id' and field not in (rows.fieldnames or [])]
+            if missing:
+                raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+        else:
+            rows = (json.loads(line) for line in text if line.strip())
+        for row in rows:
+            yield row
+            if position:
+                position(raw.tell())
+
+
+def _progress_path(path):
+    return path + '.progress'
+
+
+def _source_state(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def load_progress(path):
+    """Records already imported from ``path``, or 0 when starting fresh"""
+    try:
+        with open(_progress_path(path), 'r', encoding='utf-8') as f:
+            progress = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    # A changed archive is a different import
+    if progress.get('source') != _source_state(path):
+        return 0
+    return progress.get('records', 0)
+
+
+def save_progress(path, records):
+    tmp = _progress_path(path) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'source': _source_state(path), 'records': records}, f)
+    os.replace(tmp, _progress_path(path))
+
+
+def clear_progress(path):
+    if os.path.exists(_progress_path(path)):
+        os.remove(_progress_path(path))
+
+
+def _commit(store, kind, batch):
+    """Write a batch: entries in one append, tasks grouped by consecutive priority/status"""
+    if kind == 'journal':
+        store.append_entries([(row['date'], row['text']) for row in batch])
+        return
+    group_key = None
+    group = []
+
+    def flush():
+        if group:
+            store.add_tasks(group_key[0], group, status=group_key[1])
+
+    for row in batch:
+        key, value = (row['priority'], row['status']), row['description']
+        if key != group_key:
+            flush()
+            group_key, group = key, []
+        group.append(value)
+    flush()
+
+
+def _validate(kind, row, priorities, statuses):
+    if kind == 'journal':
+        if not row.get('date') or row.get('text') is None:
+            raise ValueError(f"Journal record needs date and text: {row}")
+        if not is_timestamp(row['date']):
+            raise ValueError(f"Journal record date must be YYYY-MM-DD HH:MM: {row}")
+        return {'date': row['date'], 'text': str(row['text'])}
+    priority = str(row.get('priority', '')).lower()
+    status = str(row.get('status') or 'not done').lower().replace('-', ' ')
+    if priority not in priorities or status not in statuses or not row.get('description'):
+        raise ValueError(f"Task record needs description, priority and status: {row}")
+    return {'priority': priority, 'description': str(row['description']), 'status': status}
+
+
+def import_rows(store, kind, path, priorities, statuses, fmt=None, since=None, until=None,
+                resume=True, on_progress=None):
+    """Stream an archive into the store in batches; returns ``(imported, skipped_as_done)``.
+
+    Task IDs in the archive are not reused: imported tasks get fresh IDs. If the
+    process is killed mid-batch, that one batch may be partly written again on resume.
+    """
+    done = load_progress(path) if resume else 0
+    end = until_key(until)
+    seen = 0
+    imported = 0
+    batch = []
+    offset = 0
+
+    def track(raw_offset):
+        nonlocal offset
+        offset = raw_offset
+
+    for row in read_rows(path, kind, fmt, position=track):
+        seen += 1
+        if seen <= done:
+            continue
+        row = _validate(kind, row, priorities, statuses)
+        if kind == 'journal' and not in_date_range(row['date'], since, end):
+            continue
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            _commit(store, kind, batch)
+            imported += len(batch)
+            batch = []
+            save_progress(path, seen)
+            if on_progress:
+                on_progress(offset)
+    if batch:
+        _commit(store, kind, batch)
+        imported += len(batch)
+    clear_progress(path)
+    return imported, done
@@ -0,0 +1,76 @@
+"""Synthetic journal.txt / tasks.txt generator for benchmarks.
+
+Writes files in the flat-file format with realistic-looking text: entries are
+spread over consecutive days (several per day, in time order) and mix mood
+words with topic words, tasks cycle through priorities and statuses and carry
+stable IDs. Output is deterministic for a given seed.
+
+    python benchmarks/datagen.py DIR --entries 1000000 [--tasks 100000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+MOODS = ['happy', 'tired', 'productive', 'stressed', 'calm', 'excited', 'bored', 'grateful',
+         'anxious', 'proud', 'frustrated', 'relaxed', 'okay', 'motivated', 'sad', 'great']
+TOPICS = ['refactored the parser', 'went for a run', 'read about distributed systems', 'fixed a flaky test',
+          'called my parents', 'cooked dinner', 'reviewed pull requests', 'studied for the exam',
+          'debugged the deploy script', 'played chess', 'cleaned the apartment', 'wrote a blog post',
+          'paired on the search index', 'meditated for ten minutes', 'learned some Rust', 'planned the sprint']
+VERBS = ['Write', 'Fix', 'Review', 'Email', 'Plan', 'Refactor', 'Test', 'Document', 'Call', 'Buy']
+OBJECTS = ['report', 'login bug', 'PR #42', 'the landlord', 'next sprint', 'storage layer', 'CLI parser',
+           'README', 'dentist', 'groceries', 'benchmark suite', 'release notes']
+PRIORITIES = ('high', 'medium', 'low')
+START = datetime(2020, 1, 1, 8, 0)
+ENTRIES_PER_DAY = 6
+WRITE_BUFFER = 1 << 20
+
+
+def journal_lines(count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        day, slot = divmod(i, ENTRIES_PER_DAY)
+        when = START + timedelta(days=day, minutes=slot * 131)
+        text = f"Felt {rng.choice(MOODS)} today, {rng.choice(TOPICS)} and {rng.choice(TOPICS)}"
+        yield f"{when:%Y-%m-%d %H:%M}|{text}\n"
+
+
+def task_lines(count, seed=7):
+    rng = random.Random(seed + 1)
+    for task_id in range(1, count + 1):
+        status = 'done' if rng.random() < 0.4 else 'not done'
+        yield f"{rng.choice(PRIORITIES)}|{rng.choice(VERBS)} {rng.choice(OBJECTS)} #{task_id}|{status}|{task_id}\n"
+
+
+def write_lines(path, lines):
+    with open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as f:
+        f.writelines(lines)
+
+
+def generate(directory, entries, tasks, seed=7):
+    """Write journal.txt and tasks.txt into ``directory``; returns their paths"""
+    os.makedirs(directory, exist_ok=True)
+    journal = os.path.join(directory, 'journal.txt')
+    task_file = os.path.join(directory, 'tasks.txt')
+    write_lines(journal, journal_lines(entries, seed))
+    write_lines(task_file, task_lines(tasks, seed))
+    return journal, task_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('directory')
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--tasks', type=int, help='Default: a tenth of --entries')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    tasks = args.tasks if args.tasks is not None else max(1, args.entries // 10)
+    for path in generate(args.directory, args.entries, tasks, args.seed):
+        print(f"{path}: {os.path.getsize(path):,} bytes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
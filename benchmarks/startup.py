@@ -0,0 +1,117 @@
+"""Startup benchmark for journal_cli.py.
+
+Measures the import time of journal_cli (with a per-module breakdown) and the
+wall-clock time of a non-AI batch command (`secret show --json`) in a scratch
+directory, then checks both against startup_budget.json. Exits non-zero when
+startup has regressed past the budget or when a module that should load
+lazily was imported by the non-AI command.
+
+    python benchmarks/startup.py [--runs 7] [--budget benchmarks/startup_budget.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = os.path.join(ROOT, 'benchmarks', 'startup_budget.json')
+COMMAND = ['secret', 'show', '--limit', '20', '--json']
+
+
+def make_workdir():
+    workdir = tempfile.mkdtemp(prefix='journal-startup-')
+    with open(os.path.join(workdir, 'journal.txt'), 'w', encoding='utf-8') as f:
+        for i in range(200):
+            f.write(f"2026-01-{i % 28 + 1:02d} 09:{i % 60:02d}|Benchmark entry number {i}\n")
+    with open(os.path.join(workdir, 'tasks.txt'), 'w', encoding='utf-8') as f:
+        for i in range(50):
+            f.write(f"medium|Benchmark task {i}|not done|{i + 1}\n")
+    return workdir
+
+
+def parse_importtime(stderr):
+    """Return [(depth, module, cumulative_us)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((depth, name.strip(), int(cumulative)))
+    return rows
+
+
+def import_breakdown(workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import journal_cli'],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    rows = parse_importtime(result.stderr)
+    total = next(us for depth, name, us in rows if name == 'journal_cli')
+    # Direct imports of journal_cli are printed (before it) one level deeper
+    children = []
+    for index, (depth, name, us) in enumerate(rows):
+        if name == 'journal_cli':
+            for child_depth, child, child_us in reversed(rows[:index]):
+                if child_depth == depth:
+                    break
+                if child_depth == depth + 1:
+                    children.append((child, child_us))
+            break
+    return total / 1000, sorted(children, key=lambda item: -item[1])
+
+
+def run_command(workdir, args):
+    """Run journal_cli.py with args; returns (seconds, modules imported)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(ROOT, 'journal_cli.py')] + args,
+        cwd=workdir, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"journal_cli.py {' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    return elapsed, {name for _, name, _ in parse_importtime(result.stderr)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget', default=DEFAULT_BUDGET)
+    args = parser.parse_args()
+
+    with open(args.budget, 'r', encoding='utf-8') as f:
+        budget = json.load(f)
+    workdir = make_workdir()
+
+    import_runs = [import_breakdown(workdir) for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in import_runs)
+    command_runs = [run_command(workdir, COMMAND) for _ in range(args.runs)]
+    command_ms = statistics.median(seconds for seconds, _ in command_runs) * 1000
+    loaded = set().union(*(modules for _, modules in command_runs))
+
+    print(f"import journal_cli: {import_ms:.1f} ms (budget {budget['import_ms']} ms)")
+    for name, us in import_runs[-1][1][:10]:
+        print(f"  {name:<28} {us / 1000:7.1f} ms")
+    print(f"secret show --json: {command_ms:.1f} ms (budget {budget['command_ms']} ms)")
+
+    failures = []
+    if import_ms > budget['import_ms']:
+        failures.append(f"import time {import_ms:.1f} ms exceeds {budget['import_ms']} ms")
+    if command_ms > budget['command_ms']:
+        failures.append(f"secret show --json {command_ms:.1f} ms exceeds {budget['command_ms']} ms")
+    eager = sorted(name for name in budget['lazy_modules'] if name in loaded)
+    if eager:
+        failures.append(f"imported by a non-AI command but should load lazily: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Multi-process write stress test for the flat-file store.
+
+Starts N writer processes, each with several threads, against one scratch
+journal.txt/tasks.txt. Every thread appends uniquely tagged entries one at a
+time (so appends race and get group-committed), then deletes every fourth of
+its entries while compacting the journal now and then, so deletes race with
+compactions in other processes that move every line. A delete rejected as
+stale is retried after listing the entries again. Each thread then adds
+tasks, marks some done and deletes others, which exercises the task mutation
+log and background compaction under contention. Afterwards every entry and
+task is checked: exactly the targeted entries removed, nothing else lost,
+nothing duplicated, no torn lines, unique task IDs and every edit applied.
+Exits non-zero on any lost or corrupted write.
+
+    python benchmarks/stress_writes.py [--processes 8] [--threads 4] [--entries 250] [--tasks 40]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from journal_store import FlatFileStore, _group_commit_for, parse_entry_line  # noqa: E402
+
+COMPACT_EVERY = 25
+
+
+def deleted_entry(i):
+    return i % 4 == 3
+
+
+def writer(workdir, process, threads, entries, tasks, start, results):
+    os.chdir(workdir)
+    store = FlatFileStore('journal.txt', 'tasks.txt', compact_threshold=0.1, compact_min_garbage=0)
+    start.wait()
+
+    def run(thread):
+        tag = f'p{process}t{thread}'
+        for i in range(entries):
+            store.add_entries('2026-01-01 09:00', [f'{tag}e{i}'])
+        pending = {f'{tag}e{i}' for i in range(entries) if deleted_entry(i)}
+        while pending:
+            listed = [entry for entry in store.iter_entries() if entry.text in pending]
+            for n, entry in enumerate(listed, 1):
+                removed = store.delete_entries([entry])
+                if removed:
+                    pending.discard(entry.text)
+                else:
+                    stale[0] += 1
+                if n % COMPACT_EVERY == 0:
+                    store.compact('entry')
+        store.add_tasks('medium', [f'{tag}k{i}' for i in range(tasks)])
+        mine = {task.description: task.id for task in store.iter_tasks() if task.description.startswith(tag + 'k')}
+        for i in range(tasks):
+            task_id = mine[f'{tag}k{i}']
+            if i % 3 == 0:
+                store.update_tasks({task_id: {'status': 'done', 'priority': 'high'}})
+            elif i % 3 == 1:
+                store.delete_tasks([task_id])
+
+    stale = [0]
+    began = time.perf_counter()
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    commit = _group_commit_for('journal.txt')
+    results.put({'seconds': time.perf_counter() - began, 'appends': commit.appends, 'commits': commit.commits,
+                 'stale_deletes': stale[0]})
+
+
+def check(workdir, processes, threads, entries, tasks):
+    """Return a list of problems found in the final files"""
+    problems = []
+    expected = {f'p{p}t{t}e{i}' for p in range(processes) for t in range(threads) for i in range(entries)
+                if not deleted_entry(i)}
+    targeted = {f'p{p}t{t}e{i}' for p in range(processes) for t in range(threads) for i in range(entries)
+                if deleted_entry(i)}
+    seen = {}
+    with open(os.path.join(workdir, 'journal.txt'), 'r', encoding='utf-8') as f:
+        for line in f:
+            parsed = parse_entry_line(line)
+            if parsed and parsed[1] in targeted:
+                continue  # Checked through the store below, since tombstones may not be compacted yet
+            if not line.endswith('\n') or not parsed or parsed[1] not in expected:
+                problems.append(f'torn or unexpected journal line: {line!r}')
+                continue
+            seen[parsed[1]] = seen.get(parsed[1], 0) + 1
+    lost = expected - set(seen)
+    duplicated = [text for text, count in seen.items() if count > 1]
+    if lost:
+        problems.append(f'{len(lost)} journal entries lost, e.g. {sorted(lost)[:3]}')
+    if duplicated:
+        problems.append(f'{len(duplicated)} journal entries duplicated, e.g. {duplicated[:3]}')
+
+    store = FlatFileStore(os.path.join(workdir, 'journal.txt'), os.path.join(workdir, 'tasks.txt'))
+    live = {}
+    for entry in store.iter_entries():
+        live[entry.text] = live.get(entry.text, 0) + 1
+    survivors = [text for text in targeted if text in live]
+    if survivors:
+        problems.append(f'{len(survivors)} deleted journal entries still visible, e.g. {sorted(survivors)[:3]}')
+    wrongly_deleted = [text for text in expected if text in seen and text not in live]
+    if wrongly_deleted:
+        problems.append(f'{len(wrongly_deleted)} journal entries deleted without being targeted, e.g. {sorted(wrongly_deleted)[:3]}')
+    found = list(store.iter_tasks())
+    if len({task.id for task in found}) != len(found):
+        problems.append('duplicate task IDs')
+    by_description = {task.description: task for task in found}
+    for p in range(processes):
+        for t in range(threads):
+            for i in range(tasks):
+                description = f'p{p}t{t}k{i}'
+                task = by_description.get(description)
+                if i % 3 == 1:
+                    if task:
+                        problems.append(f'deleted task came back: {description}')
+                elif task is None:
+                    problems.append(f'task lost: {description}')
+                elif i % 3 == 0 and (task.status, task.priority) != ('done', 'high'):
+                    problems.append(f'update lost: {description} is {task.status}/{task.priority}')
+                elif i % 3 == 2 and (task.status, task.priority) != ('not done', 'medium'):
+                    problems.append(f'stray update: {description} is {task.status}/{task.priority}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--entries', type=int, default=250, help='Entries appended per thread')
+    parser.add_argument('--tasks', type=int, default=40, help='Tasks added per thread')
+    parser.add_argument('--json', action='store_true', help='Print the result as one JSON object')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='journal-stress-')
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=writer, args=(workdir, p, args.threads, args.entries, args.tasks, start, results))
+        for p in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    began = time.perf_counter()
+    start.set()
+    stats = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+    failed = [worker.exitcode for worker in workers if worker.exitcode != 0]
+
+    problems = check(workdir, args.processes, args.threads, args.entries, args.tasks)
+    if failed:
+        problems.insert(0, f'{len(failed)} writer process(es) crashed')
+    appends = sum(s['appends'] for s in stats)
+    commits = sum(s['commits'] for s in stats)
+    stale = sum(s['stale_deletes'] for s in stats)
+    result = {
+        'processes': args.processes,
+        'threads': args.threads,
+        'entries': appends,
+        'seconds': round(elapsed, 3),
+        'entries_per_second': round(appends / elapsed, 1),
+        'fsyncs': commits,
+        'entries_per_fsync': round(appends / max(commits, 1), 2),
+        'stale_deletes_rejected': stale,
+        'problems': problems,
+        'workdir': workdir,
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{args.processes} processes x {args.threads} threads: {appends} entries in {elapsed:.2f}s "
+              f"({result['entries_per_second']:.0f}/s), {commits} fsyncs ({result['entries_per_fsync']} entries each), "
+              f"{stale} stale deletes rejected and retried")
+        for problem in problems[:20]:
+            print(f"FAIL: {problem}")
+        if not problems:
+            print("OK: no lost, duplicated or torn writes")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
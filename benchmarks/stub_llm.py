@@ -0,0 +1,120 @@
+"""Local OpenAI-compatible chat completions server for benchmarks.
+
+Answers ``POST .../chat/completions`` with a canned reply after a configurable
+delay, either as one JSON body or as a server-sent event stream with a delay
+between chunks, and ``GET .../key`` so credential checks pass. Point the
+OpenRouter provider at it with ``OPENROUTER_BASE_URL=http://127.0.0.1:PORT/v1``.
+
+    python benchmarks/stub_llm.py [--port 8765] [--latency 0.2] [--chunk-delay 0.02] [--chunks 20]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY_WORDS = ("Your recent entries show steady progress with a few stressful days. "
+               "Consider scheduling breaks and finishing the high priority tasks first. ").split()
+
+
+class StubSettings:
+    def __init__(self, latency=0.2, chunk_delay=0.02, chunks=20):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunks = chunks
+        self.requests = 0
+        self.prompt_chars = 0
+        self.lock = threading.Lock()
+
+    def reply_chunks(self):
+        return [REPLY_WORDS[i % len(REPLY_WORDS)] + ' ' for i in range(self.chunks)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    settings = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.endswith('/key'):
+            self._send_json(200, {'data': {'label': 'stub', 'usage': 0, 'limit': None}})
+        else:
+            self._send_json(404, {'error': {'message': f'unknown path {self.path}'}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f'unknown path {self.path}'}})
+            return
+        settings = self.settings
+        prompt = ''.join(message.get('content', '') for message in body.get('messages', []))
+        with settings.lock:
+            settings.requests += 1
+            settings.prompt_chars += len(prompt)
+        time.sleep(settings.latency)
+        chunks = settings.reply_chunks()
+        usage = {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(chunks)}
+        if not body.get('stream'):
+            self._send_json(200, {
+                'id': 'stub', 'object': 'chat.completion', 'model': body.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(chunks)},
+                             'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(settings.chunk_delay)
+            event = {'choices': [{'index': 0, 'delta': {'content': text}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        if body.get('stream_options', {}).get('include_usage'):
+            self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start_stub(latency=0.2, chunk_delay=0.02, chunks=20, port=0):
+    """Serve in a background thread; returns ``(server, base_url, settings)``"""
+    settings = StubSettings(latency, chunk_delay, chunks)
+    handler = type('BoundStubHandler', (StubHandler,), {'settings': settings})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='stub-llm', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1", settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds before the first byte')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='Seconds between streamed chunks')
+    parser.add_argument('--chunks', type=int, default=20, help='Chunks (words) per reply')
+    args = parser.parse_args()
+    server, url, _ = start_stub(args.latency, args.chunk_delay, args.chunks, args.port)
+    print(f"Stub LLM listening on {url} (OPENROUTER_BASE_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
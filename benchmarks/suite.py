@@ -0,0 +1,357 @@
+"""Benchmark suite for journal_cli.py.
+
+For each size, generates a synthetic journal.txt (SIZE lines) and tasks.txt
+(SIZE / --task-ratio lines) in a scratch directory and times the work behind
+show, delete, mark-done and prioritise, every AI prompt builder, the
+vector index used to pick relevant context and the stats dashboard. AI
+requests go to a local OpenAI-compatible stub server (see stub_llm.py) with
+configurable latency and streaming, so no network or API key is needed.
+Results are written as JSON; ``--compare`` checks them against an earlier
+run and exits non-zero on regressions.
+
+    python benchmarks/suite.py [--sizes 1k,10k,100k] [--runs 5] [--output FILE] [--compare OLD.json]
+    python benchmarks/suite.py --sizes 1M,10M --runs 3 --max-seconds 60
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from datagen import generate  # noqa: E402
+from stub_llm import start_stub  # noqa: E402
+
+SUFFIXES = {'k': 1000, 'm': 1000000}
+MOOD_DAYS = 30
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1:] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def measure(fn, runs, max_seconds):
+    """Call fn up to ``runs`` times (at least once, stopping early past max_seconds)"""
+    times = []
+    extra = None
+    budget_start = time.perf_counter()
+    for _ in range(runs):
+        start = time.perf_counter()
+        extra = fn()
+        times.append(time.perf_counter() - start)
+        if time.perf_counter() - budget_start > max_seconds:
+            break
+    result = {
+        'runs': len(times),
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'max_s': max(times),
+    }
+    if isinstance(extra, dict):
+        result.update(extra)
+    return result
+
+
+def middle_date(store):
+    first = datetime.strptime(store.entries_from(None, 1)[0].date[:10], '%Y-%m-%d')
+    last = datetime.strptime(store.last_entries(1)[0].date[:10], '%Y-%m-%d')
+    return (first + (last - first) / 2).strftime('%Y-%m-%d')
+
+
+def store_benchmarks(cli, store):
+    """(name, fn) pairs for the storage work behind each interactive command"""
+    import journal_store
+
+    middle = middle_date(store)
+    week_end = (datetime.strptime(middle, '%Y-%m-%d') + timedelta(days=6)).strftime('%Y-%m-%d')
+    state = {'task': 0}
+
+    def next_task_id():
+        tasks = store.tasks_from(state['task'] + 1, 1)
+        if not tasks:
+            state['task'] = 0
+            tasks = store.tasks_from(1, 1)
+        state['task'] = tasks[0].id
+        return tasks[0].id
+
+    def cold_task_index():
+        journal_store._task_indexes.clear()
+        return {'tasks': sum(1 for _ in store.iter_tasks())}
+
+    def delete_one():
+        entry = store.entries_from(store.entry_position_for_date(middle), 1)
+        if entry:
+            store.delete_entries(entry)
+
+    return [
+        ('show.last_page', lambda: store.last_entries(cli.PAGE_SIZE)),
+        ('show.jump_to_date', lambda: store.entries_from(store.entry_position_for_date(middle), cli.PAGE_SIZE)),
+        ('show.date_range', lambda: {'entries': sum(1 for _ in store.entries_between(middle, week_end))}),
+        ('tasks.index_cold', cold_task_index),
+        ('delete.list_entries', lambda: {'entries': sum(1 for _ in store.iter_entries())}),
+        ('delete.apply', delete_one),
+        ('mark_done.list', lambda: {'tasks': len(list(store.iter_tasks(status='not done')))}),
+        ('mark_done.apply', lambda: store.update_tasks({next_task_id(): {'status': 'done'}})),
+        ('prioritise.list', lambda: {'tasks': len(list(store.iter_tasks()))}),
+        ('prioritise.apply', lambda: store.update_tasks({next_task_id(): {'priority': 'high'}})),
+    ]
+
+
+def prompt_benchmarks(cli, store):
+    """(name, fn) pairs building each AI prompt from the store, packed as the AI commands pack them"""
+    from context_packer import estimate_tokens, feature_budget, pack_entries, pack_tasks, truncate
+    from mood_series import journal_day_digests, journal_day_texts
+
+    config = cli.load_config()
+
+    def sized(prompt, packed=None):
+        result = {'prompt_chars': len(prompt)}
+        if packed is not None:
+            result.update(records=len(packed.records), tokens=packed.tokens)
+        return result
+
+    def task_analysis():
+        packed = pack_tasks(store, config, 'task-analysis')
+        return sized(cli.task_analysis_prompt(packed.records), packed)
+
+    def task_suggestions():
+        packed = pack_tasks(store, config, 'task-suggestions', cli.relevant_tasks_for(store, 'ship the release'))
+        return sized(cli.task_suggestions_prompt(packed.records, 'ship the release'), packed)
+
+    def journal_analysis():
+        packed = pack_entries(store, config, 'journal-analysis')
+        return sized(cli.journal_analysis_prompt(packed.records), packed)
+
+    def journal_mood():
+        packed = pack_entries(store, config, 'journal-mood')
+        return sized(cli.journal_mood_prompt(packed.records), packed)
+
+    def journal_suggestions():
+        packed = pack_entries(store, config, 'journal-suggestions', cli.relevant_entries(store, 'studied for the exam'))
+        return sized(cli.journal_suggestions_prompt(packed.records, 'studied for the exam'), packed)
+
+    def mood_days():
+        budget = feature_budget(config, 'mood-scores')
+        days = list(journal_day_digests(store, cli.MOOD_DIGESTS_FILE))[-MOOD_DAYS:]
+        texts = {day: truncate(text, budget) for day, text in journal_day_texts(store, days).items()}
+        result = sized(cli.mood_score_prompt(texts))
+        result['tokens'] = sum(estimate_tokens(text) for text in texts.values())
+        return result
+
+    def history_chunks():
+        prompts = [cli.chunk_summary_prompt(label, text) for label, text in cli.journal_chunks(store)]
+        return {'chunks': len(prompts), 'prompt_chars': sum(len(p) for p in prompts)}
+
+    return [
+        ('prompt.task_analysis', task_analysis),
+        ('prompt.task_suggestions', task_suggestions),
+        ('prompt.journal_analysis', journal_analysis),
+        ('prompt.journal_mood', journal_mood),
+        ('prompt.journal_suggestions', journal_suggestions),
+        ('prompt.mood_days', mood_days),
+        ('prompt.history_chunks', history_chunks),
+    ]
+
+
+def retrieval_benchmarks(cli, store):
+    """(name, fn) pairs for the vector index behind focus-relevant AI context"""
+    def build():
+        for suffix in ('.i8', '.ids', '.json'):
+            if os.path.exists(cli.VECTOR_INDEX_FILE + suffix):
+                os.remove(cli.VECTOR_INDEX_FILE + suffix)
+        index = cli.open_vector_index(store)
+        index.close()
+        return {'vectors': index.count}
+
+    return [
+        ('retrieve.index_build', build),
+        ('retrieve.top_k', lambda: {'hits': len(cli.relevant_entries(store, 'studied for the exam') or [])}),
+        ('retrieve.tasks', lambda: {'hits': len(cli.relevant_tasks_for(store, 'ship the release') or [])}),
+    ]
+
+
+def stats_benchmarks(cli, store):
+    """(name, fn) pairs for the stats dashboard: first build, then the incremental path"""
+    def build():
+        for suffix in ('.json', '.days', '.created', '.done'):
+            if os.path.exists(cli.STATS_FILE + suffix):
+                os.remove(cli.STATS_FILE + suffix)
+        cli.refresh_stats(store)
+
+    def add_and_refresh():
+        store.add_entries(datetime.now().strftime('%Y-%m-%d %H:%M'), ['benchmark entry'])
+        cli.refresh_stats(store)
+
+    return [
+        ('stats.build', build),
+        ('stats.add_entry', add_and_refresh),
+        ('stats.dashboard', lambda: {'entries': cli.compute_stats(store)['entries']}),
+    ]
+
+
+def ai_benchmarks(cli, store):
+    """(name, fn) pairs for requests against the stub server"""
+    from context_packer import pack_entries
+
+    config = cli.load_config()
+    prompt = cli.journal_analysis_prompt(pack_entries(store, config, 'journal-analysis').records)
+
+    def stream():
+        start = time.perf_counter()
+        first = None
+        for _ in cli.stream_ai_content(prompt, use_cache=False):
+            if first is None:
+                first = time.perf_counter() - start
+        return {'first_token_s': first}
+
+    def concurrent_all():
+        from concurrent.futures import ThreadPoolExecutor
+        prompts = [prompt, cli.journal_mood_prompt(pack_entries(store, config, 'journal-mood').records),
+                   cli.journal_suggestions_prompt(pack_entries(store, config, 'journal-suggestions').records, 'focus')]
+        with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+            list(executor.map(lambda p: cli.generate_ai_content(p, use_cache=False), prompts))
+
+    cli.generate_ai_content(prompt)  # warm the cache for cache_hit
+    return [
+        ('ai.generate', lambda: cli.generate_ai_content(prompt, use_cache=False)),
+        ('ai.stream', stream),
+        ('ai.cache_hit', lambda: cli.generate_ai_content(prompt)),
+        ('ai.all_concurrent', concurrent_all),
+    ]
+
+
+def cli_show(workdir):
+    subprocess.run([sys.executable, os.path.join(ROOT, 'journal_cli.py'), 'secret', 'show', '--limit', '20', '--json'],
+                   cwd=workdir, capture_output=True, check=True)
+
+
+def run_size(size, args):
+    workdir = tempfile.mkdtemp(prefix=f'journal-bench-{size}-')
+    tasks = max(1, size // args.task_ratio)
+    start = time.perf_counter()
+    generate(workdir, size, tasks)
+    generated = time.perf_counter() - start
+    with open(os.path.join(workdir, 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump({'api_provider': 'openrouter', 'openrouter_api_key': 'bench',
+                   'openrouter_model': 'stub/bench', 'local_fallback': False}, f)
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import journal_cli as cli
+        from rich.console import Console
+        # The suite reports through JSON; keep the app's own messages out of the way
+        cli.console._console = Console(quiet=True)
+        store = cli.get_store()
+        groups = (store_benchmarks(cli, store) + prompt_benchmarks(cli, store) + retrieval_benchmarks(cli, store)
+                  + stats_benchmarks(cli, store))
+        if not args.no_ai:
+            groups += ai_benchmarks(cli, store)
+        groups.append(('show.cli', lambda: cli_show(workdir)))
+        results = []
+        for name, fn in groups:
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            record = {'name': name, 'size': size, 'tasks': tasks}
+            record.update(measure(fn, args.runs, args.max_seconds))
+            results.append(record)
+            print(f"  {name:<28} {record['median_s'] * 1000:10.2f} ms  ({record['runs']} runs)", file=sys.stderr)
+        store.close()
+        return generated, results
+    finally:
+        os.chdir(previous)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results, baseline_path, threshold):
+    """Return regressions: results slower than the baseline by more than threshold x"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['name'], r['size']): r for r in json.load(f)['results']}
+    regressions = []
+    for record in results:
+        old = baseline.get((record['name'], record['size']))
+        if not old or old['median_s'] <= 0:
+            continue
+        ratio = record['median_s'] / old['median_s']
+        # Sub-millisecond timings are too noisy to call a regression
+        if ratio > threshold and record['median_s'] - old['median_s'] > 0.001:
+            regressions.append({'name': record['name'], 'size': record['size'], 'ratio': round(ratio, 2),
+                                'old_s': old['median_s'], 'new_s': record['median_s']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1k,10k,100k', help='Journal lines per run, e.g. 1k,10k,1M,10M')
+    parser.add_argument('--task-ratio', type=int, default=10, help='One task per this many journal lines')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='Stop repeating a benchmark after this long')
+    parser.add_argument('--only', action='append', help='Only benchmarks whose name starts with this (repeatable)')
+    parser.add_argument('--no-ai', action='store_true', help='Skip the requests against the stub server')
+    parser.add_argument('--latency', type=float, default=0.2, help='Stub seconds before the first byte')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='Stub seconds between streamed chunks')
+    parser.add_argument('--chunks', type=int, default=20, help='Stub chunks per reply')
+    parser.add_argument('--output', help='Results file (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Slowdown ratio reported as a regression')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated data directories')
+    args = parser.parse_args()
+
+    server, url, stub = start_stub(args.latency, args.chunk_delay, args.chunks)
+    # Read by ai_clients when it is first imported
+    os.environ['OPENROUTER_BASE_URL'] = url
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'stub': {'latency': args.latency, 'chunk_delay': args.chunk_delay, 'chunks': args.chunks},
+            'generate_s': {},
+        },
+        'results': [],
+    }
+    try:
+        for size in [parse_size(s) for s in args.sizes.split(',')]:
+            print(f"size {size:,}", file=sys.stderr)
+            generated, results = run_size(size, args)
+            report['meta']['generate_s'][str(size)] = round(generated, 3)
+            report['results'].extend(results)
+    finally:
+        server.shutdown()
+    report['meta']['stub']['requests'] = stub.requests
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    regressions = compare(report['results'], args.compare, args.threshold) if args.compare else []
+    report['regressions'] = regressions
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+    for regression in regressions:
+        print(f"REGRESSION: {regression['name']} @ {regression['size']:,}: {regression['ratio']}x slower", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""Token-budgeted context for AI prompts.
+
+Instead of a fixed number of entries or tasks, each AI feature gets a token
+budget. Records are taken newest (or most relevant) first until the budget is
+full; a record longer than the per-record cap is cut short rather than
+crowding out everything else. Token counts are estimated at about four
+characters per token, which is close enough for English text to keep request
+sizes, and with them latency and cost, predictable per feature.
+"""
+from collections import deque, namedtuple
+from itertools import islice
+
+from journal_store import PRIORITIES
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARK = ' …[truncated]'
+PAGE = 50
+
+# Tokens of records per feature; override any of them with "context_budgets" in config.json
+DEFAULT_BUDGETS = {
+    'journal-analysis': 1200,
+    'journal-mood': 600,
+    'journal-suggestions': 300,
+    'task-analysis': 1500,
+    'task-suggestions': 800,
+    'mood-scores': 4000,
+}
+DEFAULT_RECORD_TOKENS = 300
+
+Packed = namedtuple('Packed', 'records tokens budget truncated omitted')
+
+
+def estimate_tokens(text):
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def truncate(text, max_tokens):
+    """Cut ``text`` to roughly ``max_tokens`` tokens, marking the cut"""
+    limit = max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARK)
+    if len(text) <= max_tokens * CHARS_PER_TOKEN:
+        return text
+    cut = text[:max(limit, 0)]
+    # Prefer to end on a word boundary
+    space = cut.rfind(' ')
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+def pack(records, budget, render, shorten, max_record_tokens=DEFAULT_RECORD_TOKENS):
+    """Take records in priority order until ``budget`` tokens are used.
+
+    ``render(record)`` is the record's text as it appears in the prompt and
+    ``shorten(record, max_tokens)`` returns a truncated copy. Packing stops at
+    the first record that no longer fits, so a newest-first stream yields an
+    unbroken recent window. Returns ``Packed`` with the records in the order
+    taken; ``omitted`` is True when records were left out.
+    """
+    taken = []
+    used = 0
+    truncated = 0
+    for record in records:
+        cost = estimate_tokens(render(record))
+        limit = max_record_tokens
+        if used + min(cost, limit) > budget:
+            if taken:
+                return Packed(taken, used, budget, truncated, True)
+            # A single record larger than the whole budget is cut to fit
+            limit = budget
+        if cost > limit:
+            record = shorten(record, limit)
+            cost = estimate_tokens(render(record))
+            truncated += 1
+        taken.append(record)
+        used += cost
+    return Packed(taken, used, budget, truncated, False)
+
+
+def budget_batches(items, budget, cost, max_items):
+    """Group items into consecutive batches of at most ``max_items`` and about ``budget`` tokens"""
+    batch, used = [], 0
+    for item in items:
+        tokens = cost(item)
+        if batch and (used + tokens > budget or len(batch) >= max_items):
+            yield batch
+            batch, used = [], 0
+        batch.append(item)
+        used += tokens
+    if batch:
+        yield batch
+
+
+def newest_entries(store):
+    """Yield journal entries newest first, reading backwards a page at a time"""
+    if not store.journal_exists():
+        return
+    position = None
+    while True:
+        page = store.entries_before(position, PAGE)
+        if not page:
+            return
+        yield from reversed(page)
+        if len(page) < PAGE:
+            return
+        position = store.position_of(page[0])
+
+
+def range_entries(store, since, until, limit):
+    """Yield entries dated in the range newest first, holding at most ``limit`` of them"""
+    return reversed(deque(store.entries_between(since, until), maxlen=limit))
+
+
+def recent_entries(store, limit, since=None, until=None):
+    """The newest ``limit`` entries (dated in the range, if given) as a list, newest first.
+
+    Read once, it can be packed into several budgets of at most ``limit`` tokens.
+    """
+    if since or until:
+        return list(range_entries(store, since, until, limit))
+    return list(islice(newest_entries(store), limit))
+
+
+def relevant_tasks(store):
+    """Yield tasks most relevant first: open tasks by priority, then done ones, newest first within each"""
+    if not store.tasks_exist():
+        return
+    for status in ('not done', 'done'):
+        for priority in PRIORITIES:
+            position = None
+            while True:
+                page = store.tasks_before(position, PAGE, status, priority)
+                yield from reversed(page)
+                if len(page) < PAGE:
+                    break
+                position = store.position_of(page[0])
+
+
+def entry_line(entry):
+    return f"[{entry.date}] {entry.text}\n"
+
+
+def shorten_entry(entry, max_tokens):
+    overhead = estimate_tokens(entry_line(entry._replace(text='')))
+    return entry._replace(text=truncate(entry.text, max(max_tokens - overhead, 1)))
+
+
+def task_line(task):
+    return f"[{task.priority.upper()}] {task.description} - {task.status}\n"
+
+
+def shorten_task(task, max_tokens):
+    overhead = estimate_tokens(task_line(task._replace(description='')))
+    return task._replace(description=truncate(task.description, max(max_tokens - overhead, 1)))
+
+
+def feature_budget(config, feature):
+    return int(config.get('context_budgets', {}).get(feature, DEFAULT_BUDGETS[feature]))
+
+
+def record_tokens(config):
+    return int(config.get('context_record_tokens', DEFAULT_RECORD_TOKENS))
+
+
+def ranked_first(ranked, rest):
+    """Yield ``ranked`` records, then those from ``rest`` not already yielded"""
+    seen = set()
+    for record in ranked:
+        seen.add(record.id)
+        yield record
+    for record in rest:
+        if record.id not in seen:
+            yield record
+
+
+def pack_entries(store, config, feature, ranked=None, since=None, until=None, newest=None):
+    """Recent entries for ``feature``, oldest first as the prompts expect.
+
+    ``ranked`` entries (best match first) are taken before the newest ones.
+    With ``since``/``until`` only entries dated in that range are used.
+    ``newest`` is a list from ``recent_entries`` to pack instead of reading
+    the store again.
+    """
+    budget = feature_budget(config, feature)
+    if newest is None and (since or until):
+        # Every record costs at least one token, so no more than ``budget`` can fit
+        newest = range_entries(store, since, until, budget)
+    elif newest is None:
+        newest = newest_entries(store)
+    records = newest if ranked is None else ranked_first(ranked, newest)
+    packed = pack(records, budget, entry_line, shorten_entry, record_tokens(config))
+    if ranked is None:
+        return packed._replace(records=packed.records[::-1])
+    return packed._replace(records=sorted(packed.records, key=lambda entry: (entry.date, entry.id)))
+
+
+def pack_tasks(store, config, feature, ranked=None):
+    """Most relevant tasks for ``feature``, in ID order so the prompt stays stable.
+
+    ``ranked`` tasks (best match first) are taken before the usual order.
+    """
+    records = relevant_tasks(store) if ranked is None else ranked_first(ranked, relevant_tasks(store))
+    packed = pack(records, feature_budget(config, feature), task_line, shorten_task, record_tokens(config))
+    return packed._replace(records=sorted(packed.records, key=lambda task: task.id))
+
+
+def describe(packed, noun):
+    """One-line report of what went into the prompt"""
+    text = f"{len(packed.records)} {noun} (~{packed.tokens:,} of {packed.budget:,} tokens)"
+    if packed.truncated:
+        text += f", {packed.truncated} shortened"
+    if packed.omitted:
+        text += f", the rest left out to fit"
+    return text
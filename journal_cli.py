@@ -1,43 +1,208 @@
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.prompt import Prompt
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import deque
+from contextlib import contextmanager
+import importlib
 import os
+import sys
 import json
-import requests
+import time
+from journal_store import (
+    BACKENDS, COMPACT_THRESHOLD, PRIORITIES, STATUSES, TIMESTAMP_FORMAT, in_date_range, is_timestamp,
+    migrate_flat_to_sqlite, open_store, until_key
+)
+from app_config import ConfigFile
 
 JOURNAL_FILE = 'journal.txt'
 TASK_FILE = 'tasks.txt'
 CONFIG_FILE = 'config.json'
-console = Console()
+DB_FILE = 'journal.db'
+SEARCH_INDEX_FILE = 'search_index.db'
+VECTOR_INDEX_FILE = 'entry_vectors'
+RELEVANT_ENTRIES = 50
+RELEVANT_TASKS = 30
+DEFAULT_FOCUS = "general reflection"
+STATS_FILE = 'stats'
+PROFILE_DIR = 'profiles'
+PAGE_SIZE = 20
+AI_CACHE_FILE = 'ai_cache.db'
+LOCAL_MODEL = 'lexicon'
+CHUNK_MAX_CHARS = 12000
+MOOD_FILE = 'mood.jsonl'
+MOOD_DIGESTS_FILE = 'mood_digests.json'
+MOOD_BATCH_DAYS = 30
+REDUCE_FAN_IN = 20
+
+class LazyConsole:
+    """Builds the rich Console on first use, so runs that never print skip terminal setup.
+
+    requests, google.generativeai, numpy, rich.live, the thread pool and the
+    search, stats, mood, metrics, context and cache modules are likewise
+    imported inside the functions that need them.
+    """
+    def __init__(self):
+        self._console = None
+        self._stderr = False
+
+    def instance(self):
+        """The real Console, for rich APIs such as Live that need one"""
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console(stderr=self._stderr)
+        return self._console
+
+    def use_stderr(self):
+        """Send all console output to stderr, keeping stdout clean for JSON"""
+        self._stderr = True
+        self._console = None
+
+    def __getattr__(self, name):
+        return getattr(self.instance(), name)
+
+console = LazyConsole()
+
+class LazyName:
+    """Stands in for ``module.name``, importing it on first call or attribute access.
+
+    Used for the rich widgets drawn all over this file, each of which costs
+    tens of milliseconds to import and is never needed by a JSON batch command.
+    """
+    def __init__(self, module, name):
+        self._module = module
+        self._name = name
+        self._value = None
+
+    def _load(self):
+        if self._value is None:
+            self._value = getattr(importlib.import_module(self._module), self._name)
+        return self._value
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+Table = LazyName('rich.table', 'Table')
+Panel = LazyName('rich.panel', 'Panel')
+Prompt = LazyName('rich.prompt', 'Prompt')
 
 # Special code word to activate the CLI
 ACTIVATION_CODE = "secret"
 
 # AI Configuration
+CONFIG = ConfigFile(CONFIG_FILE)
+
 def load_config():
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    return CONFIG.load()
 
 def save_config(config):
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
+    CONFIG.save(config)
+
+def get_store():
+    """Open the storage backend selected in config.json (flat files by default)"""
+    config = load_config()
+    return open_store(config.get('storage_backend', 'flat'), JOURNAL_FILE, TASK_FILE, DB_FILE,
+                      compact_threshold=config.get('compact_threshold', COMPACT_THRESHOLD))
+
+def open_search_index(store):
+    """Open the full-text index, catching it up with records appended since its last use"""
+    from search_index import SearchIndex
+    index = SearchIndex(SEARCH_INDEX_FILE)
+    index.sync(store)
+    return index
+
+def refresh_search_index(store):
+    open_search_index(store).close()
+
+def refresh_stats(store):
+    """Fold newly appended entries and tasks into the stats aggregates"""
+    from journal_stats import open_stats
+    with open_stats(STATS_FILE, store):
+        pass
+
+def open_vector_index(store):
+    """Open the entry vector index (needs NumPy), embedding entries added since its last use"""
+    from vector_index import VectorIndex
+    index = VectorIndex(VECTOR_INDEX_FILE)
+    index.sync(store)
+    return index
+
+def refresh_vector_index(store):
+    """Embed new entries if the vector index exists; it is built on the first relevance lookup"""
+    if os.path.exists(VECTOR_INDEX_FILE + '.json'):
+        try:
+            open_vector_index(store).close()
+        except ImportError:
+            pass
+
+def relevant_entries(store, query, since=None, until=None, known=()):
+    """Entries most similar to ``query`` (dated within the range, if given), best first; None when there is nothing to rank by.
+
+    Hits among the ``known`` entries, already read by the caller, are not read again.
+    """
+    if not query.strip() or query == DEFAULT_FOCUS or not store.journal_exists():
+        return None
+    try:
+        index = open_vector_index(store)
+    except ImportError:
+        return None
+    hits = index.search(query, RELEVANT_ENTRIES)
+    index.close()
+    known = {entry.id: entry for entry in known}
+    ids = [entry_id for _, entry_id in hits]
+    known.update((entry.id, entry) for entry in store.get_entries([entry_id for entry_id in ids if entry_id not in known]))
+    end = until_key(until)
+    entries = [known[entry_id] for entry_id in ids
+               if entry_id in known and in_date_range(known[entry_id].date, since, end)]
+    return entries or None
+
+def relevant_tasks_for(store, query):
+    """Tasks most similar to ``query``, best first; None when there is nothing to rank by"""
+    if not query.strip() or not store.tasks_exist():
+        return None
+    try:
+        from vector_index import rank_texts
+    except ImportError:
+        return None
+    tasks = list(store.iter_tasks())
+    ranked = [tasks[i] for score, i in rank_texts([task.description for task in tasks], query)[:RELEVANT_TASKS]
+              if score > 0]
+    return ranked or None
+
+def matched_hint(packed, ranked):
+    if not ranked:
+        return ""
+    ids = {record.id for record in ranked}
+    return f", {sum(1 for record in packed.records if record.id in ids)} matched the focus"
 
 def setup_ai_api():
+    from metrics import span
     config = load_config()
     provider = config.get('api_provider', 'gemini')
+    with span('ai.setup', provider=provider) as record:
+        record['ok'] = ok = configure_ai_provider(config, provider)
+    return ok
+
+def configure_ai_provider(config, provider):
+    """Check the library and API key for provider, asking for a key the first time"""
+    from metrics import span
+    if provider == 'local':
+        try:
+            import numpy
+        except ImportError:
+            console.print(Panel.fit("[red]NumPy is required for local analysis. Run: pip install numpy[/red]", title="Missing Dependency", border_style="red"))
+            return False
+        return True
     
     if provider == 'gemini':
         try:
-            import google.generativeai as genai
+            with span('ai.import', provider=provider):
+                import google.generativeai as genai
         except ImportError:
             console.print(Panel.fit("[red]Google Generative AI library not installed. Run: pip install google-generativeai[/red]", title="Missing Dependency", border_style="red"))
             return False
         
-        api_key = os.getenv('GEMINI_API_KEY') or config.get('gemini_api_key')
+        api_key = CONFIG.api_key(config, 'gemini')
         
         if not api_key:
             console.print(Panel("[bold yellow]First time using AI features![/bold yellow]\n[cyan]You need a Gemini API key from Google AI Studio[/cyan]\n[dim]Visit: https://makersuite.google.com/app/apikey[/dim]", title="AI Setup Required", border_style="yellow"))
@@ -49,19 +214,10 @@ def setup_ai_api():
             save_config(config)
             console.print(Panel.fit("[green]API key saved successfully![/green]", title="Setup Complete", border_style="green"))
         
-        try:
-            genai.configure(api_key=api_key)
-            # Test the API key
-            model = genai.GenerativeModel("gemini-3.5-flash")
-            test_response = model.generate_content("Hello")
-            return True
-        except Exception as e:
-            console.print(Panel.fit(f"[red]Connection error or invalid API key: {str(e)}[/red]", title="API Error", border_style="red"))
-            return False
+        return ensure_credentials(config, provider, api_key)
             
     elif provider == 'openrouter':
-        api_key = os.getenv('OPENROUTER_API_KEY') or config.get('openrouter_api_key')
-        model_name = config.get('openrouter_model', 'anthropic/claude-sonnet-4')
+        api_key = CONFIG.api_key(config, 'openrouter')
         
         if not api_key:
             console.print(Panel("[bold yellow]First time using OpenRouter AI features![/bold yellow]\n[cyan]You need an OpenRouter API key[/cyan]\n[dim]Visit: https://openrouter.ai/keys[/dim]", title="OpenRouter Setup Required", border_style="yellow"))
@@ -73,33 +229,7 @@ def setup_ai_api():
             save_config(config)
             console.print(Panel.fit("[green]OpenRouter API key saved successfully![/green]", title="Setup Complete", border_style="green"))
             
-        try:
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://github.com/ameymalpurkar/Hacker_Diaries",
-                "X-Title": "Hacker Diaries",
-            }
-            data = {
-                "model": model_name,
-                "messages": [{"role": "user", "content": "Hello"}],
-                "max_tokens": 500
-            }
-            console.print(Panel("[bold yellow]🤖 Testing OpenRouter connection...[/bold yellow]", border_style="yellow"))
-            response = requests.post(
-                url="https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                data=json.dumps(data),
-                timeout=15
-            )
-            if response.status_code == 200:
-                return True
-            else:
-                console.print(Panel.fit(f"[red]OpenRouter API Error: Status {response.status_code}\n{response.text}[/red]", title="API Error", border_style="red"))
-                return False
-        except Exception as e:
-            console.print(Panel.fit(f"[red]Connection error: {str(e)}[/red]", title="API Error", border_style="red"))
-            return False
+        return ensure_credentials(config, provider, api_key)
     else:
         console.print(Panel.fit(f"[red]Unknown API provider: {provider}[/red]", border_style="red"))
         return False
@@ -107,76 +237,267 @@ def setup_ai_api():
 def setup_gemini_api():
     return setup_ai_api()
 
-def generate_ai_content(prompt):
+def provider_api_key(config, provider):
+    return CONFIG.api_key(config, provider)
+
+def open_credential_cache(config):
+    from ai_cache import DEFAULT_VALIDATION_TTL, CredentialCache
+    return CredentialCache(AI_CACHE_FILE, ttl=config.get('credential_ttl', DEFAULT_VALIDATION_TTL))
+
+def verify_credentials(config, provider, api_key):
+    """Check the key against the provider without spending tokens.
+
+    Returns (ok, message); ok is None when the provider could not be reached.
+    """
+    from metrics import span
+    from ai_clients import get_client, is_unreachable
+    try:
+        with span('provider.verify', provider=provider):
+            return get_client(provider, api_key, ai_model_name(config, provider)).verify()
+    except Exception as e:
+        if is_unreachable(e):
+            return None, f"Could not reach {provider}: {str(e)}"
+        return False, f"Connection error or invalid API key: {str(e)}"
+
+def local_fallback_enabled(config):
+    return config.get('local_fallback', True)
+
+def local_ai_content(prompt):
+    from metrics import span
+    from ai_clients import get_client
+    with span('provider.generate', provider='local', model=LOCAL_MODEL):
+        return get_client('local', None, LOCAL_MODEL).generate(prompt)
+
+def ensure_credentials(config, provider, api_key):
+    """Validate the key once per TTL instead of before every request"""
+    from metrics import annotate
+    credentials = open_credential_cache(config)
+    try:
+        if credentials.is_valid(provider, api_key):
+            annotate(credentials='cached')
+            return True
+        console.print(Panel("[bold yellow]🤖 Verifying API key...[/bold yellow]", border_style="yellow"))
+        annotate(credentials='verified')
+        ok, message = verify_credentials(config, provider, api_key)
+        if ok:
+            credentials.mark_valid(provider, api_key)
+        elif ok is None and local_fallback_enabled(config):
+            console.print(Panel.fit(f"[yellow]{message}\nFalling back to local analysis.[/yellow]", title="Offline", border_style="yellow"))
+            return True
+        else:
+            console.print(Panel.fit(f"[red]{message}[/red]", title="API Error", border_style="red"))
+        return bool(ok)
+    finally:
+        credentials.close()
+
+def verify_api_config():
+    """Force a fresh credential check for the active provider (config verify)"""
     config = load_config()
     provider = config.get('api_provider', 'gemini')
-    
+    api_key = provider_api_key(config, provider)
+    if provider == 'local':
+        console.print(Panel.fit("[green]Local analysis needs no API key.[/green]", title="Verify", border_style="green"))
+        return True
+    if not api_key:
+        console.print(Panel.fit(f"[yellow]No API key configured for {provider}.[/yellow]", title="Verify", border_style="yellow"))
+        return False
+    credentials = open_credential_cache(config)
+    try:
+        ok, message = verify_credentials(config, provider, api_key)
+        if ok:
+            credentials.mark_valid(provider, api_key)
+            console.print(Panel.fit(f"[green]{message}[/green]", title="Verify", border_style="green"))
+        else:
+            credentials.invalidate(provider, api_key)
+            console.print(Panel.fit(f"[red]{message}[/red]", title="Verify", border_style="red"))
+        return ok
+    finally:
+        credentials.close()
+
+def ai_model_name(config, provider):
+    if provider == 'local':
+        return LOCAL_MODEL
     if provider == 'gemini':
-        import google.generativeai as genai
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY') or config.get('gemini_api_key'))
-        model = genai.GenerativeModel("gemini-3.5-flash")
-        response = model.generate_content(prompt)
-        return response.text if hasattr(response, 'text') else str(response)
-        
-    elif provider == 'openrouter':
-        api_key = os.getenv('OPENROUTER_API_KEY') or config.get('openrouter_api_key')
-        model_name = config.get('openrouter_model', 'anthropic/claude-sonnet-4')
-        
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://github.com/ameymalpurkar/Hacker_Diaries",
-            "X-Title": "Hacker Diaries",
-        }
-        
-        data = {
-            "model": model_name,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 1500
-        }
-        
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            data=json.dumps(data),
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
+        return "gemini-3.5-flash"
+    return config.get('openrouter_model', 'anthropic/claude-sonnet-4')
+
+def open_ai_cache(config):
+    from ai_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, ResponseCache
+    return ResponseCache(
+        AI_CACHE_FILE,
+        ttl=config.get('ai_cache_ttl', DEFAULT_TTL),
+        max_bytes=config.get('ai_cache_max_bytes', DEFAULT_MAX_BYTES)
+    )
+
+def generate_ai_content(prompt, use_cache=True):
+    """Return the AI response for prompt, served from the response cache when possible.
+
+    Pass use_cache=False, or set ai_cache_enabled to false in config.json,
+    to always make a fresh request.
+    """
+    from metrics import span
+    config = load_config()
+    provider = config.get('api_provider', 'gemini')
+    if provider == 'local':
+        return local_ai_content(prompt)
+    model_name = ai_model_name(config, provider)
+    cache = open_ai_cache(config) if use_cache and config.get('ai_cache_enabled', True) else None
+    with span('ai.generate', provider=provider, model=model_name, cache='miss' if cache else 'off') as record:
+        try:
+            if cache:
+                cached = cache.get(provider, model_name, prompt)
+                if cached is not None:
+                    record['cache'] = 'hit'
+                    console.print("[dim]⚡ Cache hit: reused a saved response (no tokens spent)[/dim]")
+                    return cached
+            credentials = open_credential_cache(config)
             try:
-                return result['choices'][0]['message']['content']
-            except (KeyError, IndexError):
-                raise Exception(f"Unexpected response structure from OpenRouter: {json.dumps(result)}")
-        else:
-            raise Exception(f"OpenRouter API error (Status {response.status_code}): {response.text}")
-    else:
-        raise Exception(f"Unknown API provider: {provider}")
+                response_text = request_ai_content(config, provider, prompt)
+                credentials.mark_valid(provider, provider_api_key(config, provider))
+            except Exception as e:
+                from ai_clients import is_transient, is_unreachable
+                if is_unreachable(e) and local_fallback_enabled(config):
+                    record['fallback'] = 'local'
+                    console.print(f"[dim]⚠ Could not reach {provider}; using local analysis instead[/dim]")
+                    return local_ai_content(prompt)
+                # A rejected request is the signal to re-check the key on the next call
+                if not is_transient(e):
+                    credentials.invalidate(provider, provider_api_key(config, provider))
+                raise
+            finally:
+                credentials.close()
+            if cache:
+                cache.put(provider, model_name, prompt, response_text)
+            return response_text
+        finally:
+            if cache:
+                cache.close()
 
-def ai_task_analysis():
-    if not setup_gemini_api():
-        return
-    
-    if not os.path.exists(TASK_FILE):
-        console.print(Panel.fit("[red]No tasks found to analyze.[/red]", title="No Tasks", border_style="red"))
-        return
-    
-    with open(TASK_FILE, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f if line.count('|') == 2]
-    
-    if not lines:
-        console.print(Panel.fit("[yellow]No tasks to analyze.[/yellow]", title="Empty", border_style="yellow"))
+def note_first_token(record, start):
+    """Set ``ttft_ms`` on a stream span the first time a chunk is handed out"""
+    record.setdefault('ttft_ms', round((time.perf_counter() - start) * 1000, 3))
+
+def stream_ai_content(prompt, use_cache=True, feature=None):
+    """Yield the AI response in chunks as they arrive.
+
+    A cache hit is yielded as a single chunk; a completed stream is cached
+    like a regular response. The ``ai.stream`` span records the time to the
+    first chunk as ``ttft_ms``, whichever source it came from.
+    """
+    from metrics import span
+    config = load_config()
+    provider = config.get('api_provider', 'gemini')
+    if provider == 'local':
+        with span('ai.stream', provider=provider, feature=feature) as record:
+            start = time.perf_counter()
+            response = local_ai_content(prompt)
+            note_first_token(record, start)
+            yield response
         return
-    
-    # Prepare task data for AI
+    model_name = ai_model_name(config, provider)
+    api_key = provider_api_key(config, provider)
+    cache = open_ai_cache(config) if use_cache and config.get('ai_cache_enabled', True) else None
+    with span('ai.stream', provider=provider, model=model_name, feature=feature,
+              cache='miss' if cache else 'off') as record:
+        start = time.perf_counter()
+        try:
+            if cache:
+                cached = cache.get(provider, model_name, prompt)
+                if cached is not None:
+                    record['cache'] = 'hit'
+                    note_first_token(record, start)
+                    yield cached
+                    return
+            from ai_clients import get_client, is_transient, is_unreachable
+            chunks = []
+            credentials = open_credential_cache(config)
+            try:
+                with span('provider.stream', provider=provider, model=model_name) as call:
+                    call_start = time.perf_counter()
+                    for chunk in get_client(provider, api_key, model_name).stream(prompt):
+                        if not chunks:
+                            call['first_token_ms'] = round((time.perf_counter() - call_start) * 1000, 3)
+                        chunks.append(chunk)
+                        note_first_token(record, start)
+                        yield chunk
+                    fill_token_counts(call, prompt, ''.join(chunks))
+                credentials.mark_valid(provider, api_key)
+            except Exception as e:
+                if not chunks and is_unreachable(e) and local_fallback_enabled(config):
+                    record['fallback'] = 'local'
+                    response = local_ai_content(prompt)
+                    note_first_token(record, start)
+                    yield response
+                    return
+                if not is_transient(e):
+                    credentials.invalidate(provider, api_key)
+                raise
+            finally:
+                credentials.close()
+            if cache:
+                cache.put(provider, model_name, prompt, ''.join(chunks))
+        finally:
+            if cache:
+                cache.close()
+
+def fill_token_counts(record, prompt, response):
+    """Estimate the token counts a provider did not report on its span"""
+    from context_packer import estimate_tokens
+    if record.get('tokens_in') is None:
+        record['tokens_in'] = estimate_tokens(prompt)
+        record['tokens_estimated'] = True
+    if record.get('tokens_out') is None:
+        record['tokens_out'] = estimate_tokens(response) if response else 0
+        record['tokens_estimated'] = True
+
+def show_ai_response(prompt, heading, title, border_style, waiting, feature):
+    """Print the AI response in a panel, streaming it in as it is generated.
+
+    Returns the full response text. Set ai_streaming to false in config.json
+    to wait for the complete answer instead.
+    """
+    if not load_config().get('ai_streaming', True):
+        console.print(Panel(f"[bold yellow]{waiting}[/bold yellow]", border_style="yellow"))
+        ai_response = generate_ai_content(prompt)
+        console.print(Panel(f"{heading}\n\n{ai_response}", title=title, border_style=border_style))
+        return ai_response
+
+    from rich.live import Live
+    start = time.perf_counter()
+    first_token = None
+    chunks = []
+    with Live(Panel(f"{heading}\n\n[dim]{waiting}[/dim]", title=title, border_style=border_style),
+              console=console.instance(), refresh_per_second=12) as live:
+        for chunk in stream_ai_content(prompt, feature=feature):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            chunks.append(chunk)
+            live.update(Panel(f"{heading}\n\n{''.join(chunks)}", title=title, border_style=border_style))
+        total = time.perf_counter() - start
+        if first_token is None:
+            first_token = total
+        live.update(Panel(
+            f"{heading}\n\n{''.join(chunks)}", title=title, border_style=border_style,
+            subtitle=f"[dim]first token {first_token:.2f}s · total {total:.2f}s[/dim]"
+        ))
+    return ''.join(chunks)
+
+def request_ai_content(config, provider, prompt):
+    from metrics import span
+    from ai_clients import get_client
+    model_name = ai_model_name(config, provider)
+    client = get_client(provider, provider_api_key(config, provider), model_name)
+    with span('provider.generate', provider=provider, model=model_name) as record:
+        response_text = client.generate(prompt)
+        fill_token_counts(record, prompt, response_text)
+    return response_text
+
+def task_analysis_prompt(tasks):
     tasks_text = ""
-    for i, line in enumerate(lines, 1):
-        priority, task, status = line.split('|', 2)
-        tasks_text += f"{i}. [{priority.upper()}] {task} - {status}\n"
+    for i, task in enumerate(tasks, 1):
+        tasks_text += f"{i}. [{task.priority.upper()}] {task.description} - {task.status}\n"
     
-    prompt = f"""Analyze these tasks and provide insights:
+    return f"""Analyze these tasks and provide insights:
 
 {tasks_text}
 
@@ -189,29 +510,34 @@ Please provide:
 
 Keep the response concise and actionable."""
 
-    try:
-        console.print(Panel("[bold yellow]🤖 AI is analyzing your tasks...[/bold yellow]", border_style="yellow"))
-        ai_response = generate_ai_content(prompt)
-        console.print(Panel(f"[bold cyan]🧠 AI Task Analysis:[/bold cyan]\n\n{ai_response}", title="AI Insights", border_style="cyan"))
-    except Exception as e:
-        console.print(Panel.fit(f"[red]AI analysis failed: {str(e)}[/red]", title="Error", border_style="red"))
-
-def ai_suggest_tasks():
+def ai_task_analysis():
+    from context_packer import describe, pack_tasks
     if not setup_gemini_api():
         return
     
-    # Get current tasks for context
-    current_tasks = ""
-    if os.path.exists(TASK_FILE):
-        with open(TASK_FILE, 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f if line.count('|') == 2]
-            for line in lines:
-                priority, task, status = line.split('|', 2)
-                current_tasks += f"- {task} ({status})\n"
+    store = get_store()
+    if not store.tasks_exist():
+        console.print(Panel.fit("[red]No tasks found to analyze.[/red]", title="No Tasks", border_style="red"))
+        return
     
-    user_goal = Prompt.ask("[bold cyan]What are you trying to accomplish? (e.g., 'prepare for presentation', 'organize workspace')[/bold cyan]")
+    packed = pack_tasks(store, load_config(), 'task-analysis')
     
-    prompt = f"""Based on this goal: "{user_goal}"
+    if not packed.records:
+        console.print(Panel.fit("[yellow]No tasks to analyze.[/yellow]", title="Empty", border_style="yellow"))
+        return
+    
+    console.print(f"[dim]Context: {describe(packed, 'tasks')}[/dim]")
+    prompt = task_analysis_prompt(packed.records)
+
+    try:
+        show_ai_response(prompt, "[bold cyan]🧠 AI Task Analysis:[/bold cyan]", "AI Insights", "cyan",
+                         "🤖 AI is analyzing your tasks...", "task-analysis")
+    except Exception as e:
+        console.print(Panel.fit(f"[red]AI analysis failed: {str(e)}[/red]", title="Error", border_style="red"))
+
+def task_suggestions_prompt(tasks, user_goal):
+    current_tasks = "".join(f"- {task.description} ({task.status})\n" for task in tasks)
+    return f"""Based on this goal: "{user_goal}"
 
 Current tasks:
 {current_tasks if current_tasks else "No current tasks"}
@@ -221,6 +547,20 @@ Suggest 3-5 specific, actionable tasks that would help achieve this goal. Format
 
 Keep tasks realistic and achievable."""
 
+def ai_suggest_tasks():
+    from context_packer import describe, pack_tasks
+    if not setup_gemini_api():
+        return
+    
+    user_goal = Prompt.ask("[bold cyan]What are you trying to accomplish? (e.g., 'prepare for presentation', 'organize workspace')[/bold cyan]")
+    
+    # Current tasks give the AI context, those closest to the goal first
+    store = get_store()
+    ranked = relevant_tasks_for(store, user_goal)
+    packed = pack_tasks(store, load_config(), 'task-suggestions', ranked)
+    console.print(f"[dim]Context: {describe(packed, 'tasks')}{matched_hint(packed, ranked)}[/dim]")
+    prompt = task_suggestions_prompt(packed.records, user_goal)
+
     try:
         console.print(Panel("[bold yellow]🤖 AI is generating task suggestions...[/bold yellow]", border_style="yellow"))
         ai_response = generate_ai_content(prompt)
@@ -249,8 +589,10 @@ def add_ai_suggested_tasks(ai_suggestions):
                 task_desc = task_desc.strip()
                 
                 if priority in ['high', 'medium', 'low']:
-                    with open(TASK_FILE, 'a', encoding='utf-8') as f:
-                        f.write(f'{priority}|{task_desc}|not done\n')
+                    store = get_store()
+                    store.add_tasks(priority, [task_desc])
+                    refresh_search_index(store)
+                    refresh_stats(store)
                     console.print(Panel.fit(f"[green]Added: {task_desc} [{priority}][/green]", border_style="green"))
                 else:
                     console.print(Panel.fit("[red]Priority must be high, medium, or low[/red]", border_style="red"))
@@ -259,41 +601,15 @@ def add_ai_suggested_tasks(ai_suggestions):
         else:
             console.print(Panel.fit("[red]Format: priority|task description[/red]", border_style="red"))
 
-def ai_journal_analysis():
-    """Analyze journal entries for insights, patterns, and mood"""
-    if not setup_gemini_api():
-        return
-    
-    if not os.path.exists(JOURNAL_FILE):
-        console.print(Panel.fit("[red]No journal entries found to analyze.[/red]", title="No Entries", border_style="red"))
-        return
-    
-    with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f if '|' in line]
-    
-    if not lines:
-        console.print(Panel.fit("[yellow]No journal entries to analyze.[/yellow]", title="Empty", border_style="yellow"))
-        return
-    
-    # Prepare journal data for AI
+def journal_text_for(entries):
     journal_text = ""
-    entry_count = 0
-    for line in lines:
-        if '|' in line:
-            date, entry = line.split('|', 1)
-            journal_text += f"[{date}] {entry}\n"
-            entry_count += 1
-    
-    # Limit analysis to recent entries if too many
-    if entry_count > 20:
-        lines = lines[-20:]  # Last 20 entries
-        journal_text = ""
-        for line in lines:
-            date, entry = line.split('|', 1)
-            journal_text += f"[{date}] {entry}\n"
-        console.print(f"[dim]Analyzing your last 20 journal entries...[/dim]")
-    
-    prompt = f"""Analyze these journal entries and provide thoughtful insights:
+    for entry in entries:
+        journal_text += f"[{entry.date}] {entry.text}\n"
+    return journal_text
+
+def journal_analysis_prompt(entries):
+    journal_text = journal_text_for(entries)
+    return f"""Analyze these journal entries and provide thoughtful insights:
 
 {journal_text}
 
@@ -308,38 +624,9 @@ Please provide:
 
 Be empathetic, supportive, and insightful. Focus on patterns and growth opportunities."""
 
-    try:
-        console.print(Panel("[bold yellow]🤖 AI is analyzing your journal entries...[/bold yellow]", border_style="yellow"))
-        ai_response = generate_ai_content(prompt)
-        console.print(Panel(f"[bold cyan]📝 AI Journal Analysis:[/bold cyan]\n\n{ai_response}", title="Personal Insights", border_style="cyan"))
-    except Exception as e:
-        console.print(Panel.fit(f"[red]AI analysis failed: {str(e)}[/red]", title="Error", border_style="red"))
-
-def ai_journal_mood_tracker():
-    """Track mood trends over time"""
-    if not setup_gemini_api():
-        return
-    
-    if not os.path.exists(JOURNAL_FILE):
-        console.print(Panel.fit("[red]No journal entries found.[/red]", title="No Entries", border_style="red"))
-        return
-    
-    with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f if '|' in line]
-    
-    if not lines:
-        console.print(Panel.fit("[yellow]No journal entries to analyze.[/yellow]", title="Empty", border_style="yellow"))
-        return
-    
-    # Get recent entries for mood tracking
-    recent_entries = lines[-10:] if len(lines) > 10 else lines
-    journal_text = ""
-    for line in recent_entries:
-        if '|' in line:
-            date, entry = line.split('|', 1)
-            journal_text += f"[{date}] {entry}\n"
-    
-    prompt = f"""Analyze the mood and emotional tone in these journal entries:
+def journal_mood_prompt(entries):
+    journal_text = journal_text_for(entries)
+    return f"""Analyze the mood and emotional tone in these journal entries:
 
 {journal_text}
 
@@ -353,60 +640,331 @@ Please provide:
 
 Be supportive and focus on emotional health insights."""
 
+def journal_suggestions_prompt(entries, current_focus):
+    context = journal_text_for(entries)
+    return f"""Based on this focus area: "{current_focus}"
+
+Recent journal context:
+{context if context else "No recent entries"}
+
+Please provide:
+1. **5 Thoughtful Journal Prompts** related to the focus area
+2. **Self-Reflection Questions** for deeper thinking
+3. **Mindfulness Suggestions** for present-moment awareness
+4. **Growth Opportunities** to explore
+5. **Gratitude Prompts** to appreciate positive aspects
+
+Make the suggestions personal, meaningful, and encouraging for self-discovery."""
+
+def ai_journal_analysis():
+    """Analyze journal entries for insights, patterns, and mood"""
+    from context_packer import describe, pack_entries
+    if not setup_gemini_api():
+        return
+    
+    store = get_store()
+    if not store.journal_exists():
+        console.print(Panel.fit("[red]No journal entries found to analyze.[/red]", title="No Entries", border_style="red"))
+        return
+    
+    packed = pack_entries(store, load_config(), 'journal-analysis')
+    
+    if not packed.records:
+        console.print(Panel.fit("[yellow]No journal entries to analyze.[/yellow]", title="Empty", border_style="yellow"))
+        return
+    
+    hint = " (use history for the whole journal)" if packed.omitted else ""
+    console.print(f"[dim]Context: {describe(packed, 'entries')}{hint}[/dim]")
+    prompt = journal_analysis_prompt(packed.records)
+
     try:
-        console.print(Panel("[bold yellow]🤖 AI is tracking your mood patterns...[/bold yellow]", border_style="yellow"))
-        ai_response = generate_ai_content(prompt)
-        console.print(Panel(f"[bold magenta]💭 Mood Analysis:[/bold magenta]\n\n{ai_response}", title="Emotional Insights", border_style="magenta"))
+        show_ai_response(prompt, "[bold cyan]📝 AI Journal Analysis:[/bold cyan]", "Personal Insights", "cyan",
+                         "🤖 AI is analyzing your journal entries...", "journal-analysis")
     except Exception as e:
-        console.print(Panel.fit(f"[red]Mood analysis failed: {str(e)}[/red]", title="Error", border_style="red"))
+        console.print(Panel.fit(f"[red]AI analysis failed: {str(e)}[/red]", title="Error", border_style="red"))
+
+def mood_score_prompt(texts):
+    days_text = "\n".join(f"## {day}\n{text}" for day, text in texts.items())
+    return f"""Rate the overall mood of each day of these journal entries from 1 (very low) to 10 (excellent):
+
+{days_text}
+
+Reply with only a JSON object mapping each date to its score and a short note, e.g.
+{{"2026-06-30": {{"score": 7, "note": "productive, enjoyed the rain"}}}}"""
+
+def score_mood_days(store, days, digests, concurrency):
+    """Score the given days and append them to the mood series; returns how many were scored"""
+    from mood_series import append_scores, journal_day_texts, parse_scores
+    from context_packer import budget_batches, estimate_tokens, feature_budget, truncate
+    budget = feature_budget(load_config(), 'mood-scores')
+    # A day longer than a whole request is cut down to one
+    texts = {day: truncate(text, budget) for day, text in journal_day_texts(store, days).items()}
+    batches = list(budget_batches(days, budget, lambda day: estimate_tokens(texts[day]), MOOD_BATCH_DAYS))
+    console.print(Panel(f"[bold yellow]🤖 AI is scoring {len(days)} new day(s) of journal entries...[/bold yellow]", border_style="yellow"))
+    scored = 0
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(generate_ai_content, mood_score_prompt({day: texts[day] for day in batch})): batch
+                   for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            scores = parse_scores(future.result(), batch)
+            append_scores(MOOD_FILE, [
+                {'date': day, 'score': scores[day]['score'], 'note': scores[day]['note'], 'digest': digests[day]}
+                for day in batch if day in scores
+            ])
+            scored += len(scores)
+    return scored
+
+def show_mood_trends(series):
+    from mood_series import moving_average, weekly_averages
+    days = sorted(series)
+    table = Table(title="💭 Mood by Day", show_lines=False)
+    table.add_column("Date", style="cyan")
+    table.add_column("Score", style="magenta")
+    table.add_column("Note", style="white")
+    for day in days[-14:]:
+        record = series[day]
+        table.add_row(day, f"{'█' * record['score']} {record['score']}", record.get('note', ''))
+    console.print(table)
+    
+    weeks = "\n".join(f"[cyan]Week of {week}:[/cyan] [green]{average:.1f}[/green] [dim]({count} day(s))[/dim]"
+                      for week, average, count in weekly_averages(series))
+    current = moving_average(series, 7)
+    last_day = datetime.strptime(days[-1], "%Y-%m-%d")
+    previous = moving_average(series, 7, end=(last_day - timedelta(days=7)).strftime("%Y-%m-%d"))
+    trend = "[dim]not enough history yet[/dim]"
+    if previous is not None:
+        change = current - previous
+        trend = "[green]improving[/green]" if change > 0.5 else "[red]declining[/red]" if change < -0.5 else "[yellow]steady[/yellow]"
+        trend += f" ({change:+.1f} vs the week before)"
+    console.print(Panel.fit(
+        f"[cyan]7-day average:[/cyan] [green]{current:.1f}[/green]\n"
+        f"[cyan]30-day average:[/cyan] [green]{moving_average(series, 30):.1f}[/green]\n"
+        f"[cyan]Trend:[/cyan] {trend}\n\n{weeks}",
+        title="Mood Trends", border_style="magenta"
+    ))
+
+def ai_journal_mood_tracker():
+    """Track mood trends over time, scoring only days that are not in the mood series yet"""
+    from mood_series import journal_day_digests, load_series, unscored_days
+    store = get_store()
+    if not store.journal_exists():
+        console.print(Panel.fit("[red]No journal entries found.[/red]", title="No Entries", border_style="red"))
+        return
+    
+    digests = journal_day_digests(store, MOOD_DIGESTS_FILE)
+    days = unscored_days(digests, load_series(MOOD_FILE))
+    if days:
+        if not setup_gemini_api():
+            return
+        try:
+            score_mood_days(store, days, digests, max(1, int(load_config().get('ai_concurrency', 3))))
+        except Exception as e:
+            console.print(Panel.fit(f"[red]Mood analysis failed: {str(e)}[/red]", title="Error", border_style="red"))
+    
+    # Days whose entries were all deleted drop out of the series
+    series = {day: record for day, record in load_series(MOOD_FILE).items() if day in digests}
+    if not series:
+        console.print(Panel.fit("[yellow]No journal entries to analyze.[/yellow]", title="Empty", border_style="yellow"))
+        return
+    show_mood_trends(series)
 
 def ai_journal_suggestions():
     """Get AI suggestions for journaling prompts and self-reflection"""
+    from context_packer import describe, pack_entries
+    if not setup_gemini_api():
+        return
+    
+    current_focus = Prompt.ask("[bold cyan]What would you like to focus on? (e.g., 'gratitude', 'goals', 'relationships', 'stress')[/bold cyan]", default=DEFAULT_FOCUS)
+    
+    store = get_store()
+    ranked = relevant_entries(store, current_focus)
+    packed = pack_entries(store, load_config(), 'journal-suggestions', ranked)
+    console.print(f"[dim]Context: {describe(packed, 'entries')}{matched_hint(packed, ranked)}[/dim]")
+    prompt = journal_suggestions_prompt(packed.records, current_focus)
+
+    try:
+        show_ai_response(prompt, "[bold green]✨ Journal Suggestions:[/bold green]", "Writing Prompts", "green",
+                         "🤖 AI is creating personalized journal prompts...", "journal-suggestions")
+    except Exception as e:
+        console.print(Panel.fit(f"[red]Suggestion generation failed: {str(e)}[/red]", title="Error", border_style="red"))
+
+def ai_journal_all(since=None, until=None):
+    """Run analysis, mood and prompts together (optionally over a date range), printing each result as it arrives"""
+    from context_packer import describe, feature_budget, pack_entries, recent_entries
     if not setup_gemini_api():
         return
     
-    # Get context from recent entries if they exist
-    context = ""
-    if os.path.exists(JOURNAL_FILE):
-        with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
-            lines = [line.strip() for line in f if '|' in line]
-            if lines:
-                recent_entries = lines[-5:]  # Last 5 entries for context
-                for line in recent_entries:
-                    if '|' in line:
-                        date, entry = line.split('|', 1)
-                        context += f"[{date}] {entry}\n"
+    store = get_store()
+    if not store.journal_exists():
+        console.print(Panel.fit("[red]No journal entries found to analyze.[/red]", title="No Entries", border_style="red"))
+        return
+    
+    config = load_config()
+    # One read of the journal (or range) is packed into all three budgets
+    features = ('journal-analysis', 'journal-mood', 'journal-suggestions')
+    newest = recent_entries(store, max(feature_budget(config, feature) for feature in features), since, until)
+    analysis = pack_entries(store, config, 'journal-analysis', newest=newest)
+    if not analysis.records:
+        console.print(Panel.fit("[yellow]No journal entries to analyze.[/yellow]", title="Empty", border_style="yellow"))
+        return
+    mood = pack_entries(store, config, 'journal-mood', newest=newest)
     
-    current_focus = Prompt.ask("[bold cyan]What would you like to focus on? (e.g., 'gratitude', 'goals', 'relationships', 'stress')[/bold cyan]", default="general reflection")
+    current_focus = Prompt.ask("[bold cyan]What would you like to focus on? (e.g., 'gratitude', 'goals', 'relationships', 'stress')[/bold cyan]", default=DEFAULT_FOCUS)
+    ranked = relevant_entries(store, current_focus, since, until, known=newest)
+    suggestions = pack_entries(store, config, 'journal-suggestions', ranked, newest=newest)
+    for label, packed, hint in (("Analysis", analysis, ""), ("Mood", mood, ""),
+                                ("Prompts", suggestions, matched_hint(suggestions, ranked))):
+        console.print(f"[dim]{label} context: {describe(packed, 'entries')}{hint}[/dim]")
+    jobs = [
+        (journal_analysis_prompt(analysis.records), "[bold cyan]📝 AI Journal Analysis:[/bold cyan]", "Personal Insights", "cyan"),
+        (journal_mood_prompt(mood.records), "[bold magenta]💭 Mood Analysis:[/bold magenta]", "Emotional Insights", "magenta"),
+        (journal_suggestions_prompt(suggestions.records, current_focus), "[bold green]✨ Journal Suggestions:[/bold green]", "Writing Prompts", "green"),
+    ]
+    concurrency = max(1, int(config.get('ai_concurrency', 3)))
     
-    prompt = f"""Based on this focus area: "{current_focus}"
+    console.print(Panel(f"[bold yellow]🤖 Running {len(jobs)} journal analyses ({concurrency} at a time)...[/bold yellow]", border_style="yellow"))
+    start = time.perf_counter()
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(generate_ai_content, prompt): (heading, title, border_style)
+                   for prompt, heading, title, border_style in jobs}
+        for future in as_completed(futures):
+            heading, title, border_style = futures[future]
+            elapsed = time.perf_counter() - start
+            try:
+                console.print(Panel(f"{heading}\n\n{future.result()}", title=title, border_style=border_style,
+                                    subtitle=f"[dim]{elapsed:.2f}s[/dim]"))
+            except Exception as e:
+                console.print(Panel.fit(f"[red]{title} failed: {str(e)}[/red]", title="Error", border_style="red"))
+    console.print(f"[dim]All journal analyses finished in {time.perf_counter() - start:.2f}s[/dim]")
 
-Recent journal context:
-{context if context else "No recent entries"}
+def journal_chunks(store, max_chars=CHUNK_MAX_CHARS, since=None, until=None):
+    """Yield (label, text) chunks of the journal (or of a date range), one calendar month at a time.
+
+    Months longer than max_chars are split into parts. Boundaries only depend
+    on the entries before them, so appending new entries changes the last
+    chunk and leaves every earlier chunk (and its cached summary) intact.
+    """
+    month, part, lines, size = None, 1, [], 0
+    entries = store.entries_between(since, until) if since or until else store.iter_entries()
+    for entry in entries:
+        line = f"[{entry.date}] {entry.text}\n"
+        entry_month = entry.date[:7]
+        if lines and (entry_month != month or size + len(line) > max_chars):
+            yield (month if part == 1 else f"{month} (part {part})"), ''.join(lines)
+            part = part + 1 if entry_month == month else 1
+            lines, size = [], 0
+        month = entry_month
+        lines.append(line)
+        size += len(line)
+    if lines:
+        yield (month if part == 1 else f"{month} (part {part})"), ''.join(lines)
+
+def chunk_summary_prompt(label, text):
+    return f"""Summarize these journal entries from {label} for a later whole-history review:
+
+{text}
+
+In under 200 words, note the main events, recurring themes, overall mood and
+any goals, struggles or progress. Keep dates where they matter."""
+
+def period_summary_prompt(summaries):
+    joined = "\n\n".join(f"### {label}\n{summary}" for label, summary in summaries)
+    return f"""Combine these consecutive journal period summaries into one summary of the whole span:
+
+{joined}
+
+In under 300 words, keep the chronology, the main themes, mood changes and
+progress on goals."""
+
+def history_report_prompt(summaries):
+    joined = "\n\n".join(f"### {label}\n{summary}" for label, summary in summaries)
+    return f"""These are chronological summaries covering someone's entire journal history:
+
+{joined}
 
 Please provide:
-1. **5 Thoughtful Journal Prompts** related to the focus area
-2. **Self-Reflection Questions** for deeper thinking
-3. **Mindfulness Suggestions** for present-moment awareness
-4. **Growth Opportunities** to explore
-5. **Gratitude Prompts** to appreciate positive aspects
+1. **Life Timeline**: The major phases and turning points
+2. **Long-term Mood Trends**: How wellbeing has changed over time
+3. **Recurring Themes**: Topics and concerns that keep coming back
+4. **Growth & Progress**: Skills, habits and goals that moved forward
+5. **Persistent Challenges**: What has stayed hard
+6. **Reflection Questions**: 2-3 questions looking at the bigger picture
+7. **Gentle Suggestions**: Supportive recommendations going forward
 
-Make the suggestions personal, meaningful, and encouraging for self-discovery."""
+Be empathetic, supportive, and insightful."""
+
+def summarize_prompts(prompts, summaries, provider, model_name, concurrency):
+    """Return summaries for [(label, prompt)], calling the AI only for uncached prompts"""
+    from ai_cache import cache_key
+    results = {}
+    pending = []
+    for label, prompt in prompts:
+        key = cache_key(provider, model_name, prompt)
+        summary = summaries.get(key)
+        if summary is None:
+            pending.append((label, key, prompt))
+        else:
+            results[label] = summary
+    if pending:
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(generate_ai_content, prompt, False): (label, key)
+                       for label, key, prompt in pending}
+            for future in as_completed(futures):
+                label, key = futures[future]
+                results[label] = future.result()
+                summaries.put(key, results[label])
+    return [(label, results[label]) for label, _ in prompts], len(pending)
 
+def ai_journal_history(since=None, until=None):
+    """Analyze the whole journal (or a date range) by summarizing it chunk by chunk and combining the summaries"""
+    from ai_cache import SummaryCache
+    if not setup_gemini_api():
+        return
+    
+    store = get_store()
+    if not store.journal_exists():
+        console.print(Panel.fit("[red]No journal entries found to analyze.[/red]", title="No Entries", border_style="red"))
+        return
+    
+    config = load_config()
+    provider = config.get('api_provider', 'gemini')
+    model_name = ai_model_name(config, provider)
+    concurrency = max(1, int(config.get('ai_concurrency', 3)))
+    prompts = [(label, chunk_summary_prompt(label, text))
+               for label, text in journal_chunks(store, config.get('chunk_max_chars', CHUNK_MAX_CHARS), since, until)]
+    if not prompts:
+        console.print(Panel.fit("[yellow]No journal entries to analyze.[/yellow]", title="Empty", border_style="yellow"))
+        return
+    
+    summaries = SummaryCache(AI_CACHE_FILE)
     try:
-        console.print(Panel("[bold yellow]🤖 AI is creating personalized journal prompts...[/bold yellow]", border_style="yellow"))
-        ai_response = generate_ai_content(prompt)
-        console.print(Panel(f"[bold green]✨ Journal Suggestions:[/bold green]\n\n{ai_response}", title="Writing Prompts", border_style="green"))
+        console.print(Panel(f"[bold yellow]🤖 Summarizing {len(prompts)} journal chunks...[/bold yellow]", border_style="yellow"))
+        level, new = summarize_prompts(prompts, summaries, provider, model_name, concurrency)
+        console.print(f"[dim]{new} new or changed chunk(s) summarized, {len(prompts) - new} reused[/dim]")
+        # Fold long histories down level by level until one prompt can hold them
+        while len(level) > REDUCE_FAN_IN:
+            groups = [level[i:i + REDUCE_FAN_IN] for i in range(0, len(level), REDUCE_FAN_IN)]
+            prompts = [(f"{group[0][0]} – {group[-1][0]}", period_summary_prompt(group)) for group in groups]
+            level, _ = summarize_prompts(prompts, summaries, provider, model_name, concurrency)
+        
+        show_ai_response(history_report_prompt(level), "[bold cyan]📚 Whole-History Journal Analysis:[/bold cyan]",
+                         "Personal Insights", "cyan", "🤖 AI is combining your journal history...", "journal-history")
     except Exception as e:
-        console.print(Panel.fit(f"[red]Suggestion generation failed: {str(e)}[/red]", title="Error", border_style="red"))
+        console.print(Panel.fit(f"[red]History analysis failed: {str(e)}[/red]", title="Error", border_style="red"))
+    finally:
+        summaries.close()
 
 def journal_ai_menu():
     """AI menu specifically for journal analysis"""
     console.print(Panel("[bold cyan]📝 AI Journal Assistant[/bold cyan]", border_style="cyan"))
     while True:
         choice = Prompt.ask(
-            "[bold cyan]Journal AI: analyze, mood, prompts, back[/bold cyan]", 
-            choices=["analyze", "mood", "prompts", "back"], 
+            "[bold cyan]Journal AI: analyze, history, mood, prompts, all, back[/bold cyan]", 
+            choices=["analyze", "history", "mood", "prompts", "all", "back"], 
             default="analyze"
         )
         
@@ -416,6 +974,10 @@ def journal_ai_menu():
             ai_journal_mood_tracker()
         elif choice == "prompts":
             ai_journal_suggestions()
+        elif choice == "all":
+            ai_journal_all()
+        elif choice == "history":
+            ai_journal_history()
         elif choice == "back":
             break
 
@@ -450,157 +1012,411 @@ def add_entry():
     entries_input = Prompt.ask("[bold cyan]Enter your journal entries (comma separated for multiple)[/bold cyan]")
     entries = [e.strip() for e in entries_input.split(',') if e.strip()]
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
-    with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
-        for entry_text in entries:
-            f.write(f'{timestamp}|{entry_text}\n')
+    store = get_store()
+    store.add_entries(timestamp, entries)
+    refresh_search_index(store)
+    refresh_vector_index(store)
+    refresh_stats(store)
     console.print(Panel.fit(f"[green]{len(entries)} Entry(ies) added![/green]", title="Success", border_style="green"))
 
-def show_entries():
-    if not os.path.exists(JOURNAL_FILE):
-        console.print(Panel.fit("[red]No journal entries found.[/red]", title="Oops!", border_style="red"))
+def timed(op, call):
+    """Wrap call so that every invocation is recorded as a metrics span"""
+    from metrics import span
+    def timed_call(*args):
+        with span(op) as record:
+            result = call(*args)
+            if isinstance(result, list):
+                record['rows'] = len(result)
+            return result
+    return timed_call
+
+def paged_view(fetch_from, fetch_before, position_of, render, find_date=None, name='page'):
+    """Page through records, holding at most one page in memory.
+
+    ``fetch_from(position, n)`` returns up to n records starting at a position
+    and ``fetch_before(position, n)`` the n records just before it, with None
+    meaning the start/end. ``render(records, first_number)`` prints one page;
+    ``first_number`` is None after jumping somewhere whose row number is unknown.
+    Reads and renders are timed as ``<name>.read`` and ``<name>.render`` spans.
+    """
+    fetch_from, fetch_before, render = (timed(f'{name}.read', fetch_from), timed(f'{name}.read', fetch_before),
+                                        timed(f'{name}.render', render))
+    if find_date:
+        find_date = timed(f'{name}.find_date', find_date)
+    page_size = load_config().get('page_size', PAGE_SIZE)
+    # One extra record tells us whether there is a next page and where it starts
+    window = fetch_from(None, page_size + 1)
+    first_number = 1
+    if len(window) <= page_size:
+        render(window, first_number)
         return
-    table = Table(title="Your Journal Entries", show_lines=True, header_style="bold magenta")
+    choices = ["next", "prev", "first", "last"] + (["date"] if find_date else []) + ["quit"]
+    while True:
+        page, following = window[:page_size], window[page_size:]
+        render(page, first_number)
+        action = Prompt.ask(
+            f"[bold bright_green]Pages: {', '.join(choices)}[/bold bright_green]",
+            choices=choices,
+            default="next" if following else "quit"
+        )
+        if action == "next":
+            if following:
+                window = fetch_from(position_of(following[0]), page_size + 1)
+                first_number = first_number + len(page) if first_number else None
+        elif action == "prev":
+            earlier = fetch_before(position_of(page[0]) if page else None, page_size)
+            if earlier:
+                window = earlier + page[:1]
+                first_number = first_number - len(earlier) if first_number else None
+        elif action == "first":
+            window = fetch_from(None, page_size + 1)
+            first_number = 1
+        elif action == "last":
+            window = fetch_before(None, page_size)
+            first_number = None
+        elif action == "date":
+            date = Prompt.ask("[bold cyan]Jump to date (YYYY-MM-DD)[/bold cyan]")
+            try:
+                datetime.strptime(date.strip()[:10], '%Y-%m-%d')
+            except ValueError:
+                console.print(Panel.fit("[red]Invalid date. Use YYYY-MM-DD.[/red]", title="Error", border_style="red"))
+                continue
+            window = fetch_from(find_date(date.strip()), page_size + 1)
+            first_number = None
+        elif action == "quit":
+            break
+
+def entries_table(entries):
+    table = Table(title="Your Journal Entries", show_lines=True, header_style="bold magenta",
+                  caption=f"[dim]{entries[0].date} → {entries[-1].date}[/dim]")
     table.add_column("Date", style="cyan", width=18)
     table.add_column("Entry", style="white")
-    with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        if not lines:
-            console.print(Panel.fit("[yellow]No journal entries yet.[/yellow]", title="Empty", border_style="yellow"))
+    for entry in entries:
+        table.add_row(entry.date, entry.text)
+    return table
+
+def tasks_table(tasks, title="Your Tasks"):
+    table = Table(title=f"[bold bright_green]{title}[/bold bright_green]", show_lines=True, header_style="bold bright_green")
+    table.add_column("ID", style="bold bright_green", width=6)
+    table.add_column("Priority", style="bold yellow", width=10)
+    table.add_column("Task", style="white")
+    table.add_column("Status", style="bold cyan", width=10)
+    for task in tasks:
+        table.add_row(str(task.id), task.priority, task.description, task.status)
+    return table
+
+def show_entries():
+    store = get_store()
+    if not store.journal_exists():
+        console.print(Panel.fit("[red]No journal entries found.[/red]", title="Oops!", border_style="red"))
+        return
+
+    def render(entries, first_number):
+        if not entries:
+            message = "No journal entries yet." if first_number == 1 else "No entries on this page."
+            console.print(Panel.fit(f"[yellow]{message}[/yellow]", title="Empty", border_style="yellow"))
             return
-        for line in lines:
-            if '|' in line:
-                date, entry = line.strip().split('|', 1)
-                table.add_row(date, entry)
-    console.print(table)
+        console.print(entries_table(entries))
+
+    paged_view(store.entries_from, store.entries_before, store.position_of, render,
+               find_date=store.entry_position_for_date, name='show')
 
 def delete_entry():
-    if not os.path.exists(JOURNAL_FILE):
+    from journal_stats import open_stats
+    from mood_series import mark_days_stale
+    store = get_store()
+    if not store.journal_exists():
         console.print(Panel.fit("[red]No journal entries found.[/red]", title="Oops!", border_style="red"))
         return
-    with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
-        lines = [line for line in f if '|' in line]
-    if not lines:
+    entries = list(store.iter_entries())
+    if not entries:
         console.print(Panel.fit("[yellow]No journal entries yet.[/yellow]", title="Empty", border_style="yellow"))
         return
     table = Table(title="[bold green]Select Entry(ies) to Delete[/bold green]", show_lines=True, header_style="bold green", style="bold bright_green")
     table.add_column("No.", style="bold bright_green", width=5)
     table.add_column("Date", style="bold bright_green", width=18)
     table.add_column("Entry", style="bold bright_green")
-    for idx, line in enumerate(lines, 1):
-        date, entry = line.strip().split('|', 1)
-        table.add_row(str(idx), date, entry)
+    for idx, entry in enumerate(entries, 1):
+        table.add_row(str(idx), entry.date, entry.text)
     console.print(table)
     choices = Prompt.ask("[bold bright_green]Enter entry numbers to delete (comma separated)[/bold bright_green]", default="1")
     try:
         indices = sorted(set(int(i.strip()) for i in choices.split(',') if i.strip()), reverse=True)
-        for idx in indices:
-            if 1 <= idx <= len(lines):
-                del lines[idx - 1]
-        with open(JOURNAL_FILE, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
-        console.print(Panel.fit(f"[green]Deleted entries: {', '.join(map(str, indices))}![/green]", title="Deleted", border_style="green"))
+        selected = [entries[idx - 1] for idx in indices if 1 <= idx <= len(entries)]
+        index = open_search_index(store)
+        with open_stats(STATS_FILE, store) as stats:
+            removed = store.delete_entries(selected)
+            stats.remove_entries(removed)
+        index.remove('entry', removed)
+        index.close()
+        # Days that lost entries are scored again on the next mood run
+        mark_days_stale(MOOD_DIGESTS_FILE, {entry.date[:10] for entry in removed})
+        removed_ids = {entry.id for entry in removed}
+        deleted_numbers = [idx for idx in indices if 1 <= idx <= len(entries) and entries[idx - 1].id in removed_ids]
+        if deleted_numbers:
+            console.print(Panel.fit(f"[green]Deleted entries: {', '.join(map(str, deleted_numbers))}![/green]", title="Deleted", border_style="green"))
+        if len(removed) < len(selected):
+            console.print(Panel.fit(f"[yellow]{len(selected) - len(removed)} entry(ies) changed since they were listed "
+                                    f"(another session may have deleted or compacted them) and were left alone.[/yellow]",
+                                    title="Skipped", border_style="yellow"))
     except ValueError:
         console.print(Panel.fit("[red]Invalid input.[/red]", title="Error", border_style="red"))
 
+def search_entries():
+    """Full-text search over journal entries and task descriptions"""
+    query = Prompt.ask('[bold cyan]Search for (wrap phrases in "double quotes")[/bold cyan]')
+    if not query.strip():
+        console.print(Panel.fit("[red]Search query required.[/red]", border_style="red"))
+        return
+    index = open_search_index(get_store())
+    start = time.perf_counter()
+    hits = index.search(query, limit=20)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    index.close()
+    if not hits:
+        console.print(Panel.fit(f"[yellow]No matches for: {query}[/yellow]", title="Search", border_style="yellow"))
+        return
+    table = Table(title=f"Search Results: {query}", show_lines=True, header_style="bold magenta")
+    table.add_column("No.", style="bold bright_green", width=5)
+    table.add_column("Type", style="bold yellow", width=7)
+    table.add_column("Date / Priority", style="cyan", width=18)
+    table.add_column("Text", style="white")
+    table.add_column("Score", style="dim", width=7)
+    for idx, hit in enumerate(hits, 1):
+        table.add_row(str(idx), hit.kind, hit.label, hit.text, f"{hit.score:.2f}")
+    console.print(table)
+    console.print(f"[dim]{len(hits)} match(es) in {elapsed_ms:.1f} ms[/dim]")
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 2 * 86400:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+def compute_stats(store):
+    """Sync the aggregates and summarize them; None (after reporting why) without NumPy"""
+    from journal_stats import open_stats, summarize
+    try:
+        import numpy
+    except ImportError:
+        console.print(Panel.fit("[red]NumPy is required for stats. Run: pip install numpy[/red]", title="Missing Dependency", border_style="red"))
+        return None
+    with open_stats(STATS_FILE, store) as stats:
+        return summarize(stats, datetime.now().date())
+
+def show_stats():
+    """Writing and task statistics from the incrementally maintained aggregates"""
+    start = time.perf_counter()
+    summary = compute_stats(get_store())
+    if summary is not None:
+        render_stats(summary, (time.perf_counter() - start) * 1000)
+
+def render_stats(summary, elapsed_ms):
+    if summary['entries']:
+        console.print(Panel.fit(
+            f"[cyan]Entries:[/cyan] [green]{summary['entries']:,}[/green] on {summary['days_written']:,} day(s) since {summary['first_day']} "
+            f"[dim]({summary['average_per_day']} per writing day)[/dim]\n"
+            f"[cyan]Current streak:[/cyan] [green]{summary['streak']}[/green] day(s)   "
+            f"[cyan]Longest streak:[/cyan] [green]{summary['longest_streak']}[/green] day(s)",
+            title="📊 Writing", border_style="cyan"
+        ))
+        top = max([day['entries'] for day in summary['recent_days']] + [1])
+        days = Table(title="Last 14 Days", show_lines=False)
+        days.add_column("Date", style="cyan")
+        days.add_column("Entries", style="green")
+        for day in summary['recent_days']:
+            days.add_row(day['date'], f"{'█' * round(10 * day['entries'] / top)} {day['entries']}")
+        console.print(days)
+        weeks = "\n".join(f"[cyan]Week of {week['week']}:[/cyan] [green]{week['entries']}[/green]" for week in summary['weeks'])
+        console.print(Panel.fit(weeks, title="Entries per Week", border_style="cyan"))
+    else:
+        console.print(Panel.fit("[yellow]No journal entries yet.[/yellow]", title="Writing", border_style="yellow"))
+    
+    table = Table(title="✅ Tasks by Priority", show_lines=False)
+    table.add_column("Priority", style="bold yellow")
+    table.add_column("Open", style="white")
+    table.add_column("Done", style="green")
+    table.add_column("Completion", style="magenta")
+    table.add_column("Median to Done", style="cyan")
+    table.add_column("P90 to Done", style="cyan")
+    for priority in PRIORITIES + ('all',):
+        counts = summary['tasks'][priority]
+        timing = summary['time_to_done'].get(priority)
+        table.add_row(priority, f"{counts['open']:,}", f"{counts['done']:,}", f"{counts['completion_rate']:.0%}",
+                      format_duration(timing['median_s']) if timing else "-",
+                      format_duration(timing['p90_s']) if timing else "-")
+    console.print(table)
+    console.print(f"[dim]Time to done covers tasks added since stats were first collected. Computed in {elapsed_ms:.1f} ms[/dim]")
+
+def show_metrics(op=None):
+    """Latency percentiles per operation from the recorded metrics spans"""
+    from metrics import METRICS, summarize as summarize_metrics
+    summary = {name: row for name, row in summarize_metrics(METRICS.load()).items() if not op or name.startswith(op)}
+    if not summary:
+        console.print(Panel.fit("[yellow]No metrics recorded yet. Run a few commands first.[/yellow]", title="Metrics", border_style="yellow"))
+        return summary
+    table = Table(title="⏱ Metrics", show_lines=False)
+    table.add_column("Operation", style="cyan", no_wrap=True)
+    table.add_column("Count", style="white", justify="right")
+    for column in ("p50", "p95", "p99", "Max"):
+        table.add_column(column, style="green", justify="right")
+    table.add_column("Errors", style="red", justify="right")
+    table.add_column("Tokens In/Out", style="magenta", justify="right")
+    table.add_column("Cache Hits", style="yellow", justify="right")
+    for name, row in summary.items():
+        looked_up = row['cache_hits'] + row['cache_misses']
+        table.add_row(
+            name, f"{row['count']:,}",
+            *(format_ms(row[key]) for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')),
+            str(row['errors'] or "-"),
+            f"{row['tokens_in']:,} / {row['tokens_out']:,}" if row['tokens_in'] or row['tokens_out'] else "-",
+            f"{row['cache_hits']}/{looked_up} ({row['cache_hits'] / looked_up:.0%})" if looked_up else "-",
+        )
+    console.print(table)
+    console.print(f"[dim]From {', '.join(METRICS.files())}[/dim]")
+    return summary
+
+def format_ms(ms):
+    return f"{ms / 1000:.2f} s" if ms >= 1000 else f"{ms:.1f} ms"
+
 def add_task():
     tasks_input = Prompt.ask("[bold cyan]Enter your tasks (comma separated for multiple)[/bold cyan]")
     priority = Prompt.ask("[bold yellow]Priority (high/medium/low)[/bold yellow]", choices=["high", "medium", "low"], default="medium")
     tasks = [t.strip() for t in tasks_input.split(',') if t.strip()]
-    with open(TASK_FILE, 'a', encoding='utf-8') as f:
-        for task in tasks:
-            f.write(f'{priority}|{task}|not done\n')
+    store = get_store()
+    store.add_tasks(priority, tasks)
+    refresh_search_index(store)
+    refresh_stats(store)
     console.print(Panel.fit(f"[green]{len(tasks)} Task(s) added with {priority} priority![/green]", title="Task Added", border_style="green"))
 
-def show_tasks():
-    if not os.path.exists(TASK_FILE):
+def show_tasks(status=None, priority=None):
+    store = get_store()
+    if not store.tasks_exist():
         console.print(Panel.fit("[red]No tasks found.[/red]", title="Oops!", border_style="red"))
         return
+    filters = ", ".join(value for value in (status, priority) if value)
+
+    def render(tasks, first_number):
+        if not tasks:
+            message = "No tasks yet." if first_number == 1 else "No tasks on this page."
+            if filters and first_number == 1:
+                message = f"No tasks matching: {filters}"
+            console.print(Panel.fit(f"[yellow]{message}[/yellow]", title="Empty", border_style="yellow"))
+            return
+        console.print(tasks_table(tasks, f"Your Tasks ({filters})" if filters else "Your Tasks"))
+
+    paged_view(lambda position, n: store.tasks_from(position, n, status, priority),
+               lambda position, n: store.tasks_before(position, n, status, priority),
+               store.position_of, render, name='task.list')
+
+def list_tasks():
+    """Print every task as a numbered table and return the tasks for selection"""
+    store = get_store()
+    if not store.tasks_exist():
+        console.print(Panel.fit("[red]No tasks found.[/red]", title="Oops!", border_style="red"))
+        return []
     table = Table(title="[bold bright_green]Your Tasks[/bold bright_green]", show_lines=True, header_style="bold bright_green")
     table.add_column("No.", style="bold bright_green", width=5)
     table.add_column("Priority", style="bold yellow", width=10)
     table.add_column("Task", style="white")
     table.add_column("Status", style="bold cyan", width=10)
-    with open(TASK_FILE, 'r', encoding='utf-8') as f:
-        lines = [line for line in f if line.count('|') == 2]
-    if not lines:
+    tasks = list(store.iter_tasks())
+    if not tasks:
         console.print(Panel.fit("[yellow]No tasks yet.[/yellow]", title="Empty", border_style="yellow"))
-        return
-    for idx, line in enumerate(lines, 1):
-        try:
-            priority, task, status = line.strip().split('|', 2)
-        except ValueError:
-            continue  # skip malformed lines
-        table.add_row(str(idx), priority, task, status)
+        return tasks
+    for idx, task in enumerate(tasks, 1):
+        table.add_row(str(idx), task.priority, task.description, task.status)
     console.print(table)
+    return tasks
 
 def delete_task():
-    if not os.path.exists(TASK_FILE):
+    from journal_stats import open_stats
+    store = get_store()
+    if not store.tasks_exist():
         console.print(Panel.fit("[red]No tasks found.[/red]", title="Oops!", border_style="red"))
         return
-    show_tasks()
-    with open(TASK_FILE, 'r', encoding='utf-8') as f:
-        lines = [line for line in f if line.count('|') == 2]
+    tasks = list_tasks()
     choices = Prompt.ask("[bold bright_green]Enter task numbers to delete (comma separated)[/bold bright_green]", default="1")
     try:
         indices = sorted(set(int(i.strip()) for i in choices.split(',') if i.strip()), reverse=True)
-        for idx in indices:
-            if 1 <= idx <= len(lines):
-                del lines[idx - 1]
-        with open(TASK_FILE, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
-        console.print(Panel.fit(f"[green]Deleted tasks: {', '.join(map(str, indices))}![/green]", title="Deleted", border_style="green"))
+        selected = [tasks[idx - 1] for idx in indices if 1 <= idx <= len(tasks)]
+        index = open_search_index(store)
+        with open_stats(STATS_FILE, store) as stats:
+            # Another session may have deleted some since they were listed
+            removed = [task for task in selected if store.get_task(task.id)]
+            store.delete_tasks([task.id for task in removed])
+            stats.remove_tasks(removed)
+        index.remove('task', removed)
+        index.close()
+        removed_ids = {task.id for task in removed}
+        deleted_numbers = [idx for idx in indices if 1 <= idx <= len(tasks) and tasks[idx - 1].id in removed_ids]
+        if deleted_numbers:
+            console.print(Panel.fit(f"[green]Deleted tasks: {', '.join(map(str, deleted_numbers))}![/green]", title="Deleted", border_style="green"))
+        else:
+            console.print(Panel.fit("[yellow]No tasks deleted.[/yellow]", title="Deleted", border_style="yellow"))
     except ValueError:
         console.print(Panel.fit("[red]Invalid input.[/red]", title="Error", border_style="red"))
 
 def mark_task_done():
-    if not os.path.exists(TASK_FILE):
+    from journal_stats import open_stats
+    store = get_store()
+    if not store.tasks_exist():
         console.print(Panel.fit("[red]No tasks found.[/red]", title="Oops!", border_style="red"))
         return
-    with open(TASK_FILE, 'r', encoding='utf-8') as f:
-        lines = [line for line in f if line.count('|') == 2]
-    not_done_lines = [line for line in lines if line.strip().endswith('|not done')]
-    if not not_done_lines:
+    not_done_tasks = list(store.iter_tasks(status='not done'))
+    if not not_done_tasks:
         console.print(Panel.fit("[yellow]No incomplete tasks to mark as done.[/yellow]", title="All Done", border_style="yellow"))
         return
     table = Table(title="[bold bright_green]Mark Task(s) as Done[/bold bright_green]", show_lines=True, header_style="bold bright_green")
     table.add_column("No.", style="bold bright_green", width=5)
     table.add_column("Priority", style="bold yellow", width=10)
     table.add_column("Task", style="white")
-    for idx, line in enumerate(not_done_lines, 1):
-        priority, task, status = line.strip().split('|', 2)
-        table.add_row(str(idx), priority, task)
+    for idx, task in enumerate(not_done_tasks, 1):
+        table.add_row(str(idx), task.priority, task.description)
     console.print(table)
     choices = Prompt.ask("[bold bright_green]Enter task numbers to mark as done (comma separated)[/bold bright_green]", default="1")
     try:
         indices = sorted(set(int(i.strip()) for i in choices.split(',') if i.strip()), reverse=True)
+        updates = {}
         for idx in indices:
-            if 1 <= idx <= len(not_done_lines):
-                full_idx = lines.index(not_done_lines[idx - 1])
-                priority, task, _ = lines[full_idx].strip().split('|', 2)
-                lines[full_idx] = f'{priority}|{task}|done\n'
-        with open(TASK_FILE, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
+            if 1 <= idx <= len(not_done_tasks):
+                updates[not_done_tasks[idx - 1].id] = {'status': 'done'}
+        with open_stats(STATS_FILE, store) as stats:
+            # Another session may have deleted or edited some since they were listed
+            before = [task for task in map(store.get_task, updates) if task]
+            store.update_tasks(updates)
+            stats.update_tasks(before, updates)
         console.print(Panel.fit(f"[green]Marked as done: {', '.join(map(str, indices))}![/green]", title="Done", border_style="green"))
     except ValueError:
         console.print(Panel.fit("[red]Invalid input.[/red]", title="Error", border_style="red"))
 
 def prioritise_task():
-    if not os.path.exists(TASK_FILE):
+    from journal_stats import open_stats
+    store = get_store()
+    if not store.tasks_exist():
         console.print(Panel.fit("[red]No tasks found.[/red]", title="Oops!", border_style="red"))
         return
-    show_tasks()
-    with open(TASK_FILE, 'r', encoding='utf-8') as f:
-        lines = [line for line in f if line.count('|') == 2]
+    tasks = list_tasks()
     choices = Prompt.ask("[bold bright_green]Enter task numbers to prioritise (comma separated)[/bold bright_green]", default="1")
     try:
         indices = sorted(set(int(i.strip()) for i in choices.split(',') if i.strip()))
+        updates = {}
         for idx in indices:
-            if 1 <= idx <= len(lines):
-                _, task, status = lines[idx - 1].strip().split('|', 2)
+            if 1 <= idx <= len(tasks):
                 new_priority = Prompt.ask("[bold yellow]New Priority (high/medium/low)[/bold yellow]", choices=["high", "medium", "low"], default="medium")
-                lines[idx - 1] = f'{new_priority}|{task}|{status}\n'
-        with open(TASK_FILE, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
+                updates[tasks[idx - 1].id] = {'priority': new_priority}
+        with open_stats(STATS_FILE, store) as stats:
+            # Another session may have deleted or edited some since they were listed
+            before = [task for task in map(store.get_task, updates) if task]
+            store.update_tasks(updates)
+            stats.update_tasks(before, updates)
+        # Search results show each task's priority
+        index = open_search_index(store)
+        index.relabel('task', [task._replace(**updates[task.id]) for task in before])
+        index.close()
         console.print(Panel.fit(f"[green]Prioritised tasks: {', '.join(map(str, indices))}![/green]", title="Prioritised", border_style="green"))
     except ValueError:
         console.print(Panel.fit("[red]Invalid input.[/red]", title="Error", border_style="red"))
@@ -615,11 +1431,15 @@ def task_manager():
     
     # Manual task management
     while True:
-        action = Prompt.ask("[bold bright_green]Task Manager: add, show, delete, prioritise, done, back[/bold bright_green]", choices=["add", "show", "delete", "prioritise", "done", "back"], default="show")
+        action = Prompt.ask("[bold bright_green]Task Manager: add, show, filter, delete, prioritise, done, back[/bold bright_green]", choices=["add", "show", "filter", "delete", "prioritise", "done", "back"], default="show")
         if action == "add":
             add_task()
         elif action == "show":
             show_tasks()
+        elif action == "filter":
+            status = Prompt.ask("[bold cyan]Status (any/not done/done)[/bold cyan]", choices=["any", "not done", "done"], default="not done")
+            priority = Prompt.ask("[bold yellow]Priority (any/high/medium/low)[/bold yellow]", choices=["any", "high", "medium", "low"], default="any")
+            show_tasks(None if status == "any" else status, None if priority == "any" else priority)
         elif action == "delete":
             delete_task()
         elif action == "prioritise":
@@ -629,13 +1449,27 @@ def task_manager():
         elif action == "back":
             break
 
+def migrate_storage():
+    """Copy journal.txt/tasks.txt into the SQLite database and switch backends"""
+    console.print(Panel("[bold yellow]Migrating flat files into SQLite...[/bold yellow]", border_style="yellow"))
+    try:
+        entry_count, task_count = migrate_flat_to_sqlite(JOURNAL_FILE, TASK_FILE, DB_FILE)
+    except ValueError as e:
+        console.print(Panel.fit(f"[red]{str(e)}[/red]", title="Migration Skipped", border_style="red"))
+        return False
+    config = load_config()
+    config['storage_backend'] = 'sqlite'
+    save_config(config)
+    console.print(Panel.fit(f"[green]Migrated {entry_count} entries and {task_count} tasks into {DB_FILE}![/green]", title="Migration Complete", border_style="green"))
+    return True
+
 def config_menu():
     """Direct access to configuration options"""
     console.print(Panel("[bold cyan]⚙️ Configuration Menu[/bold cyan]", border_style="cyan"))
     while True:
         choice = Prompt.ask(
-            "[bold cyan]Config Options: provider, api, model, file, reset, view, back[/bold cyan]", 
-            choices=["provider", "api", "model", "file", "reset", "view", "back"], 
+            "[bold cyan]Config Options: provider, api, model, file, storage, cache, verify, reset, view, back[/bold cyan]", 
+            choices=["provider", "api", "model", "file", "storage", "cache", "verify", "reset", "view", "back"], 
             default="provider"
         )
         
@@ -644,8 +1478,8 @@ def config_menu():
             current_provider = config.get('api_provider', 'gemini')
             console.print(f"Current AI Provider: [bold green]{current_provider}[/bold green]")
             provider = Prompt.ask(
-                "[bold cyan]Select AI Provider (gemini, openrouter)[/bold cyan]",
-                choices=["gemini", "openrouter"],
+                "[bold cyan]Select AI Provider (gemini, openrouter, local)[/bold cyan]",
+                choices=["gemini", "openrouter", "local"],
                 default=current_provider
             )
             config['api_provider'] = provider
@@ -655,7 +1489,9 @@ def config_menu():
         elif choice == "api":
             config = load_config()
             provider = config.get('api_provider', 'gemini')
-            if provider == "gemini":
+            if provider == "local":
+                console.print(Panel("[yellow]The local provider runs offline and needs no API key.[/yellow]", border_style="yellow"))
+            elif provider == "gemini":
                 console.print(Panel("[bold yellow]Setting up Gemini AI API Key[/bold yellow]", border_style="yellow"))
                 console.print("[cyan]Get your API key from: https://makersuite.google.com/app/apikey[/cyan]")
                 console.print("[dim]Tip: Use Ctrl+V to paste your API key[/dim]")
@@ -691,7 +1527,9 @@ def config_menu():
         elif choice == "model":
             config = load_config()
             provider = config.get('api_provider', 'gemini')
-            if provider == "gemini":
+            if provider == "local":
+                console.print(Panel("[yellow]The local provider uses its built-in mood lexicon and keyword analysis.[/yellow]", border_style="yellow"))
+            elif provider == "gemini":
                 console.print(Panel("[yellow]Gemini provider uses default model gemini-3.5-flash (configured in code).[/yellow]", border_style="yellow"))
             else:
                 current_model = config.get('openrouter_model', 'anthropic/claude-sonnet-4')
@@ -712,6 +1550,9 @@ def config_menu():
         elif choice == "file":
             config = load_config()
             provider = config.get('api_provider', 'gemini')
+            if provider == "local":
+                console.print(Panel("[yellow]The local provider runs offline and needs no API key.[/yellow]", border_style="yellow"))
+                continue
             console.print(Panel("[bold yellow]Load API Key from File[/bold yellow]", border_style="yellow"))
             console.print("[cyan]1. Create a text file named 'api_key.txt' in this directory[/cyan]")
             console.print("[cyan]2. Paste your API key into that file and save it[/cyan]")
@@ -741,6 +1582,49 @@ def config_menu():
             else:
                 console.print(Panel.fit("[red]File 'api_key.txt' not found[/red]", border_style="red"))
                 
+        elif choice == "storage":
+            config = load_config()
+            current_backend = config.get('storage_backend', 'flat')
+            console.print(f"Current Storage Backend: [bold green]{current_backend}[/bold green]")
+            backend = Prompt.ask(
+                "[bold cyan]Select Storage Backend (flat, sqlite)[/bold cyan]",
+                choices=list(BACKENDS),
+                default=current_backend
+            )
+            if backend == 'sqlite' and not os.path.exists(DB_FILE):
+                if Prompt.ask(f"[bold yellow]Migrate existing {JOURNAL_FILE} and {TASK_FILE} into {DB_FILE}? (y/n)[/bold yellow]", choices=["y", "n"], default="y") == "y":
+                    migrate_storage()
+                    continue
+            config['storage_backend'] = backend
+            save_config(config)
+            console.print(Panel.fit(f"[green]Storage backend set to {backend}![/green]", title="Success", border_style="green"))
+                
+        elif choice == "cache":
+            config = load_config()
+            cache = open_ai_cache(config)
+            stats = cache.stats()
+            lookups = stats['hits'] + stats['misses']
+            hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+            enabled = config.get('ai_cache_enabled', True)
+            console.print(Panel.fit(
+                f"[cyan]Enabled:[/cyan] [green]{'yes' if enabled else 'no'}[/green]\n"
+                f"[cyan]Hits / Misses:[/cyan] [green]{stats['hits']} / {stats['misses']} ({hit_rate})[/green]\n"
+                f"[cyan]Entries:[/cyan] [green]{stats['entries']} ({stats['bytes'] / 1024:.1f} KB)[/green]",
+                title="AI Response Cache", border_style="green"
+            ))
+            cache_action = Prompt.ask("[bold cyan]Cache: toggle, clear, back[/bold cyan]", choices=["toggle", "clear", "back"], default="back")
+            if cache_action == "toggle":
+                config['ai_cache_enabled'] = not enabled
+                save_config(config)
+                console.print(Panel.fit(f"[green]AI cache {'enabled' if not enabled else 'disabled'}![/green]", title="Success", border_style="green"))
+            elif cache_action == "clear":
+                cache.clear()
+                console.print(Panel.fit("[green]AI cache cleared![/green]", title="Success", border_style="green"))
+            cache.close()
+                
+        elif choice == "verify":
+            verify_api_config()
+                
         elif choice == "reset":
             config = load_config()
             provider = config.get('api_provider', 'gemini')
@@ -759,25 +1643,373 @@ def config_menu():
             config = load_config()
             provider = config.get('api_provider', 'gemini')
             
-            env_key_name = 'GEMINI_API_KEY' if provider == 'gemini' else 'OPENROUTER_API_KEY'
-            key_name = 'gemini_api_key' if provider == 'gemini' else 'openrouter_api_key'
-            key_val = os.getenv(env_key_name) or config.get(key_name)
-            env_indicator = " (from env)" if os.getenv(env_key_name) else ""
+            key_val = CONFIG.api_key(config, provider)
+            env_indicator = " (from env)" if CONFIG.env_api_key(provider) else ""
             masked_key = key_val[:8] + "..." + key_val[-4:] + env_indicator if key_val and len(key_val) > 12 else ("***" + env_indicator if key_val else "Not configured")
             
             model_display = "gemini-3.5-flash (default)" if provider == "gemini" else config.get('openrouter_model', 'anthropic/claude-sonnet-4')
+            if provider == "local":
+                masked_key = "Not needed"
+                model_display = f"{LOCAL_MODEL} (offline)"
             
             info_panel = f"[cyan]Provider:[/cyan] [green]{provider}[/green]\n" \
                          f"[cyan]Active Model:[/cyan] [green]{model_display}[/green]\n" \
-                         f"[cyan]API Key:[/cyan] [green]{masked_key}[/green]"
+                         f"[cyan]API Key:[/cyan] [green]{masked_key}[/green]\n" \
+                         f"[cyan]Storage:[/cyan] [green]{config.get('storage_backend', 'flat')}[/green]"
             
             console.print(Panel.fit(info_panel, title="Current Configuration", border_style="green"))
             
         elif choice == "back":
             break
 
+INTERACTIVE_COMMANDS = ('add', 'show', 'delete', 'search', 'stats', 'metrics', 'task', 'ai', 'journal-ai',
+                        'config', 'migrate', 'exit', '404')
+BATCH_COMMANDS = ('add', 'show', 'task', 'ai', 'export', 'import', 'stats', 'metrics')
+
+def archive_date(value):
+    import argparse
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+    return value
+
+def entry_timestamp(value):
+    import argparse
+    if not is_timestamp(value):
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD HH:MM, got {value!r}")
+    return value
+
+def parse_date_range(arguments):
+    """Parse ``--since``/``--until`` after an interactive command; None (after reporting why) if invalid"""
+    import argparse
+    parser = argparse.ArgumentParser(prog="journal-ai", add_help=False)
+    parser.add_argument("--since", type=archive_date)
+    parser.add_argument("--until", type=archive_date)
+    try:
+        parsed = parser.parse_args(arguments)
+    except SystemExit:
+        console.print(Panel.fit("[red]Expected --since YYYY-MM-DD and/or --until YYYY-MM-DD[/red]", title="Error", border_style="red"))
+        return None
+    return parsed.since, parsed.until
+
+def build_batch_parser():
+    import argparse
+    parser = argparse.ArgumentParser(prog=f"journal_cli.py {ACTIVATION_CODE}", description="Run one command and exit")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    add = commands.add_parser("add", help="Add journal entries, one per argument or stdin line")
+    add.add_argument("texts", nargs="*", help="Entry text (commas are kept)")
+    add.add_argument("--stdin", action="store_true", help="Read newline-delimited entries from stdin")
+    add.add_argument("--date", type=entry_timestamp, help="Timestamp to record (YYYY-MM-DD HH:MM, default now)")
+    add.add_argument("--json", action="store_true")
+    
+    show = commands.add_parser("show", help="Print journal entries")
+    show.add_argument("--limit", type=int, help=f"Most recent entries to print (default {PAGE_SIZE}, or all of a date range)")
+    show.add_argument("--all", action="store_true", help="Print every entry, oldest first")
+    show.add_argument("--since", type=archive_date, help="First day to print (YYYY-MM-DD)")
+    show.add_argument("--until", type=archive_date, help="Last day to print (YYYY-MM-DD)")
+    show.add_argument("--json", action="store_true", help="One JSON object per line")
+    
+    task = commands.add_parser("task", help="Manage tasks")
+    task_commands = task.add_subparsers(dest="task_command", required=True)
+    task_add = task_commands.add_parser("add", help="Add tasks, one per argument")
+    task_add.add_argument("descriptions", nargs="+")
+    task_add.add_argument("-p", "--priority", choices=PRIORITIES, default="medium")
+    task_add.add_argument("--json", action="store_true")
+    task_done = task_commands.add_parser("done", help="Mark tasks done by ID")
+    task_done.add_argument("ids", nargs="+", type=int)
+    task_done.add_argument("--json", action="store_true")
+    for name in ("list", "show"):
+        task_list = task_commands.add_parser(name, help="List tasks")
+        task_list.add_argument("--status", choices=["not-done", "done"])
+        task_list.add_argument("--priority", choices=PRIORITIES)
+        task_list.add_argument("--json", action="store_true", help="One JSON object per line")
+    
+    ai = commands.add_parser("ai", help="Run an AI analysis")
+    ai.add_argument("feature", choices=["analyze", "journal", "mood"],
+                    help="analyze: tasks, journal: last 20 entries, mood: daily mood series")
+    ai.add_argument("--no-cache", action="store_true", help="Skip the AI response cache")
+    ai.add_argument("--since", type=archive_date, help="First day of entries to use (journal and mood)")
+    ai.add_argument("--until", type=archive_date, help="Last day of entries to use (journal and mood)")
+    ai.add_argument("--json", action="store_true")
+    
+    stats = commands.add_parser("stats", help="Entries per day and week, streaks and task completion")
+    stats.add_argument("--json", action="store_true")
+    
+    metrics = commands.add_parser("metrics", help="p50/p95/p99 latency, tokens and cache hits per operation")
+    metrics.add_argument("--op", help="Only operations starting with this prefix, e.g. ai. or batch.show")
+    metrics.add_argument("--json", action="store_true")
+    
+    export = commands.add_parser("export", help="Stream journal entries or tasks to a JSONL/CSV archive")
+    export.add_argument("kind", choices=["journal", "tasks"])
+    export.add_argument("path", help="Archive file; .csv or .jsonl, add .gz to compress")
+    export.add_argument("--format", choices=["jsonl", "csv"], help="Override the format implied by the file name")
+    export.add_argument("--gzip", action="store_true", help="Compress (adds .gz to the path)")
+    export.add_argument("--since", type=archive_date, help="First day to include (YYYY-MM-DD, journal only)")
+    export.add_argument("--until", type=archive_date, help="Last day to include (YYYY-MM-DD, journal only)")
+    export.add_argument("--json", action="store_true")
+    
+    imp = commands.add_parser("import", help="Stream a JSONL/CSV archive into the journal or tasks")
+    imp.add_argument("kind", choices=["journal", "tasks"])
+    imp.add_argument("path", help="Archive file written by export (.csv, .jsonl, optionally .gz)")
+    imp.add_argument("--format", choices=["jsonl", "csv"], help="Override the format implied by the file name")
+    imp.add_argument("--since", type=archive_date, help="First day to import (YYYY-MM-DD, journal only)")
+    imp.add_argument("--until", type=archive_date, help="Last day to import (YYYY-MM-DD, journal only)")
+    imp.add_argument("--restart", action="store_true", help="Ignore saved progress and import from the start")
+    imp.add_argument("--json", action="store_true")
+    return parser
+
+def write_json(record):
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def read_stdin_entries():
+    for line in sys.stdin:
+        line = line.strip()
+        if line:
+            yield line
+
+def batch_add(args):
+    timestamp = args.date or datetime.now().strftime(TIMESTAMP_FORMAT)
+    store = get_store()
+    if args.stdin:
+        # One buffered append for the whole stream; the indexes below catch up in one sync each
+        added = store.add_entries(timestamp, read_stdin_entries())
+    else:
+        added = store.add_entries(timestamp, [' '.join(text.split()) for text in args.texts if text.strip()])
+    refresh_search_index(store)
+    refresh_vector_index(store)
+    refresh_stats(store)
+    if args.json:
+        write_json({'added': added, 'date': timestamp})
+    else:
+        console.print(f"[green]{added} Entry(ies) added![/green]")
+    return 0
+
+def batch_show(args):
+    store = get_store()
+    if not store.journal_exists():
+        entries = []
+    elif args.since or args.until:
+        entries = store.entries_between(args.since, args.until)
+        if args.limit:
+            entries = deque(entries, maxlen=args.limit)
+    elif args.all:
+        entries = store.iter_entries()
+    else:
+        entries = store.last_entries(args.limit or PAGE_SIZE)
+    if args.json:
+        for entry in entries:
+            write_json({'id': entry.id, 'date': entry.date, 'text': entry.text})
+        return 0
+    entries = list(entries)
+    if entries:
+        console.print(entries_table(entries))
+    else:
+        console.print("[yellow]No journal entries found.[/yellow]")
+    return 0
+
+def batch_task(args):
+    from journal_stats import open_stats
+    store = get_store()
+    if args.task_command == "add":
+        descriptions = [' '.join(d.split()) for d in args.descriptions if d.strip()]
+        store.add_tasks(args.priority, descriptions)
+        refresh_search_index(store)
+        refresh_stats(store)
+        if args.json:
+            write_json({'added': len(descriptions), 'priority': args.priority})
+        else:
+            console.print(f"[green]{len(descriptions)} Task(s) added with {args.priority} priority![/green]")
+        return 0
+    if args.task_command == "done":
+        updated = 0
+        if store.tasks_exist():
+            updates = {task_id: {'status': 'done'} for task_id in args.ids}
+            with open_stats(STATS_FILE, store) as stats:
+                before = [task for task in map(store.get_task, updates) if task]
+                updated = store.update_tasks(updates)
+                stats.update_tasks(before, updates)
+        missing = len(set(args.ids)) - updated
+        if args.json:
+            write_json({'done': updated, 'missing': missing})
+        else:
+            console.print(f"[green]{updated} Task(s) marked as done![/green]")
+            if missing:
+                console.print(f"[yellow]{missing} task ID(s) not found[/yellow]")
+        return 1 if missing else 0
+    status = args.status.replace('-', ' ') if args.status else None
+    tasks = store.iter_tasks(status, args.priority) if store.tasks_exist() else []
+    if args.json:
+        for task in tasks:
+            write_json({'id': task.id, 'priority': task.priority, 'description': task.description, 'status': task.status})
+        return 0
+    tasks = list(tasks)
+    if tasks:
+        console.print(tasks_table(tasks))
+    else:
+        console.print("[yellow]No tasks found.[/yellow]")
+    return 0
+
+def batch_ai(args):
+    from mood_series import journal_day_digests, load_series, moving_average, unscored_days, weekly_averages
+    from context_packer import describe, pack_entries, pack_tasks
+    if not setup_ai_api():
+        return 1
+    store = get_store()
+    if args.feature == "mood":
+        digests = journal_day_digests(store, MOOD_DIGESTS_FILE, args.since, args.until) if store.journal_exists() else {}
+        days = unscored_days(digests, load_series(MOOD_FILE))
+        if days:
+            score_mood_days(store, days, digests, max(1, int(load_config().get('ai_concurrency', 3))))
+        series = {day: record for day, record in load_series(MOOD_FILE).items() if day in digests}
+        if not args.json:
+            if series:
+                show_mood_trends(series)
+            return 0
+        write_json({
+            'days': [{'date': day, 'score': series[day]['score'], 'note': series[day].get('note', '')} for day in sorted(series)],
+            'average_7d': moving_average(series, 7),
+            'average_30d': moving_average(series, 30),
+            'weekly': [{'week': week, 'average': average, 'days': count} for week, average, count in weekly_averages(series)],
+        })
+        return 0
+    if args.feature == "analyze":
+        packed = pack_tasks(store, load_config(), 'task-analysis')
+        prompt = task_analysis_prompt(packed.records) if packed.records else None
+    else:
+        packed = pack_entries(store, load_config(), 'journal-analysis', since=args.since, until=args.until)
+        prompt = journal_analysis_prompt(packed.records) if packed.records else None
+    if prompt is None:
+        console.print("[yellow]Nothing to analyze.[/yellow]")
+        return 1
+    console.print(f"[dim]Context: {describe(packed, 'tasks' if args.feature == 'analyze' else 'entries')}[/dim]")
+    response = generate_ai_content(prompt, use_cache=not args.no_cache)
+    if args.json:
+        write_json({'feature': args.feature, 'records': len(packed.records), 'context_tokens': packed.tokens,
+                    'truncated': packed.truncated, 'omitted': packed.omitted, 'response': response})
+    else:
+        console.print(Panel(response, title="AI Insights", border_style="cyan"))
+    return 0
+
+def archive_progress(args):
+    """A transient rich progress bar, or None when output is JSON"""
+    if args.json:
+        return None
+    from rich.progress import Progress
+    return Progress(console=console.instance(), transient=True)
+
+def batch_export(args):
+    import archive
+    store = get_store()
+    path = args.path + '.gz' if args.gzip and not args.path.endswith('.gz') else args.path
+    rows = archive.export_rows(store, args.kind, args.since, args.until)
+    progress = archive_progress(args)
+    if progress is None:
+        written = archive.write_rows(rows, path, args.kind, args.format)
+    else:
+        with progress:
+            bar = progress.add_task(f"Exporting {args.kind}", total=None)
+            written = archive.write_rows(rows, path, args.kind, args.format,
+                                         on_progress=lambda count: progress.update(bar, completed=count))
+    if args.json:
+        write_json({'exported': written, 'kind': args.kind, 'path': path})
+    else:
+        console.print(f"[green]{written} record(s) exported to {path}[/green]")
+    return 0
+
+def batch_stats(args):
+    start = time.perf_counter()
+    summary = compute_stats(get_store())
+    if summary is None:
+        return 1
+    if args.json:
+        write_json(summary)
+    else:
+        render_stats(summary, (time.perf_counter() - start) * 1000)
+    return 0
+
+def batch_metrics(args):
+    from metrics import METRICS, summarize as summarize_metrics
+    if args.json:
+        for name, row in summarize_metrics(METRICS.load()).items():
+            if not args.op or name.startswith(args.op):
+                write_json({'op': name, **row})
+    else:
+        show_metrics(args.op)
+    return 0
+
+def batch_import(args):
+    import archive
+    store = get_store()
+    options = dict(fmt=args.format, since=args.since, until=args.until, resume=not args.restart)
+    progress = archive_progress(args)
+    if progress is None:
+        imported, resumed = archive.import_rows(store, args.kind, args.path, PRIORITIES, STATUSES, **options)
+    else:
+        with progress:
+            bar = progress.add_task(f"Importing {args.kind}", total=os.path.getsize(args.path))
+            imported, resumed = archive.import_rows(
+                store, args.kind, args.path, PRIORITIES, STATUSES,
+                on_progress=lambda offset: progress.update(bar, completed=offset), **options
+            )
+    # The search index picks the new records up on its next sync; stats date new tasks from now
+    refresh_stats(store)
+    if args.json:
+        write_json({'imported': imported, 'resumed_after': resumed, 'kind': args.kind})
+    else:
+        if resumed:
+            console.print(f"[cyan]Resumed after {resumed} record(s) imported earlier[/cyan]")
+        console.print(f"[green]{imported} record(s) imported from {args.path}[/green]")
+    return 0
+
+@contextmanager
+def command_span(name):
+    """Time one command as a metrics span, dumping a cProfile of it when enabled.
+
+    Set "profile_commands" in config.json to true, or to a list of command
+    names, to write ``profiles/<command>-<time>.prof`` for pstats or snakeviz.
+    """
+    from metrics import METRICS, span
+    config = load_config()
+    METRICS.configure(enabled=config.get('metrics_enabled', True), max_bytes=config.get('metrics_max_bytes'))
+    profiled = config.get('profile_commands', False)
+    profiler = None
+    if profiled is True or (isinstance(profiled, list) and name.split('.')[1] in profiled):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with span(name):
+            yield
+    finally:
+        if profiler:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{name}-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+            profiler.dump_stats(path)
+            console.print(f"[dim]Profile written to {path}[/dim]")
+
+def run_batch(argv):
+    """Run a single command from argv and return an exit code"""
+    args = build_batch_parser().parse_args(argv)
+    if getattr(args, 'json', False):
+        console.use_stderr()
+    handlers = {'add': batch_add, 'show': batch_show, 'task': batch_task, 'ai': batch_ai,
+                'export': batch_export, 'import': batch_import, 'stats': batch_stats, 'metrics': batch_metrics}
+    name = args.command
+    if args.command == 'task':
+        name += f".{args.task_command}"
+    elif args.command == 'ai':
+        name += f".{args.feature}"
+    try:
+        with command_span(f"batch.{name}"):
+            return handlers[args.command](args)
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        return 1
+
 def main():
-    import sys
     hacker_banner = """
 [bold bright_green]██╗  ██╗ █████╗  ██████╗██╗  ██╗███████╗██████╗     ██████╗  █████╗ ██╗██████╗ ██╗███████╗
 ██║  ██║██╔══██╗██╔════╝██║ ██╔╝██╔════╝██╔══██╗    ██╔══██╗██╔══██╗██║██╔══██╗██║██╔════╝
@@ -789,36 +2021,60 @@ def main():
 """
     if len(sys.argv) < 2 or sys.argv[1] != ACTIVATION_CODE:
         return
+    # Commands with arguments run once without the banner or prompt loop
+    if len(sys.argv) >= 4 and sys.argv[2] in BATCH_COMMANDS:
+        sys.exit(run_batch(sys.argv[2:]))
     console.print(Panel("[bold bright_green]HACKER DIARIES[/bold bright_green]", border_style="bright_green"))
     console.print(hacker_banner)
     while True:
+        command_args = []
         if len(sys.argv) >= 3:
             # If command is provided in the initial call, use it first
             command = sys.argv[2].lower()
+            command_args = sys.argv[3:]
             sys.argv = sys.argv[:2]  # Remove the command so it doesn't repeat
         else:
-            command = Prompt.ask("[bold bright_green]Enter command (add, show, delete, task, ai, journal-ai, config, exit, 404 to quit)[/bold bright_green]", default="show").lower()
-        if command == "add":
-            add_entry()
-        elif command == "show":
-            show_entries()
-        elif command == "delete":
-            delete_entry()
-        elif command == "exit":
-            console.print("[bold bright_green]Goodbye, hacker![/bold bright_green]")
-        elif command == "404":
-            console.print("[bold red]Session terminated. 404 Not Found.[/bold red]")
-            break
-        elif command == "task":
-            task_manager()
-        elif command == "ai":
-            ai_menu()
-        elif command == "journal-ai":
-            journal_ai_menu()
-        elif command == "config":
-            config_menu()
-        else:
-            console.print(Panel(f"[red]Unknown command: {command}[/red]", border_style="red"))
+            command = Prompt.ask("[bold bright_green]Enter command (add, show, delete, search, stats, metrics, task, ai, journal-ai, config, migrate, exit, 404 to quit)[/bold bright_green]", default="show").lower()
+        with command_span(f"command.{command if command in INTERACTIVE_COMMANDS else 'unknown'}"):
+            if command == "add":
+                add_entry()
+            elif command == "show":
+                show_entries()
+            elif command == "delete":
+                delete_entry()
+            elif command == "search":
+                search_entries()
+            elif command == "stats":
+                show_stats()
+            elif command == "metrics":
+                show_metrics()
+            elif command == "exit":
+                console.print("[bold bright_green]Goodbye, hacker![/bold bright_green]")
+            elif command == "404":
+                console.print("[bold red]Session terminated. 404 Not Found.[/bold red]")
+                break
+            elif command == "task":
+                task_manager()
+            elif command == "ai":
+                ai_menu()
+            elif command == "journal-ai" and command_args[:1] in (["all"], ["history"]):
+                date_range = parse_date_range(command_args[1:])
+                if date_range is None:
+                    continue
+                if command_args[0] == "all":
+                    ai_journal_all(*date_range)
+                else:
+                    ai_journal_history(*date_range)
+            elif command == "journal-ai":
+                journal_ai_menu()
+            elif command == "config" and command_args[:1] == ["verify"]:
+                verify_api_config()
+            elif command == "config":
+                config_menu()
+            elif command == "migrate":
+                migrate_storage()
+            else:
+                console.print(Panel(f"[red]Unknown command: {command}[/red]", border_style="red"))
 
 if __name__ == '__main__':
     main()
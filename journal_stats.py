@@ -0,0 +1,286 @@
+"""Running aggregates behind the ``stats`` dashboard.
+
+Kept next to the journal so the dashboard never re-reads the whole history:
+
+* ``stats.json`` holds open/done task counts per priority and a checkpoint
+  of each store kind. ``sync`` folds in only records appended since the
+  checkpoints and recounts a kind from scratch when its file was rewritten
+  (e.g. by compaction).
+* ``stats.days`` holds entries per day as a dense int32 column starting at
+  the day ordinal ``day0`` recorded in ``stats.json``.
+* ``stats.created`` holds ``(task_id, unix_time)`` int64 pairs for tasks
+  added while the aggregates existed, in ID order.
+* ``stats.done`` holds ``(priority_code, seconds)`` float64 pairs, one per
+  task marked done whose creation time is known.
+
+Deletes and task edits do not append to the store files, so callers report
+them through ``remove_entries``, ``remove_tasks`` and ``update_tasks`` inside
+``open_stats``, which holds a lock across processes and saves on exit. The
+dashboard itself is computed with NumPy from these aggregates by ``summarize``.
+"""
+import json
+import os
+import struct
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import date
+
+from journal_store import PRIORITIES, file_lock
+
+CREATED_RECORD = struct.Struct('<qq')
+DONE_RECORD = struct.Struct('<dd')
+STREAK_DAYS = 14
+WEEKS = 8
+
+
+def _empty():
+    return {
+        'entry_cursor': 0, 'entry_token': None, 'task_cursor': 0, 'task_token': None,
+        'day0': None, 'tasks': {priority: [0, 0] for priority in PRIORITIES}, 'last_task_id': 0,
+    }
+
+
+class JournalStats:
+    def __init__(self, base_path):
+        self.path = base_path + '.json'
+        self.created_path = base_path + '.created'
+        self.done_path = base_path + '.done'
+        self.days_path = base_path + '.days'
+        self.data = self._load()
+        self.days = array('i')
+        if self.data['day0'] is not None and os.path.exists(self.days_path):
+            with open(self.days_path, 'rb') as f:
+                self.days.frombytes(f.read())
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return _empty()
+
+    def save(self):
+        tmp = f'{self.days_path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            self.days.tofile(f)
+        os.replace(tmp, self.days_path)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+    def _add_day(self, ordinal, count):
+        day0 = self.data['day0']
+        if day0 is None:
+            day0 = self.data['day0'] = ordinal
+        elif ordinal < day0:
+            self.days[:0] = array('i', bytes(4 * (day0 - ordinal)))
+            day0 = self.data['day0'] = ordinal
+        index = ordinal - day0
+        if index >= len(self.days):
+            self.days.extend(array('i', bytes(4 * (index + 1 - len(self.days)))))
+        self.days[index] = max(0, self.days[index] + count)
+
+    # Appends
+    def sync(self, store, now=None):
+        """Count records appended since the last sync; returns ``(entries, tasks)`` added"""
+        return self._sync_entries(store), self._sync_tasks(store, now or time.time())
+
+    def _since_checkpoint(self, store, kind):
+        """Return ``(rebuild, records)`` for records past the checkpoint of ``kind``.
+
+        ``rebuild`` is True when the store was rewritten, in which case the
+        records start from the beginning and the counts must be reset. The
+        checkpoint advances once ``records`` has been consumed.
+        """
+        data = self.data
+        cursor, token = data[f'{kind}_cursor'], data[f'{kind}_token']
+        rebuild = token is not None and not store.verify_checkpoint(kind, cursor, token)
+        if rebuild:
+            cursor = 0
+        end_cursor, end_token = store.checkpoint(kind)
+        if (end_cursor, end_token) == (cursor, token):
+            return rebuild, iter(())
+
+        def records():
+            for position, record in store.records_since(kind, cursor):
+                if position >= end_cursor:
+                    break
+                yield record
+            data[f'{kind}_cursor'], data[f'{kind}_token'] = end_cursor, end_token
+        return rebuild, records()
+
+    def _sync_entries(self, store):
+        rebuild, entries = self._since_checkpoint(store, 'entry')
+        if rebuild:
+            self.days, self.data['day0'] = array('i'), None
+        # Entries arrive in date order, so runs of the same day are counted once
+        count, day, run = 0, None, 0
+        for entry in entries:
+            count += 1
+            if entry.date[:10] != day:
+                self._count_run(day, run)
+                day, run = entry.date[:10], 0
+            run += 1
+        self._count_run(day, run)
+        return count
+
+    def _count_run(self, day, count):
+        ordinal = _ordinal(day) if count else None
+        if ordinal is not None:
+            self._add_day(ordinal, count)
+
+    def _sync_tasks(self, store, now):
+        data = self.data
+        # A first count cannot know when existing tasks were created
+        first = data['task_token'] is None
+        rebuild, tasks = self._since_checkpoint(store, 'task')
+        if rebuild:
+            data['tasks'] = {priority: [0, 0] for priority in PRIORITIES}
+        created = []
+        count = 0
+        for task in tasks:
+            count += 1
+            data['tasks'].setdefault(task.priority, [0, 0])[task.status == 'done'] += 1
+            if task.id > data['last_task_id']:
+                if not first and task.status != 'done':
+                    created.append(CREATED_RECORD.pack(task.id, int(now)))
+                data['last_task_id'] = task.id
+        if created:
+            with open(self.created_path, 'ab') as f:
+                f.write(b''.join(created))
+        return count
+
+    # Edits reported by callers
+    def remove_entries(self, entries):
+        for entry in entries:
+            ordinal = _ordinal(entry.date[:10])
+            if ordinal is not None and self.data['day0'] is not None and ordinal >= self.data['day0']:
+                self._add_day(ordinal, -1)
+
+    def remove_tasks(self, tasks):
+        for task in tasks:
+            counts = self.data['tasks'].setdefault(task.priority, [0, 0])
+            counts[task.status == 'done'] = max(0, counts[task.status == 'done'] - 1)
+
+    def update_tasks(self, before, updates, now=None):
+        """Apply ``{task_id: changes}`` to the counts, given the tasks as they were before"""
+        now = now or time.time()
+        done = []
+        for task in before:
+            if task.id not in updates:
+                continue
+            after = task._replace(**updates[task.id])
+            self.remove_tasks([task])
+            self.data['tasks'].setdefault(after.priority, [0, 0])[after.status == 'done'] += 1
+            if task.status != 'done' and after.status == 'done':
+                created = self.created_at(task.id)
+                if created is not None:
+                    done.append(DONE_RECORD.pack(PRIORITIES.index(after.priority), max(0.0, now - created)))
+        if done:
+            with open(self.done_path, 'ab') as f:
+                f.write(b''.join(done))
+
+    def created_at(self, task_id):
+        """Creation time of a task, by binary search over the ID-ordered records; None if unknown"""
+        if not os.path.exists(self.created_path):
+            return None
+        with open(self.created_path, 'rb') as f:
+            lo, hi = 0, f.seek(0, os.SEEK_END) // CREATED_RECORD.size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                f.seek(mid * CREATED_RECORD.size)
+                found, created = CREATED_RECORD.unpack(f.read(CREATED_RECORD.size))
+                if found == task_id:
+                    return created
+                if found < task_id:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        return None
+
+
+def _ordinal(day):
+    """Day ordinal of a ``YYYY-MM-DD`` prefix, or None for malformed dates"""
+    try:
+        return date.fromisoformat(day).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+@contextmanager
+def open_stats(base_path, store):
+    """Lock, load and sync the aggregates, saving them when the block exits cleanly"""
+    with file_lock(base_path + '.json'):
+        stats = JournalStats(base_path)
+        stats.sync(store)
+        yield stats
+        stats.save()
+
+
+def _runs(active):
+    """Lengths and end indices of the runs of True in a boolean array"""
+    import numpy as np
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return ends - starts, ends - 1
+
+
+def summarize(stats, today):
+    """Dashboard numbers from the aggregates, computed with NumPy; ``today`` is a ``date``"""
+    import numpy as np
+    from datetime import timedelta
+
+    per_day = np.frombuffer(stats.days, dtype=np.int32).astype(np.int64)
+    written = np.flatnonzero(per_day)
+    result = {'entries': 0, 'days_written': 0, 'first_day': None, 'average_per_day': 0.0, 'streak': 0, 'longest_streak': 0,
+              'recent_days': [], 'weeks': [], 'tasks': {}, 'time_to_done': {}}
+    if len(written):
+        # Dense per-day column from the first day with entries through today
+        first_ordinal = stats.data['day0'] + int(written[0])
+        per_day = per_day[written[0]:]
+        today_index = today.toordinal() - first_ordinal
+        if today_index >= len(per_day):
+            per_day = np.concatenate([per_day, np.zeros(today_index + 1 - len(per_day), dtype=np.int64)])
+        counts = per_day[per_day > 0]
+        lengths, ends = _runs(per_day > 0)
+        # A streak still counts until a whole day passes without writing
+        current = lengths[(ends == today_index) | (ends == today_index - 1)]
+        result.update({
+            'entries': int(counts.sum()),
+            'days_written': int(len(counts)),
+            'first_day': str(date.fromordinal(first_ordinal)),
+            'average_per_day': round(float(counts.mean()), 2),
+            'streak': int(current.max()) if len(current) else 0,
+            'longest_streak': int(lengths.max()) if len(lengths) else 0,
+        })
+        recent = per_day[max(0, today_index - STREAK_DAYS + 1):today_index + 1] if today_index >= 0 else per_day[:0]
+        start = today - timedelta(days=len(recent) - 1)
+        result['recent_days'] = [{'date': str(start + timedelta(days=i)), 'entries': int(n)} for i, n in enumerate(recent)]
+        # Weeks start on Monday; ordinal 1 (0001-01-01) was a Monday
+        offset = (first_ordinal - 1) % 7
+        weekly = np.bincount((np.arange(len(per_day)) + offset) // 7, weights=per_day)
+        monday = first_ordinal - offset
+        result['weeks'] = [{'week': str(date.fromordinal(monday + 7 * week)), 'entries': int(weekly[week])}
+                           for week in range(max(0, len(weekly) - WEEKS), len(weekly))]
+
+    counts = np.array([stats.data['tasks'].get(priority, [0, 0]) for priority in PRIORITIES], dtype=np.int64)
+    totals = counts.sum(axis=1)
+    rates = np.divide(counts[:, 1], totals, out=np.zeros(len(PRIORITIES)), where=totals > 0)
+    result['tasks'] = {priority: {'open': int(open_), 'done': int(done), 'completion_rate': round(float(rate), 3)}
+                       for priority, (open_, done), rate in zip(PRIORITIES, counts, rates)}
+    all_open, all_done = counts.sum(axis=0)
+    result['tasks']['all'] = {'open': int(all_open), 'done': int(all_done),
+                              'completion_rate': round(float(all_done / (all_open + all_done)), 3) if all_open + all_done else 0.0}
+
+    if os.path.exists(stats.done_path):
+        done = np.fromfile(stats.done_path, dtype='<f8')
+        done = done[:len(done) // 2 * 2].reshape(-1, 2)
+        groups = [(priority, done[done[:, 0] == code, 1]) for code, priority in enumerate(PRIORITIES)]
+        for name, seconds in groups + [('all', done[:, 1])]:
+            if len(seconds):
+                p50, p90 = np.percentile(seconds, [50, 90])
+                result['time_to_done'][name] = {'tasks': int(len(seconds)), 'median_s': float(p50),
+                                                'p90_s': float(p90), 'mean_s': float(seconds.mean())}
+    return result
@@ -0,0 +1,1301 @@
+"""Storage backends for journal entries and tasks.
+
+Two backends share the same interface:
+
+* ``FlatFileStore`` keeps the original pipe-delimited ``journal.txt`` /
+  ``tasks.txt`` files. Entry IDs are byte offsets of each line, so they stay
+  valid across appends (a compaction moves them, so deletes check that the
+  line still matches the entry that was read); tasks carry a stable numeric
+  ID as a fourth field and are served from an in-memory ``TaskIndex``.
+  Deletes and task edits go to an append-only mutation log next to each
+  file and are folded back in by a background compaction. Several processes
+  may share the files: readers take a shared ``flock`` and writers an
+  exclusive one, and concurrent journal appends are group-committed with one
+  write and one ``fsync``. Date-range reads go through a sparse
+  ``DateIndex`` of the journal.
+* ``SQLiteStore`` keeps everything in one WAL-mode SQLite database with
+  indexes on entry timestamp and on task status/priority, so lookups and
+  single-record edits no longer touch the whole data set.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from contextlib import closing, contextmanager
+from datetime import datetime
+from itertools import islice
+
+try:
+    import fcntl
+except ImportError:  # Windows: locking stays within one process
+    fcntl = None
+
+Entry = namedtuple('Entry', 'id date text')
+Task = namedtuple('Task', 'id priority description status')
+
+PRIORITIES = ('high', 'medium', 'low')
+STATUSES = ('not done', 'done')
+BACKENDS = ('flat', 'sqlite')
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M'
+COMPACT_THRESHOLD = 0.25
+# Garbage below this many bytes is never worth a rewrite, whatever the ratio
+COMPACT_MIN_GARBAGE = 64 * 1024
+# Buffer for bulk appends, so large backfills reach the disk in few write calls
+APPEND_BUFFER = 1 << 20
+# Bytes of journal lines summarised by each entry of the sparse date index
+DATE_INDEX_BLOCK = 64 * 1024
+
+_file_locks = {}
+_group_commits = {}
+_file_locks_guard = threading.Lock()
+_task_indexes = {}
+_date_indexes = {}
+
+
+class FileLock:
+    """Reentrant lock on one base file, held across threads and processes.
+
+    Threads of this process serialise on an RLock. Other processes are kept
+    out with ``flock`` on a ``<file>.lock`` sidecar, since compaction replaces
+    the base file itself. Readers hold the flock shared and writers
+    exclusive; a writer nested inside a reader upgrades it for its duration.
+    """
+
+    def __init__(self, path):
+        self.path = path + '.lock'
+        self._thread_lock = threading.RLock()
+        self._modes = []
+        self._fd = None
+        self._pid = None
+
+    def _held(self):
+        if 'exclusive' in self._modes:
+            return 'exclusive'
+        return 'shared' if self._modes else None
+
+    def _flock(self, mode):
+        if fcntl is None:
+            return
+        # A forked child must not share the parent's open file description
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        operations = {'shared': fcntl.LOCK_SH, 'exclusive': fcntl.LOCK_EX, None: fcntl.LOCK_UN}
+        fcntl.flock(self._fd, operations[mode])
+
+    @contextmanager
+    def hold(self, shared=False):
+        mode = 'shared' if shared else 'exclusive'
+        with self._thread_lock:
+            held = self._held()
+            if held != 'exclusive' and held != mode:
+                self._flock(mode)
+            self._modes.append(mode)
+            try:
+                yield
+            finally:
+                self._modes.pop()
+                if self._held() != held:
+                    self._flock(held)
+
+
+def _lock_for(path, shared=False):
+    """Hold the lock serialising mutations and compaction of one base file"""
+    key = os.path.abspath(path)
+    with _file_locks_guard:
+        lock = _file_locks.get(key)
+        if lock is None:
+            lock = _file_locks[key] = FileLock(key)
+    return lock.hold(shared)
+
+
+def file_lock(path, shared=False):
+    """Hold the cross-process lock of ``path``, e.g. to guard a sidecar file derived from the store"""
+    return _lock_for(path, shared)
+
+
+class GroupCommit:
+    """Batches concurrent appends to one file into a single write and fsync.
+
+    Each caller queues its bytes and then takes the file lock; whoever gets it
+    first writes everything queued so far, and callers whose data went out in
+    that batch return as soon as they get the lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._guard = threading.Lock()
+        self._pending = []
+        self._queued = 0
+        self._committed = 0
+        self.appends = 0
+        self.commits = 0
+
+    def append(self, data):
+        """Return once ``data`` is on disk, written by this thread or another"""
+        with self._guard:
+            self._pending.append(data)
+            self._queued += 1
+            ticket = self._queued
+        with _lock_for(self.path):
+            if self._committed < ticket:
+                self._flush()
+
+    def append_stream(self, chunks):
+        """Write a stream of byte chunks, along with anything queued, in one commit"""
+        with _lock_for(self.path):
+            self._flush(chunks)
+
+    def _flush(self, stream=()):
+        with self._guard:
+            batch, self._pending = self._pending, []
+            last = self._queued
+        try:
+            with open(self.path, 'ab', buffering=APPEND_BUFFER) as f:
+                for data in batch:
+                    f.write(data)
+                for data in stream:
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            with self._guard:
+                self._pending[:0] = batch
+            raise
+        self._committed = last
+        self.appends += len(batch)
+        self.commits += 1
+
+
+def _group_commit_for(path):
+    key = os.path.abspath(path)
+    with _file_locks_guard:
+        return _group_commits.setdefault(key, GroupCommit(key))
+
+
+def parse_entry_line(line):
+    """Split a ``date|entry`` line, returning None for malformed lines"""
+    if '|' not in line:
+        return None
+    date, text = line.strip().split('|', 1)
+    return date, text
+
+
+def parse_task_line(line):
+    """Split a ``priority|task|status|id`` line into ``(priority, task, status, id)``.
+
+    Lines written before tasks had IDs have no fourth field and get an ID of
+    None. Returns None for malformed lines.
+    """
+    fields = line.strip().split('|')
+    # Descriptions may contain '|', so only the outer fields are positional
+    if len(fields) >= 4 and fields[-1].isdigit() and fields[-2] in STATUSES:
+        return fields[0], '|'.join(fields[1:-2]), fields[-2], int(fields[-1])
+    if len(fields) >= 3 and fields[-1] in STATUSES:
+        return fields[0], '|'.join(fields[1:-1]), fields[-1], None
+    return None
+
+
+def is_timestamp(value):
+    """True for a zero-padded ``YYYY-MM-DD HH:MM`` entry timestamp, the only form that sorts by date"""
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT).strftime(TIMESTAMP_FORMAT) == value
+    except (TypeError, ValueError):
+        return False
+
+
+def single_line(text):
+    """Flat files hold one record per line, so embedded line breaks become spaces"""
+    return ' '.join(text.splitlines()) if '\n' in text or '\r' in text else text
+
+
+def format_task_line(task_id, priority, description, status):
+    return f'{priority}|{description}|{status}|{task_id}\n'
+
+
+def _iter_lines_with_offsets(path, start=0):
+    """Iterate ``(offset, decoded_line)`` for every line of a UTF-8 file from ``start``.
+
+    The file is opened immediately rather than on first iteration, so callers
+    can pair it with a mutation-log snapshot taken under the same lock.
+    """
+    if not os.path.exists(path):
+        return iter(())
+    return _iter_open_file(open(path, 'rb'), start)
+
+
+def _iter_open_file(f, start):
+    with f:
+        offset = f.seek(start)
+        for raw in f:
+            yield offset, raw.decode('utf-8', errors='replace')
+            offset += len(raw)
+
+
+def _entry_record(offset, line):
+    parsed = parse_entry_line(line)
+    return Entry(offset, *parsed) if parsed else None
+
+
+def read_backwards(path, n, make_record, end=None, block_size=64 * 1024):
+    """Return the last ``n`` records of ``path`` that end before byte ``end``.
+
+    ``make_record(offset, line)`` turns a decoded line into a record, or None
+    for malformed lines. Blocks are read backwards from ``end`` (the end of the
+    file by default, otherwise a line start) until enough records have been
+    found, so the cost depends on ``n`` rather than on the size of the file.
+    Lines are split on raw ``\\n`` bytes before decoding, which never occur
+    inside a multi-byte UTF-8 sequence, so characters straddling a block
+    boundary are decoded intact. A trailing line without a newline is treated
+    like any other line, matching the forward reader.
+    """
+    if n <= 0 or not os.path.exists(path):
+        return []
+    found = []
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END) if end is None else end
+        carry = b''  # Start of the earliest line, which may continue in the previous block
+        while pos > 0 and len(found) < n:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            chunk = f.read(read_size) + carry
+            lines = chunk.split(b'\n')
+            carry = lines[0]
+            cursor = pos + len(chunk)
+            for raw in reversed(lines[1:]):
+                start = cursor - len(raw)
+                cursor = start - 1
+                record = make_record(start, raw.decode('utf-8', errors='replace'))
+                if record:
+                    found.append(record)
+                    if len(found) == n:
+                        break
+        if pos == 0 and len(found) < n:
+            record = make_record(0, carry.decode('utf-8', errors='replace'))
+            if record:
+                found.append(record)
+    found.reverse()
+    return found
+
+
+def tail_entries(path, n, block_size=64 * 1024):
+    """Return the last ``n`` well-formed ``date|entry`` records of ``path``"""
+    return read_backwards(path, n, _entry_record, block_size=block_size)
+
+
+def file_checkpoint(path, window=64):
+    """Return ``(size, token)`` for the current end of ``path``.
+
+    The token fingerprints the bytes just before the end, so a reader that
+    remembered a checkpoint can tell a pure append (token still matches at the
+    old size) from a rewrite.
+    """
+    if not os.path.exists(path):
+        return 0, ''
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        return size, _tail_token(f, size, window)
+
+
+def verify_file_checkpoint(path, size, token, window=64):
+    """True when ``path`` still starts with the content seen at a checkpoint"""
+    if not os.path.exists(path):
+        return size == 0
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) < size:
+            return False
+        return _tail_token(f, size, window) == token
+
+
+def _tail_token(f, size, window):
+    start = max(0, size - window)
+    f.seek(start)
+    return hashlib.sha1(f.read(size - start)).hexdigest()
+
+
+def _line_hash(raw):
+    """Short fingerprint of a raw line's bytes, ignoring its line break"""
+    return hashlib.sha1(raw.rstrip(b'\r\n')).hexdigest()[:16]
+
+
+def _matching_tombstones(path, deleted, hashes):
+    """Return the tombstoned offsets whose line still hashes to the deleted line"""
+    matching = set()
+    with open(path, 'rb') as f:
+        for offset in deleted:
+            if offset in hashes:
+                f.seek(offset)
+                if _line_hash(f.readline()) != hashes[offset]:
+                    continue
+            matching.add(offset)
+    return matching
+
+
+def until_key(until):
+    """Exclusive upper bound for an inclusive ``until`` date or date prefix"""
+    return until + '\uffff' if until else None
+
+
+def in_date_range(date, since, end):
+    """True when ``date`` is on or after ``since`` and before ``end`` (see ``until_key``)"""
+    return (since is None or date >= since) and (end is None or date < end)
+
+
+class DateIndex:
+    """Sparse timestamp index of journal.txt, saved as ``<journal>.dates``.
+
+    Records ``[start, end, oldest, newest]`` for each run of whole lines of
+    about ``DATE_INDEX_BLOCK`` bytes, so a date-range read only touches blocks
+    whose dates overlap the range, plus the unindexed tail after the last
+    block. Out-of-order backfills stay findable because each block keeps its
+    own oldest and newest date. Appends extend the index; a checkpoint of the
+    last indexed byte detects rewrites (compaction), which rebuild it.
+    Deleted entries may leave a block's range wider than needed, never narrower.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + '.dates'
+        self.blocks = []
+        self.end = 0
+        self.token = ''
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if verify_file_checkpoint(self.path, data['end'], data['token']):
+            self.blocks, self.end, self.token = data['blocks'], data['end'], data['token']
+
+    def _save(self):
+        tmp = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'end': self.end, 'token': self.token, 'blocks': self.blocks}, f)
+        os.replace(tmp, self.index_path)
+
+    def refresh(self):
+        """Index whole blocks appended since the last refresh; call under the journal lock"""
+        if not os.path.exists(self.path):
+            self.blocks, self.end, self.token = [], 0, ''
+            return
+        if self.end and not verify_file_checkpoint(self.path, self.end, self.token):
+            self.blocks, self.end, self.token = [], 0, ''
+            self._load()
+        size = os.path.getsize(self.path)
+        if size - self.end < DATE_INDEX_BLOCK:
+            return
+        if self.end == 0 or size - self.end >= 2 * DATE_INDEX_BLOCK:
+            self._load()  # Another process may have indexed most of it already
+        added = False
+        start, oldest, newest = self.end, None, None
+        with open(self.path, 'rb') as f:
+            offset = f.seek(self.end)
+            for raw in f:
+                offset += len(raw)
+                bar = raw.find(b'|')
+                if bar >= 0:
+                    # UTF-8 bytes sort like the decoded text
+                    date = raw[:bar].lstrip()
+                    oldest = date if oldest is None or date < oldest else oldest
+                    newest = date if newest is None or date > newest else newest
+                if offset - start >= DATE_INDEX_BLOCK:
+                    self.blocks.append([start, offset, _decode(oldest), _decode(newest)])
+                    start, oldest, newest = offset, None, None
+                    added = True
+                    if size - offset < DATE_INDEX_BLOCK:
+                        break
+        if added:
+            self.end = self.blocks[-1][1]
+            with open(self.path, 'rb') as f:
+                self.token = _tail_token(f, self.end, 64)
+            self._save()
+
+    def spans(self, since=None, until=None):
+        """Return ``[(start, end)]`` byte ranges that may hold entries in the range; end None means EOF"""
+        end_key = until_key(until)
+        spans = []
+        for start, end, oldest, newest in self.blocks:
+            if oldest is None or (since is not None and newest < since) or (end_key is not None and oldest >= end_key):
+                continue
+            if spans and spans[-1][1] == start:
+                spans[-1] = (spans[-1][0], end)
+            else:
+                spans.append((start, end))
+        if spans and spans[-1][1] == self.end:
+            spans[-1] = (spans[-1][0], None)
+        else:
+            spans.append((self.end, None))
+        return spans
+
+
+def _decode(date):
+    return None if date is None else date.decode('utf-8', errors='replace')
+
+
+def _date_index_for(path):
+    key = os.path.abspath(path)
+    index = _date_indexes.get(key)
+    if index is None:
+        index = _date_indexes[key] = DateIndex(path)
+    index.refresh()
+    return index
+
+
+def _iter_spans(f, spans):
+    """Yield ``(offset, decoded_line)`` for the lines inside byte ranges of an open file"""
+    with f:
+        for start, end in spans:
+            offset = f.seek(start)
+            for raw in f:
+                if end is not None and offset >= end:
+                    break
+                yield offset, raw.decode('utf-8', errors='replace')
+                offset += len(raw)
+
+
+class MutationLog:
+    """Append-only log of deletes and task updates layered over a flat file.
+
+    Each line is a JSON record keyed by the record ID: the byte offset for
+    journal entries, the task ID for tasks. The header names the base file's
+    inode and the key type; a log left behind by a compaction that replaced
+    the base (for example after a crash between the swap and the log cleanup)
+    no longer matches and is ignored. Journal tombstones also carry a hash of
+    the deleted line, and compaction only drops a line whose hash matches.
+    """
+
+    def __init__(self, base_path, key='offset'):
+        self.base_path = base_path
+        self.path = base_path + '.log'
+        self.key = key
+        self._cache_key = None
+        self._reset()
+
+    def header(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.loads(f.readline() or '{}')
+
+    def state_key(self):
+        """Cheap fingerprint of the log file, for cache invalidation"""
+        if not os.path.exists(self.path):
+            return None
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def _reset(self):
+        self.deleted = set()
+        self.hashes = {}
+        self.updates = {}
+        self.dead_bytes = 0
+
+    def _base_identity(self):
+        st = os.stat(self.base_path)
+        return f'{st.st_dev}:{st.st_ino}'
+
+    def load(self):
+        """Refresh the in-memory overlay if the log changed since the last load"""
+        if not os.path.exists(self.path) or not os.path.exists(self.base_path):
+            self._cache_key = None
+            self._reset()
+            return self
+        st = os.stat(self.path)
+        key = (st.st_mtime_ns, st.st_size, self._base_identity())
+        if key == self._cache_key:
+            return self
+        self._reset()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline() or '{}')
+            if header.get('base') == key[2] and header.get('key', 'offset') == self.key:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break  # Torn final write
+                    record = json.loads(line)
+                    if record['op'] == 'delete':
+                        self.deleted.add(record['id'])
+                        if 'hash' in record:
+                            self.hashes[record['id']] = record['hash']
+                        self.updates.pop(record['id'], None)
+                    else:
+                        self.updates.setdefault(record['id'], {}).update(record['changes'])
+                    self.dead_bytes += record['size']
+        self._cache_key = key
+        return self
+
+    def append(self, records):
+        header = self.header()
+        fresh = not header or header.get('base') != self._base_identity() or header.get('key', 'offset') != self.key
+        with open(self.path, 'w' if fresh else 'a', encoding='utf-8') as f:
+            if fresh:
+                f.write(json.dumps({'base': self._base_identity(), 'key': self.key}) + '\n')
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def garbage_bytes(self):
+        if not os.path.exists(self.path):
+            return 0
+        return self.dead_bytes + os.path.getsize(self.path)
+
+    def garbage_ratio(self):
+        garbage = self.garbage_bytes()
+        return garbage / (os.path.getsize(self.base_path) or 1) if garbage else 0.0
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._cache_key = None
+        self._reset()
+
+
+class TaskRecord:
+    __slots__ = ('id', 'priority', 'description', 'status', 'offset', 'size')
+
+    def __init__(self, task_id, priority, description, status, offset, size):
+        self.id = task_id
+        self.priority = priority
+        self.description = description
+        self.status = status
+        self.offset = offset
+        self.size = size
+
+    def as_task(self):
+        return Task(self.id, self.priority, self.description, self.status)
+
+
+class TaskIndex:
+    """Tasks keyed by stable ID, with status and priority secondary indexes.
+
+    Lookups, edits and filtered listings are answered from memory: each
+    mark-done, prioritise or delete is O(1) per task instead of a file scan.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.order = []  # IDs in file order, which is ascending ID order
+        self.by_status = defaultdict(set)
+        self.by_priority = defaultdict(set)
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        self.records[record.id] = record
+        if not self.order or record.id > self.order[-1]:
+            self.order.append(record.id)
+        else:
+            self.order.insert(bisect_left(self.order, record.id), record.id)
+        self.by_status[record.status].add(record.id)
+        self.by_priority[record.priority].add(record.id)
+        self.next_id = max(self.next_id, record.id + 1)
+
+    def remove(self, task_id):
+        record = self.records.pop(task_id, None)
+        if record is None:
+            return None
+        pos = bisect_left(self.order, task_id)
+        if pos < len(self.order) and self.order[pos] == task_id:
+            del self.order[pos]
+        self.by_status[record.status].discard(task_id)
+        self.by_priority[record.priority].discard(task_id)
+        return record
+
+    def update(self, task_id, changes):
+        record = self.records.get(task_id)
+        if record is None:
+            return None
+        if 'status' in changes:
+            self.by_status[record.status].discard(task_id)
+            record.status = changes['status']
+            self.by_status[record.status].add(task_id)
+        if 'priority' in changes:
+            self.by_priority[record.priority].discard(task_id)
+            record.priority = changes['priority']
+            self.by_priority[record.priority].add(task_id)
+        return record
+
+    def select(self, status=None, priority=None, since=0):
+        """Yield records matching the filters with ``id >= since``, in ID order"""
+        if status is None and priority is None:
+            ids = self.order[bisect_left(self.order, since):]
+        else:
+            matches = None
+            for value, index in ((status, self.by_status), (priority, self.by_priority)):
+                if value is not None:
+                    matches = set(index.get(value, ())) if matches is None else matches & index.get(value, set())
+            ids = sorted(task_id for task_id in matches if task_id >= since)
+        for task_id in ids:
+            yield self.records[task_id]
+
+    def select_before(self, position, n, status=None, priority=None):
+        """Return the last ``n`` matching records with ``id < position`` (None for the end)"""
+        if status is None and priority is None:
+            end = len(self.order) if position is None else bisect_left(self.order, position)
+            ids = self.order[max(0, end - n):end]
+        else:
+            ids = [record.id for record in self.select(status, priority)
+                   if position is None or record.id < position][-n:]
+        return [self.records[task_id] for task_id in ids]
+
+
+def _rewrite_lines(path, transform):
+    """Rewrite ``path`` keeping ``transform(offset, line)`` for each line.
+
+    ``transform`` returns the replacement line, or None to drop the line.
+    The new content is written to a temporary file and swapped in atomically.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        for offset, line in _iter_lines_with_offsets(path):
+            new_line = transform(offset, line)
+            if new_line is not None:
+                out.write(new_line)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+
+
+class FlatFileStore:
+    """Pipe-delimited text files, the original on-disk format"""
+    name = 'flat'
+
+    def __init__(self, journal_file, task_file, compact_threshold=COMPACT_THRESHOLD,
+                 compact_min_garbage=COMPACT_MIN_GARBAGE):
+        self.journal_file = journal_file
+        self.task_file = task_file
+        self.compact_threshold = compact_threshold
+        self.compact_min_garbage = compact_min_garbage
+        self.journal_log = MutationLog(journal_file)
+        self.task_log = MutationLog(task_file, key='id')
+
+    def _entry_reader(self):
+        deleted = set(self.journal_log.load().deleted)
+
+        def make_entry(offset, line):
+            return None if offset in deleted else _entry_record(offset, line)
+        return make_entry
+
+    def _task_state_key(self):
+        if not os.path.exists(self.task_file):
+            return None
+        st = os.stat(self.task_file)
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, self.task_log.state_key()
+
+    def task_index(self):
+        """Return the process-wide TaskIndex for tasks.txt, reloading it if the file changed"""
+        with _lock_for(self.task_file, shared=True):
+            cache_key = os.path.abspath(self.task_file)
+            state = self._task_state_key()
+            cached = _task_indexes.get(cache_key)
+            if cached and cached[0] == state:
+                return cached[1]
+            self._upgrade_task_file()
+            index = TaskIndex()
+            overlay = self.task_log.load()
+            for offset, line in _iter_lines_with_offsets(self.task_file):
+                parsed = parse_task_line(line)
+                if not parsed:
+                    continue
+                priority, description, status, task_id = parsed
+                index.next_id = max(index.next_id, task_id + 1)
+                if task_id in overlay.deleted:
+                    continue
+                record = TaskRecord(task_id, priority, description, status, offset, len(line.encode('utf-8')))
+                index.add(record)
+                if task_id in overlay.updates:
+                    index.update(task_id, overlay.updates[task_id])
+            _task_indexes[cache_key] = (self._task_state_key(), index)
+            return index
+
+    def _remember_task_index(self, index):
+        _task_indexes[os.path.abspath(self.task_file)] = (self._task_state_key(), index)
+
+    def _upgrade_task_file(self):
+        """Give legacy ``priority|task|status`` lines a stable ID, once.
+
+        A mutation log written when tasks were still keyed by byte offset is
+        folded in during the same rewrite.
+        """
+        if not os.path.exists(self.task_file) or not any(self._task_upgrade_state()[:2]):
+            return
+        with _lock_for(self.task_file):
+            # Another process may have upgraded the file while this one waited
+            legacy_log, needs_ids, next_id = self._task_upgrade_state()
+            if needs_ids or legacy_log:
+                self._rewrite_legacy_tasks(legacy_log, next_id)
+
+    def _task_upgrade_state(self):
+        """Return ``(legacy_log, needs_ids, next_id)`` for tasks.txt"""
+        header = self.task_log.header()
+        legacy_log = bool(header) and header.get('key', 'offset') == 'offset'
+        next_id, needs_ids = 1, False
+        for _, line in _iter_lines_with_offsets(self.task_file):
+            parsed = parse_task_line(line)
+            if parsed:
+                if parsed[3] is None:
+                    needs_ids = True
+                else:
+                    next_id = max(next_id, parsed[3] + 1)
+        return legacy_log, needs_ids, next_id
+
+    def _rewrite_legacy_tasks(self, legacy_log, next_id):
+        overlay = MutationLog(self.task_file, key='offset').load() if legacy_log else None
+        counter = [next_id]
+
+        def transform(offset, line):
+            parsed = parse_task_line(line)
+            if not parsed:
+                return line
+            if overlay and offset in overlay.deleted:
+                return None
+            priority, description, status, task_id = parsed
+            if overlay and offset in overlay.updates:
+                changes = overlay.updates[offset]
+                priority = changes.get('priority', priority)
+                status = changes.get('status', status)
+            if task_id is None:
+                task_id = counter[0]
+                counter[0] += 1
+            return format_task_line(task_id, priority, description, status)
+
+        _rewrite_lines(self.task_file, transform)
+        if legacy_log:
+            self.task_log.clear()
+
+    # Journal entries
+    def journal_exists(self):
+        return os.path.exists(self.journal_file)
+
+    def iter_entries(self, since=0):
+        with _lock_for(self.journal_file, shared=True):
+            make_entry = self._entry_reader()
+            lines = _iter_lines_with_offsets(self.journal_file, since)
+        for offset, line in lines:
+            entry = make_entry(offset, line)
+            if entry:
+                yield entry
+
+    def last_entries(self, n):
+        return self.entries_before(None, n)
+
+    # Paging. Positions are byte offsets of line starts; None means start/end.
+    def position_of(self, record):
+        return record.id
+
+    def entries_from(self, position, n):
+        return list(islice(self.iter_entries(since=position or 0), n))
+
+    def entries_before(self, position, n):
+        with _lock_for(self.journal_file, shared=True):
+            return read_backwards(self.journal_file, n, self._entry_reader(), end=position)
+
+    def entry_position_for_date(self, date):
+        """Offset of the first entry in file order dated on or after ``date``, or the file size if none is.
+
+        Backfills can sit out of date order, so blocks of the sparse date index
+        whose newest entry is older are skipped instead of binary-searching.
+        """
+        if not self.journal_exists():
+            return 0
+        with _lock_for(self.journal_file, shared=True):
+            make_entry = self._entry_reader()
+            spans = _date_index_for(self.journal_file).spans(since=date)
+            f = open(self.journal_file, 'rb')
+            size = os.fstat(f.fileno()).st_size
+        lines = _iter_spans(f, spans)
+        with closing(lines):
+            for offset, line in lines:
+                entry = make_entry(offset, line)
+                if entry and entry.date >= date:
+                    return offset
+        return size
+
+    def entries_between(self, since=None, until=None):
+        """Yield entries dated from ``since`` through ``until`` (inclusive date prefixes), oldest first.
+
+        Only the journal blocks the sparse date index places in the range are
+        read. Backfills can sit out of date order in the file, so the entries
+        in the range are sorted in memory, matching the SQLite backend.
+        """
+        if not self.journal_exists():
+            return
+        end = until_key(until)
+        with _lock_for(self.journal_file, shared=True):
+            make_entry = self._entry_reader()
+            spans = _date_index_for(self.journal_file).spans(since, until)
+            f = open(self.journal_file, 'rb')
+        found = []
+        for offset, line in _iter_spans(f, spans):
+            entry = make_entry(offset, line)
+            if entry and in_date_range(entry.date, since, end):
+                found.append(entry)
+        found.sort(key=lambda entry: (entry.date, entry.id))
+        yield from found
+
+    def get_entries(self, ids):
+        """Return the entries with these IDs in the given order, skipping deleted ones"""
+        if not self.journal_exists():
+            return []
+        with _lock_for(self.journal_file, shared=True):
+            make_entry = self._entry_reader()
+            found = []
+            with open(self.journal_file, 'rb') as f:
+                for offset in ids:
+                    f.seek(offset)
+                    entry = make_entry(offset, f.readline().decode('utf-8', errors='replace'))
+                    if entry:
+                        found.append(entry)
+            return found
+
+    def tasks_from(self, position, n, status=None, priority=None):
+        return list(islice(self.iter_tasks(status, priority, since=position or 0), n))
+
+    def tasks_before(self, position, n, status=None, priority=None):
+        if not self.tasks_exist():
+            return []
+        return [record.as_task() for record in self.task_index().select_before(position, n, status, priority)]
+
+    def add_entries(self, timestamp, texts):
+        """Append entries in one commit; ``texts`` may be any iterable, e.g. a stream"""
+        if isinstance(texts, (list, tuple)):
+            return self.append_entries([(timestamp, text) for text in texts])
+        return self.append_entries((timestamp, text) for text in texts)
+
+    def append_entries(self, records):
+        """Append ``(timestamp, text)`` pairs with one write and one fsync.
+
+        Lists are group-committed with appends from other threads; other
+        iterables are streamed straight to the file under the lock.
+        """
+        commit = _group_commit_for(self.journal_file)
+        if isinstance(records, (list, tuple)):
+            if records:
+                commit.append(''.join(f'{date}|{single_line(text)}\n' for date, text in records).encode('utf-8'))
+            return len(records)
+        count = [0]
+
+        def lines():
+            for date, text in records:
+                count[0] += 1
+                yield f'{date}|{single_line(text)}\n'.encode('utf-8')
+        commit.append_stream(lines())
+        return count[0]
+
+    def delete_entries(self, entries):
+        """Delete entries as they were read; returns the ones deleted.
+
+        An entry whose line no longer reads the same at its offset, for
+        example because a compaction moved it since it was listed, is stale
+        and left alone.
+        """
+        deleted = []
+        with _lock_for(self.journal_file):
+            log = self.journal_log.load()
+            tombstones = []
+            with open(self.journal_file, 'rb') as f:
+                for entry in {entry.id: entry for entry in entries}.values():
+                    if entry.id in log.deleted:
+                        continue
+                    f.seek(entry.id)
+                    raw = f.readline()
+                    if _entry_record(entry.id, raw.decode('utf-8', errors='replace')) != entry:
+                        continue
+                    tombstones.append({'op': 'delete', 'id': entry.id, 'size': len(raw), 'hash': _line_hash(raw)})
+                    deleted.append(entry)
+            if tombstones:
+                self.journal_log.append(sorted(tombstones, key=lambda record: record['id']))
+        self.maybe_compact()
+        return deleted
+
+    # Tasks
+    def tasks_exist(self):
+        return os.path.exists(self.task_file)
+
+    def iter_tasks(self, status=None, priority=None, since=0):
+        """Yield tasks in ID order, answered from the task index"""
+        if not self.tasks_exist():
+            return
+        for record in list(self.task_index().select(status, priority, since)):
+            yield record.as_task()
+
+    def get_task(self, task_id):
+        record = self.task_index().records.get(task_id) if self.tasks_exist() else None
+        return record.as_task() if record else None
+
+    def add_tasks(self, priority, descriptions, status='not done'):
+        count = 0
+        with _lock_for(self.task_file):
+            index = self.task_index() if self.tasks_exist() else TaskIndex()
+            with open(self.task_file, 'ab', buffering=APPEND_BUFFER) as f:
+                offset = f.seek(0, os.SEEK_END)
+                for description in descriptions:
+                    description = single_line(description)
+                    line = format_task_line(index.next_id, priority, description, status).encode('utf-8')
+                    f.write(line)
+                    index.add(TaskRecord(index.next_id, priority, description, status, offset, len(line)))
+                    offset += len(line)
+                    count += 1
+                f.flush()
+                os.fsync(f.fileno())
+            self._remember_task_index(index)
+        return count
+
+    def delete_tasks(self, ids):
+        with _lock_for(self.task_file):
+            index = self.task_index()
+            records = [index.records[task_id] for task_id in set(ids) if task_id in index.records]
+            if records:
+                self.task_log.append([{'op': 'delete', 'id': r.id, 'size': r.size} for r in records])
+                for record in records:
+                    index.remove(record.id)
+                self._remember_task_index(index)
+        self.maybe_compact()
+        return len(records)
+
+    def update_tasks(self, updates):
+        """Record ``{task_id: {'priority': ..., 'status': ...}}`` in the mutation log"""
+        if not updates:
+            return 0
+        with _lock_for(self.task_file):
+            index = self.task_index()
+            updates = {task_id: changes for task_id, changes in updates.items() if task_id in index.records}
+            if updates:
+                self.task_log.append([
+                    {'op': 'update', 'id': task_id, 'changes': changes, 'size': index.records[task_id].size}
+                    for task_id, changes in updates.items()
+                ])
+                for task_id, changes in updates.items():
+                    index.update(task_id, changes)
+                self._remember_task_index(index)
+        self.maybe_compact()
+        return len(updates)
+
+    def records_since(self, kind, cursor):
+        """Yield ``(position, record)`` for records stored at or after a checkpoint cursor"""
+        if kind == 'entry':
+            for entry in self.iter_entries(since=cursor):
+                yield entry.id, entry
+        elif self.tasks_exist():
+            for record in list(self.task_index().select()):
+                if record.offset >= cursor:
+                    yield record.offset, record.as_task()
+
+    # Compaction
+    def compact(self, kind=None):
+        """Fold the mutation log of ``kind`` (or both files) into the base file"""
+        targets = {'entry': (self.journal_file, self.journal_log), 'task': (self.task_file, self.task_log)}
+        for name, (path, log) in targets.items():
+            if kind not in (None, name):
+                continue
+            with _lock_for(path):
+                if not os.path.exists(log.path):
+                    continue
+                overlay = log.load()
+                deleted, updates = overlay.deleted, overlay.updates
+                if name == 'entry':
+                    deleted = _matching_tombstones(path, deleted, overlay.hashes)
+
+                def transform(offset, line):
+                    if name == 'entry':
+                        return None if offset in deleted else line
+                    parsed = parse_task_line(line)
+                    if not parsed or parsed[3] is None:
+                        return line
+                    priority, description, status, task_id = parsed
+                    if task_id in deleted:
+                        return None
+                    changes = updates.get(task_id, {})
+                    return format_task_line(task_id, changes.get('priority', priority), description,
+                                            changes.get('status', status))
+
+                _rewrite_lines(path, transform)
+                log.clear()
+
+    def maybe_compact(self):
+        """Start a background compaction for any file past the garbage threshold.
+
+        Both the ratio and ``compact_min_garbage`` must be exceeded, so a small
+        file is not rewritten on every delete. The thread is not a daemon, so the interpreter waits for it to finish
+        before exiting; mutations of the same file wait on its lock meanwhile.
+        """
+        for kind, log in (('entry', self.journal_log), ('task', self.task_log)):
+            with _lock_for(log.base_path, shared=True):
+                log.load()
+                garbage, ratio = log.garbage_bytes(), log.garbage_ratio()
+            if garbage >= self.compact_min_garbage and ratio > self.compact_threshold:
+                threading.Thread(target=self.compact, args=(kind,), name=f'compact-{kind}').start()
+
+    # Change tracking for derived indexes
+    def checkpoint(self, kind):
+        """Return ``(cursor, token)`` for the end of the entry or task data"""
+        return file_checkpoint(self.journal_file if kind == 'entry' else self.task_file)
+
+    def verify_checkpoint(self, kind, cursor, token):
+        return verify_file_checkpoint(self.journal_file if kind == 'entry' else self.task_file, cursor, token)
+
+    def close(self):
+        pass
+
+
+class SQLiteStore:
+    """Indexed SQLite database in WAL mode"""
+    name = 'sqlite'
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        text TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_entries_date ON entries(date);
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        priority TEXT NOT NULL,
+        description TEXT NOT NULL,
+        status TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, priority);
+    CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+
+    # Journal entries
+    def journal_exists(self):
+        return self.conn.execute('SELECT 1 FROM entries LIMIT 1').fetchone() is not None
+
+    def iter_entries(self):
+        """Yield every entry oldest first, by timestamp and then ID; see ``records_since`` for ID order"""
+        for row in self.conn.execute('SELECT id, date, text FROM entries ORDER BY date, id'):
+            yield Entry(*row)
+
+    def last_entries(self, n):
+        rows = self.conn.execute(
+            'SELECT id, date, text FROM entries ORDER BY date DESC, id DESC LIMIT ?', (n,)
+        ).fetchall()
+        return [Entry(*row) for row in reversed(rows)]
+
+    # Paging. Positions are (date, id) keys in display order; None means start/end.
+    def position_of(self, record):
+        if isinstance(record, Task):
+            return record.id
+        return (record.date, record.id)
+
+    def entries_from(self, position, n):
+        if position is None:
+            rows = self.conn.execute('SELECT id, date, text FROM entries ORDER BY date, id LIMIT ?', (n,))
+        else:
+            rows = self.conn.execute(
+                'SELECT id, date, text FROM entries WHERE (date, id) >= (?, ?) ORDER BY date, id LIMIT ?',
+                (*position, n)
+            )
+        return [Entry(*row) for row in rows]
+
+    def entries_before(self, position, n):
+        if position is None:
+            return self.last_entries(n)
+        rows = self.conn.execute(
+            'SELECT id, date, text FROM entries WHERE (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT ?',
+            (*position, n)
+        ).fetchall()
+        return [Entry(*row) for row in reversed(rows)]
+
+    def entry_position_for_date(self, date):
+        row = self.conn.execute(
+            'SELECT date, id FROM entries WHERE date >= ? ORDER BY date, id LIMIT 1', (date,)
+        ).fetchone()
+        # Past the last entry: sorts after any real timestamp
+        return tuple(row) if row else ('\uffff', 0)
+
+    def entries_between(self, since=None, until=None):
+        """Yield entries dated from ``since`` through ``until`` (inclusive date prefixes), oldest first"""
+        clauses, params = [], []
+        if since:
+            clauses.append('date >= ?')
+            params.append(since)
+        if until:
+            clauses.append('date < ?')
+            params.append(until_key(until))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        for row in self.conn.execute(f'SELECT id, date, text FROM entries{where} ORDER BY date, id', params):
+            yield Entry(*row)
+
+    def get_entries(self, ids):
+        """Return the entries with these IDs in the given order, skipping deleted ones"""
+        ids = list(ids)
+        found = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT id, date, text FROM entries WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((row[0], Entry(*row)) for row in rows)
+        return [found[i] for i in ids if i in found]
+
+    def tasks_from(self, position, n, status=None, priority=None):
+        return list(islice(self.iter_tasks(status, priority, since=position or 0), n))
+
+    def tasks_before(self, position, n, status=None, priority=None):
+        query = 'SELECT id, priority, description, status FROM tasks'
+        clauses, params = [], []
+        for column, value in (('id <', position), ('status =', status), ('priority =', priority)):
+            if value is not None:
+                clauses.append(f'{column} ?')
+                params.append(value)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        rows = self.conn.execute(query + ' ORDER BY id DESC LIMIT ?', params + [n]).fetchall()
+        return [Task(*row) for row in reversed(rows)]
+
+    def add_entries(self, timestamp, texts):
+        return self.append_entries((timestamp, text) for text in texts)
+
+    def append_entries(self, records):
+        """Insert ``(timestamp, text)`` pairs in one transaction, with line breaks flattened as in the flat store"""
+        with self.conn:
+            cursor = self.conn.executemany('INSERT INTO entries (date, text) VALUES (?, ?)',
+                                           ((date, single_line(text)) for date, text in records))
+        return cursor.rowcount
+
+    def delete_entries(self, entries):
+        """Delete entries by ID; returns the ones deleted"""
+        deleted = []
+        with self.conn:
+            for entry in {entry.id: entry for entry in entries}.values():
+                if self.conn.execute('DELETE FROM entries WHERE id = ?', (entry.id,)).rowcount:
+                    deleted.append(entry)
+        return deleted
+
+    # Tasks
+    def tasks_exist(self):
+        return self.conn.execute('SELECT 1 FROM tasks LIMIT 1').fetchone() is not None
+
+    def iter_tasks(self, status=None, priority=None, since=0):
+        query = 'SELECT id, priority, description, status FROM tasks'
+        clauses, params = [], []
+        if since:
+            clauses.append('id >= ?')
+            params.append(since)
+        if status is not None:
+            clauses.append('status = ?')
+            params.append(status)
+        if priority is not None:
+            clauses.append('priority = ?')
+            params.append(priority)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY id'
+        for row in self.conn.execute(query, params):
+            yield Task(*row)
+
+    def get_task(self, task_id):
+        row = self.conn.execute(
+            'SELECT id, priority, description, status FROM tasks WHERE id = ?', (task_id,)
+        ).fetchone()
+        return Task(*row) if row else None
+
+    def add_tasks(self, priority, descriptions, status='not done'):
+        with self.conn:
+            cursor = self.conn.executemany(
+                "INSERT INTO tasks (priority, description, status) VALUES (?, ?, ?)",
+                ((priority, single_line(description), status) for description in descriptions)
+            )
+        return cursor.rowcount
+
+    def delete_tasks(self, ids):
+        count = 0
+        with self.conn:
+            for task_id in set(ids):
+                count += self.conn.execute('DELETE FROM tasks WHERE id = ?', (task_id,)).rowcount
+        return count
+
+    def update_tasks(self, updates):
+        """Apply ``{task_id: {'priority': ..., 'status': ...}}``; returns the number of tasks found"""
+        count = 0
+        with self.conn:
+            for task_id, changes in updates.items():
+                columns = [column for column in ('priority', 'status') if column in changes]
+                if not columns:
+                    count += self.get_task(task_id) is not None
+                    continue
+                assignments = ', '.join(f'{column} = ?' for column in columns)
+                count += self.conn.execute(f'UPDATE tasks SET {assignments} WHERE id = ?',
+                                           [changes[column] for column in columns] + [task_id]).rowcount
+        return count
+
+    # Change tracking for derived indexes
+    def records_since(self, kind, cursor):
+        """Yield ``(position, record)`` for rows with IDs at or after a checkpoint cursor, in ID order"""
+        if kind == 'entry':
+            for row in self.conn.execute('SELECT id, date, text FROM entries WHERE id >= ? ORDER BY id', (cursor,)):
+                yield row[0], Entry(*row)
+        else:
+            for task in self.iter_tasks(since=cursor):
+                yield task.id, task
+
+    def checkpoint(self, kind):
+        """Return ``(cursor, token)``: the next row ID, with the database path as token.
+
+        IDs come from ``sqlite_sequence``, so a deleted row's ID is never
+        handed out again below the cursor.
+        """
+        table = 'entries' if kind == 'entry' else 'tasks'
+        row = self.conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+        return (row[0] if row else 0) + 1, os.path.abspath(self.db_file)
+
+    def verify_checkpoint(self, kind, cursor, token):
+        return token == os.path.abspath(self.db_file)
+
+    def close(self):
+        self.conn.close()
+
+
+def open_store(backend, journal_file, task_file, db_file, compact_threshold=COMPACT_THRESHOLD):
+    if backend == 'flat':
+        return FlatFileStore(journal_file, task_file, compact_threshold)
+    elif backend == 'sqlite':
+        return SQLiteStore(db_file)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def migrate_flat_to_sqlite(journal_file, task_file, db_file):
+    """One-shot copy of journal.txt/tasks.txt into a fresh SQLite database.
+
+    Returns ``(entry_count, task_count)``. Tasks keep their stable IDs. Refuses
+    to run against a database that already holds data so a repeated migration
+    cannot duplicate records.
+    """
+    source = FlatFileStore(journal_file, task_file)
+    target = SQLiteStore(db_file)
+    try:
+        if target.journal_exists() or target.tasks_exist():
+            raise ValueError(f"{db_file} already contains data; migration skipped")
+        with target.conn:
+            cursor = target.conn.executemany(
+                'INSERT INTO entries (date, text) VALUES (?, ?)',
+                ((entry.date, entry.text) for entry in source.iter_entries())
+            )
+            entry_count = cursor.rowcount
+            cursor = target.conn.executemany(
+                'INSERT INTO tasks (id, priority, description, status) VALUES (?, ?, ?, ?)',
+                ((task.id, task.priority, task.description, task.status) for task in source.iter_tasks())
+            )
+            task_count = cursor.rowcount
+        return entry_count, task_count
+    finally:
+        target.close()
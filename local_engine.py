@@ -0,0 +1,206 @@
+"""Offline analysis engine behind the ``local`` AI provider.
+
+Mood is scored with a small valence lexicon, themes come from TF-IDF over the
+entries and task statistics are plain counts, all vectorized with NumPy so
+tens of thousands of entries are processed per second without any network.
+``LocalAnalyzer.generate`` answers the same prompts the remote providers get
+by analysing the journal lines and task lines embedded in them.
+"""
+import json
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z']+")
+ENTRY_RE = re.compile(r'^\[(\d{4}-\d{2}-\d{2})[^\]]*\] (.*)$', re.MULTILINE)
+DAY_RE = re.compile(r'^## (\d{4}-\d{2}-\d{2})$', re.MULTILINE)
+TASK_RE = re.compile(r'^\d+\. \[(HIGH|MEDIUM|LOW)\] (.*) - (done|not done)$', re.MULTILINE)
+FOCUS_RE = re.compile(r'focus area: "([^"]*)"')
+
+# Valence from -3 (very negative) to +3 (very positive)
+LEXICON = {
+    'amazing': 3, 'awesome': 3, 'excellent': 3, 'fantastic': 3, 'wonderful': 3, 'thrilled': 3,
+    'love': 3, 'loved': 3, 'perfect': 3, 'joy': 3, 'ecstatic': 3, 'brilliant': 3,
+    'happy': 2, 'great': 2, 'glad': 2, 'excited': 2, 'proud': 2, 'grateful': 2, 'thankful': 2,
+    'enjoyed': 2, 'enjoy': 2, 'fun': 2, 'productive': 2, 'accomplished': 2, 'relaxed': 2,
+    'calm': 2, 'peaceful': 2, 'confident': 2, 'motivated': 2, 'success': 2, 'successful': 2,
+    'inspired': 2, 'energized': 2, 'laughed': 2, 'beautiful': 2, 'win': 2, 'won': 2,
+    'good': 1, 'nice': 1, 'fine': 1, 'ok': 1, 'okay': 1, 'better': 1, 'progress': 1,
+    'learned': 1, 'interesting': 1, 'hopeful': 1, 'rested': 1, 'finished': 1, 'done': 1,
+    'helped': 1, 'friends': 1, 'like': 1, 'liked': 1, 'solved': 1, 'focused': 1,
+    'tired': -1, 'bored': -1, 'busy': -1, 'meh': -1, 'slow': -1, 'late': -1, 'confused': -1,
+    'distracted': -1, 'lazy': -1, 'procrastinated': -1, 'stuck': -1, 'problem': -1, 'bug': -1,
+    'sad': -2, 'stressed': -2, 'stress': -2, 'anxious': -2, 'anxiety': -2, 'worried': -2,
+    'angry': -2, 'annoyed': -2, 'frustrated': -2, 'lonely': -2, 'bad': -2, 'sick': -2,
+    'exhausted': -2, 'overwhelmed': -2, 'failed': -2, 'fail': -2, 'hurt': -2, 'upset': -2,
+    'terrible': -3, 'awful': -3, 'horrible': -3, 'miserable': -3, 'depressed': -3,
+    'hate': -3, 'hated': -3, 'devastated': -3, 'furious': -3, 'panic': -3, 'worst': -3,
+}
+NEGATORS = {'not', 'no', 'never', "don't", "didn't", "isn't", "wasn't", "can't", "couldn't", 'hardly'}
+STOPWORDS = set("""
+a about after again all also am an and any are as at be because been before being but by
+can could did do does doing for from had has have having he her here him his how i i'm if in
+into is it it's its just me more most my myself no nor not now of off on once only or other our
+out over own really same she should so some still such than that the their them then there these
+they this those through to today too under until up very was we were what when where which while
+who why will with would yesterday you your got get went going some day did felt feel feeling
+""".split()) | NEGATORS
+
+_LEXICON_WORDS = np.array(sorted(LEXICON))
+_LEXICON_VALUES = np.array([LEXICON[w] for w in _LEXICON_WORDS], dtype=np.float64)
+
+
+def _tokenize(texts):
+    """Flatten texts into (tokens, doc_ids) arrays"""
+    tokens = []
+    lengths = []
+    for text in texts:
+        words = TOKEN_RE.findall(text.lower())
+        tokens.extend(words)
+        lengths.append(len(words))
+    doc_ids = np.repeat(np.arange(len(texts)), lengths)
+    return np.array(tokens, dtype=object), doc_ids
+
+
+def mood_scores(texts):
+    """Return a 1-10 mood score per text (5.5 is neutral)"""
+    if not texts:
+        return np.array([])
+    tokens, doc_ids = _tokenize(texts)
+    if not len(tokens):
+        return np.full(len(texts), 5.5)
+    vocab, inverse = np.unique(tokens.astype(str), return_inverse=True)
+    positions = np.searchsorted(_LEXICON_WORDS, vocab)
+    positions = np.clip(positions, 0, len(_LEXICON_WORDS) - 1)
+    vocab_values = np.where(_LEXICON_WORDS[positions] == vocab, _LEXICON_VALUES[positions], 0.0)
+    values = vocab_values[inverse]
+    # "not happy" counts against the mood when the negator is in the same entry
+    negator = np.isin(vocab, list(NEGATORS))[inverse]
+    flip = np.zeros(len(values), dtype=bool)
+    flip[1:] = negator[:-1] & (doc_ids[1:] == doc_ids[:-1])
+    values = np.where(flip, -values, values)
+    totals = np.bincount(doc_ids, weights=values, minlength=len(texts))
+    hits = np.bincount(doc_ids, weights=(values != 0).astype(np.float64), minlength=len(texts))
+    comparative = totals / (hits + 1)
+    return 5.5 + 4.5 * np.tanh(comparative / 1.5)
+
+
+def themes(texts, top=8):
+    """Return the ``top`` keywords by TF-IDF summed over all texts"""
+    if not texts:
+        return []
+    tokens, doc_ids = _tokenize(texts)
+    if not len(tokens):
+        return []
+    vocab, inverse = np.unique(tokens.astype(str), return_inverse=True)
+    # Mood words are scored separately, so themes only keep topic words
+    keep = np.array([len(t) > 2 and t not in STOPWORDS and t not in LEXICON for t in vocab])
+    mask = keep[inverse]
+    inverse, doc_ids = inverse[mask], doc_ids[mask]
+    if not len(inverse):
+        return []
+    tf = np.bincount(inverse, minlength=len(vocab)).astype(np.float64)
+    pairs = np.unique(doc_ids.astype(np.int64) * len(vocab) + inverse)
+    df = np.bincount(pairs % len(vocab), minlength=len(vocab))
+    weights = tf * np.log(1 + len(texts) / np.maximum(df, 1))
+    order = np.argsort(-weights, kind='stable')[:top]
+    return [str(vocab[i]) for i in order if tf[i] > 0]
+
+
+def task_stats(tasks):
+    """Summarize (priority, status) pairs into counts and completion rates"""
+    if not tasks:
+        return {'total': 0, 'done': 0, 'by_priority': {}}
+    priorities = np.array([p.lower() for p, _ in tasks])
+    done = np.array([s == 'done' for _, s in tasks])
+    by_priority = {}
+    for priority in ('high', 'medium', 'low'):
+        mask = priorities == priority
+        if mask.any():
+            by_priority[priority] = (int(mask.sum()), int(done[mask].sum()))
+    return {'total': len(tasks), 'done': int(done.sum()), 'by_priority': by_priority}
+
+
+def _describe(score):
+    if score >= 7.5:
+        return "very positive"
+    if score >= 6:
+        return "positive"
+    if score > 4.5:
+        return "neutral"
+    if score > 3:
+        return "low"
+    return "concerning"
+
+
+class LocalAnalyzer:
+    """Answers the app's AI prompts offline from the records they contain"""
+
+    def generate(self, prompt):
+        if 'Reply with only a JSON object' in prompt:
+            return self._day_scores(prompt)
+        entries = ENTRY_RE.findall(prompt)
+        focus = FOCUS_RE.search(prompt)
+        if focus:
+            return self._reflection_prompts(focus.group(1), [text for _, text in entries])
+        tasks = TASK_RE.findall(prompt)
+        sections = []
+        if entries:
+            sections.append(self._journal_report(entries))
+        if tasks:
+            sections.append(self._task_report(tasks))
+        if not sections:
+            return "Local analysis found no journal entries or tasks in this request."
+        return "\n\n".join(sections)
+
+    def _day_scores(self, prompt):
+        # Only the day sections count, not the instructions after them
+        prompt = prompt.split('Reply with only a JSON object')[0]
+        days = DAY_RE.findall(prompt)
+        bodies = DAY_RE.split(prompt)[2::2]
+        scores = mood_scores(bodies)
+        result = {}
+        for day, body, score in zip(days, bodies, scores):
+            keywords = themes([text for _, text in ENTRY_RE.findall(body)], top=3)
+            result[day] = {'score': int(round(score)), 'note': ', '.join(keywords) or _describe(score)}
+        return json.dumps(result)
+
+    def _journal_report(self, entries):
+        texts = [text for _, text in entries]
+        scores = mood_scores(texts)
+        average = float(scores.mean())
+        lines = [f"**Mood & Emotional Patterns**: Overall mood is {_describe(average)} "
+                 f"({average:.1f}/10 across {len(texts)} entries)."]
+        if len(scores) >= 4:
+            half = len(scores) // 2
+            change = float(scores[half:].mean() - scores[:half].mean())
+            direction = "improving" if change > 0.5 else "declining" if change < -0.5 else "steady"
+            lines.append(f"**Trend**: Mood is {direction} ({change:+.1f} from the earlier to the later entries).")
+        best, worst = int(scores.argmax()), int(scores.argmin())
+        lines.append(f"**Positive Highlight**: [{entries[best][0]}] {texts[best]}")
+        if scores[worst] < 5:
+            lines.append(f"**Stress Indicator**: [{entries[worst][0]}] {texts[worst]}")
+        keywords = themes(texts)
+        if keywords:
+            lines.append(f"**Key Themes**: {', '.join(keywords)}")
+        return "\n".join(lines)
+
+    def _task_report(self, tasks):
+        stats = task_stats([(priority, status) for priority, _, status in tasks])
+        lines = [f"**Task Summary**: {stats['done']} of {stats['total']} tasks done "
+                 f"({stats['done'] / stats['total']:.0%})."]
+        for priority, (total, done) in stats['by_priority'].items():
+            lines.append(f"- {priority.title()}: {done}/{total} done")
+        open_high = [desc for priority, desc, status in tasks if priority == 'HIGH' and status != 'done']
+        if open_high:
+            lines.append(f"**Next Action**: Start with the high-priority task \"{open_high[0]}\".")
+        return "\n".join(lines)
+
+    def _reflection_prompts(self, focus, texts):
+        keywords = themes(texts, top=3) or [focus]
+        prompts = [f"What does \"{focus}\" mean for you this week?",
+                   f"What have you learned recently about {keywords[0]}?",
+                   "Which moment today are you most grateful for, and why?",
+                   f"What is one small step you could take around {keywords[-1]} tomorrow?",
+                   "What would you tell a friend who felt the way you did today?"]
+        return "**Journal Prompts**:\n" + "\n".join(f"{i}. {p}" for i, p in enumerate(prompts, 1))
@@ -0,0 +1,165 @@
+"""Timing spans and counters written to a rotating JSON Lines file.
+
+``span(name, **fields)`` times a block and records one line with the
+operation name, duration in milliseconds, the enclosing span (if any), the
+exception type when the block raised, and any fields set on the record while
+it ran, such as provider, model, tokens in and out, or cache hit or miss.
+``annotate`` adds fields to the innermost open span of the current thread, so
+code deep in a call (e.g. a provider client reading its usage report) can
+fill in the span its caller opened.
+
+Finished records are buffered and appended in one write when the outermost
+span of a thread closes (and at exit). The file is rotated to ``.1`` ...
+``.<backups>`` once it passes ``max_bytes``, so it never grows without bound.
+``load`` and ``summarize`` read them back for the ``metrics`` command.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = 'metrics.jsonl'
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+PERCENTILES = (50, 95, 99)
+
+
+class Metrics:
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS, enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.enabled = enabled
+        self._local = threading.local()
+        self._pending = []
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def configure(self, enabled=None, max_bytes=None):
+        if enabled is not None:
+            self.enabled = bool(enabled)
+        if max_bytes is not None:
+            self.max_bytes = int(max_bytes)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, **fields):
+        """Time the block; yields the record, whose fields can be set while it runs"""
+        record = {'op': name, **fields}
+        if not self.enabled:
+            yield record
+            return
+        stack = self._stack()
+        if stack:
+            record['parent'] = stack[-1]['op']
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            record['ms'] = round((time.perf_counter() - start) * 1000, 3)
+            record['ts'] = round(time.time(), 3)
+            # Spans opened in generators may close out of order
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i] is record:
+                    del stack[i]
+                    break
+            with self._lock:
+                self._pending.append(record)
+            if not stack:
+                self.flush()
+
+    def annotate(self, **fields):
+        """Set fields on the innermost open span of this thread, if any"""
+        stack = self._stack()
+        if stack:
+            stack[-1].update(fields)
+
+    def flush(self):
+        with self._lock:
+            records, self._pending = self._pending, []
+            if not records:
+                return
+            data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+            try:
+                self._rotate(len(data.encode('utf-8')))
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(data)
+            except OSError:
+                # Metrics must never break the command they measure
+                pass
+
+    def _rotate(self, incoming):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{n}'):
+                os.replace(f'{self.path}.{n}', f'{self.path}.{n + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def files(self):
+        """Existing metrics files, oldest first"""
+        paths = [f'{self.path}.{n}' for n in range(self.backups, 0, -1)] + [self.path]
+        return [path for path in paths if os.path.exists(path)]
+
+    def load(self, since=None):
+        """Yield recorded spans, oldest first, optionally only those after unix time ``since``"""
+        for path in self.files():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    if since is None or record.get('ts', 0) >= since:
+                        yield record
+
+
+# The process-wide recorder; journal_cli applies config.json settings to it
+METRICS = Metrics(METRICS_FILE)
+span = METRICS.span
+annotate = METRICS.annotate
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(records):
+    """Per operation: count, errors, p50/p95/p99/max in ms, token totals and cache hits"""
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record.get('op', '?'), {'ms': [], 'errors': 0, 'tokens_in': 0, 'tokens_out': 0,
+                                                          'cache_hits': 0, 'cache_misses': 0})
+        group['ms'].append(record.get('ms', 0.0))
+        group['errors'] += 'error' in record
+        group['tokens_in'] += record.get('tokens_in') or 0
+        group['tokens_out'] += record.get('tokens_out') or 0
+        group['cache_hits'] += record.get('cache') == 'hit'
+        group['cache_misses'] += record.get('cache') == 'miss'
+    summary = {}
+    for op, group in sorted(groups.items()):
+        ordered = sorted(group.pop('ms'))
+        summary[op] = {'count': len(ordered), **{f'p{p}_ms': percentile(ordered, p) for p in PERCENTILES},
+                       'max_ms': ordered[-1], **group}
+    return summary
@@ -0,0 +1,180 @@
+"""Materialized per-day mood scores.
+
+Scores live in an append-only JSON-lines file, one record per scored day:
+``{"date": "2026-06-30", "score": 7, "note": "...", "digest": "..."}``. The
+digest is a hash of that day's entries, so a day is only sent to the AI again
+when its entries change; the newest record for a date wins. Trend queries are
+computed locally from the stored series.
+
+The per-day digests are kept in their own JSON file together with the store
+checkpoint they were taken at, so each run only re-hashes days that gained
+entries since then (or lost some, see ``mark_days_stale``). A rewritten
+journal fails the checkpoint and every day is hashed again.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import date, timedelta
+
+from journal_store import in_date_range, until_key
+
+JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
+def _entry_line(entry):
+    return f"[{entry.date}] {entry.text}\n"
+
+
+def _digest_days(entries):
+    """Return {day: digest} for entries given oldest first"""
+    hashers = {}
+    for entry in entries:
+        day = entry.date[:10]
+        if day not in hashers:
+            hashers[day] = hashlib.sha1()
+        hashers[day].update(_entry_line(entry).encode('utf-8'))
+    return {day: hasher.hexdigest() for day, hasher in hashers.items()}
+
+
+def _load_digests(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
+def _save_digests(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def journal_day_digests(store, path, since=None, until=None):
+    """Return {day: digest} for every day with entries (from ``since`` through ``until``), in date order.
+
+    Digests are cached in ``path``; only days touched by entries appended
+    since its checkpoint, or marked stale, are read and hashed again.
+    """
+    state = _load_digests(path)
+    cursor, token = store.checkpoint('entry')
+    if 'cursor' in state and store.verify_checkpoint('entry', state['cursor'], state['token']):
+        digests = state['digests']
+        touched = set(state.get('stale', ()))
+        touched.update(record.date[:10] for _, record in store.records_since('entry', state['cursor']))
+        if touched:
+            fresh = _digest_days(entry for entry in store.entries_between(min(touched), max(touched))
+                                 if entry.date[:10] in touched)
+            for day in touched:
+                if day in fresh:
+                    digests[day] = fresh[day]
+                else:
+                    digests.pop(day, None)
+        changed = touched or (state['cursor'], state['token']) != (cursor, token)
+    else:
+        # First run, or the journal was rewritten since the digests were taken
+        digests = _digest_days(store.entries_between())
+        changed = True
+    if changed:
+        _save_digests(path, {'cursor': cursor, 'token': token, 'digests': digests})
+    end = until_key(until)
+    return {day: digests[day] for day in sorted(digests) if in_date_range(day, since, end)}
+
+
+def mark_days_stale(path, days):
+    """Have the next ``journal_day_digests`` re-hash these days, e.g. after deleting entries from them"""
+    state = _load_digests(path)
+    if 'cursor' in state:
+        state['stale'] = sorted(set(state.get('stale', ())) | set(days))
+        _save_digests(path, state)
+
+
+def journal_day_texts(store, days):
+    """Return {day: text} for just the requested days, reading only the dates they span"""
+    wanted = set(days)
+    if not wanted:
+        return {}
+    lines = {}
+    for entry in store.entries_between(min(wanted), max(wanted)):
+        day = entry.date[:10]
+        if day in wanted:
+            lines.setdefault(day, []).append(_entry_line(entry))
+    return {day: ''.join(day_lines) for day, day_lines in lines.items()}
+
+
+def load_series(path):
+    """Return {day: record} with the newest record for each day"""
+    series = {}
+    if not os.path.exists(path):
+        return series
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a torn final line from an interrupted write
+            series[record['date']] = record
+    return series
+
+
+def append_scores(path, records):
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def unscored_days(digests, series):
+    """Days that were never scored or whose entries changed since they were"""
+    return [day for day, digest in digests.items()
+            if day not in series or series[day].get('digest') != digest]
+
+
+def parse_scores(response, days):
+    """Pull ``{day: {"score", "note"}}`` out of an AI response for the requested days"""
+    match = JSON_RE.search(response)
+    if not match:
+        raise ValueError("AI response did not contain mood scores")
+    data = json.loads(match.group(0))
+    scores = {}
+    for day in days:
+        item = data.get(day)
+        if isinstance(item, dict):
+            score, note = item.get('score'), item.get('note', '')
+        else:
+            score, note = item, ''
+        try:
+            score = int(round(float(score)))
+        except (TypeError, ValueError):
+            continue
+        scores[day] = {'score': min(10, max(1, score)), 'note': str(note)}
+    return scores
+
+
+def _parse_day(day):
+    return date(int(day[:4]), int(day[5:7]), int(day[8:10]))
+
+
+def weekly_averages(series, weeks=8):
+    """Return [(week_start, average, days_scored)] for the most recent ``weeks`` ISO weeks with scores"""
+    buckets = {}
+    for day, record in series.items():
+        d = _parse_day(day)
+        week_start = d - timedelta(days=d.weekday())
+        buckets.setdefault(week_start, []).append(record['score'])
+    result = [(week_start.isoformat(), sum(scores) / len(scores), len(scores))
+              for week_start, scores in sorted(buckets.items())]
+    return result[-weeks:]
+
+
+def moving_average(series, window=7, end=None):
+    """Average score over the ``window`` calendar days ending at ``end`` (default: last scored day)"""
+    if not series:
+        return None
+    end = _parse_day(end or max(series))
+    start = end - timedelta(days=window - 1)
+    scores = [record['score'] for day, record in series.items() if start <= _parse_day(day) <= end]
+    return sum(scores) / len(scores) if scores else None
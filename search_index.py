@@ -0,0 +1,336 @@
+"""Persistent inverted index for full-text search over entries and tasks.
+
+The index lives in its own SQLite file. Documents are keyed by a hash of
+their content, so they survive the byte offsets of flat-file records moving
+when other lines are deleted. For each kind ('entry', 'task') the index
+remembers a checkpoint of the source data; ``sync`` only reads records added
+after it. When the source was rewritten behind its back (a compaction, say),
+``sync`` re-reads that kind and only adds or drops the documents whose
+content changed.
+"""
+import hashlib
+import heapq
+import math
+import re
+import sqlite3
+
+KINDS = ('entry', 'task')
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def parse_query(query):
+    """Split a query into ``(terms, phrases)``; phrases are quoted with double quotes"""
+    phrases = [tokenize(p) for p in PHRASE_RE.findall(query)]
+    phrases = [p for p in phrases if p]
+    terms = tokenize(PHRASE_RE.sub(' ', query))
+    for phrase in phrases:
+        terms.extend(phrase)
+    return list(dict.fromkeys(terms)), phrases
+
+
+def _record_fields(kind, record):
+    """Return ``(label, text)`` for a store record"""
+    if kind == 'entry':
+        return record.date, record.text
+    return record.priority, record.description
+
+
+def _doc_key(kind, label, text):
+    # Task priority/status change over time, so only the description identifies a task
+    source = f'{kind}\0{label}\0{text}' if kind == 'entry' else f'{kind}\0{text}'
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+class SearchHit:
+    __slots__ = ('score', 'kind', 'label', 'text')
+
+    def __init__(self, score, kind, label, text):
+        self.score = score
+        self.kind = kind
+        self.label = label
+        self.text = text
+
+
+class SearchIndex:
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS docs (
+        doc_id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL UNIQUE,
+        label TEXT NOT NULL,
+        text TEXT NOT NULL,
+        length INTEGER NOT NULL,
+        refs INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS postings (
+        term TEXT NOT NULL,
+        doc_id INTEGER NOT NULL,
+        tf INTEGER NOT NULL,
+        positions TEXT NOT NULL,
+        PRIMARY KEY (term, doc_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+    CREATE TABLE IF NOT EXISTS terms (
+        term TEXT PRIMARY KEY,
+        df INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        kind TEXT PRIMARY KEY,
+        cursor INTEGER NOT NULL,
+        token TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # Maintenance
+    def sync(self, store):
+        """Index every record added to ``store`` since the last checkpoint.
+
+        Returns the number of records indexed.
+        """
+        indexed = 0
+        for kind in KINDS:
+            row = self.conn.execute('SELECT cursor, token FROM checkpoints WHERE kind = ?', (kind,)).fetchone()
+            cursor, token = row if row else (0, '')
+            # Take the checkpoint first so records appended while we read are picked up next time
+            end_cursor, end_token = store.checkpoint(kind)
+            if row and not store.verify_checkpoint(kind, cursor, token):
+                with self.conn:
+                    indexed += self._resync(store, kind, end_cursor)
+                    self._set_checkpoint(kind, end_cursor, end_token)
+                continue
+            if end_cursor == cursor and row:
+                continue
+            with self.conn:
+                for position, record in store.records_since(kind, cursor):
+                    if position < end_cursor:
+                        self._add(kind, record)
+                        indexed += 1
+                self._set_checkpoint(kind, end_cursor, end_token)
+        return indexed
+
+    def remove(self, kind, records):
+        """Drop deleted ``records``.
+
+        The index must have been synced before the records were deleted.
+        Deletes do not move the store's checkpoint, so the cursor is left for
+        ``sync`` to advance past whatever was appended meanwhile.
+        """
+        with self.conn:
+            for record in records:
+                self._remove(kind, record)
+
+    def relabel(self, kind, records):
+        """Store the current label of ``records``, e.g. after a task's priority changed"""
+        fields = [_record_fields(kind, record) for record in records]
+        with self.conn:
+            self.conn.executemany('UPDATE docs SET label = ? WHERE key = ?',
+                                  [(label, _doc_key(kind, label, text)) for label, text in fields])
+
+    def rebuild(self, store):
+        with self.conn:
+            for kind in KINDS:
+                self._clear_kind(kind)
+        return self.sync(store)
+
+    def _set_checkpoint(self, kind, cursor, token):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO checkpoints (kind, cursor, token) VALUES (?, ?, ?)',
+            (kind, cursor, token)
+        )
+
+    def _resync(self, store, kind, end_cursor):
+        """Re-key ``kind`` after the source was rewritten; returns the documents added.
+
+        Every record is read once into a temporary table of content keys.
+        Documents whose key is gone are dropped, new keys are indexed, and
+        the rest only get their reference count and label refreshed.
+        """
+        self.conn.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, label TEXT NOT NULL, text TEXT NOT NULL, refs INTEGER NOT NULL)'
+        )
+        self.conn.execute('DELETE FROM seen')
+
+        def rows():
+            for position, record in store.records_since(kind, 0):
+                if position < end_cursor:
+                    label, text = _record_fields(kind, record)
+                    yield _doc_key(kind, label, text), label, text
+
+        self.conn.executemany(
+            'INSERT INTO seen (key, label, text, refs) VALUES (?, ?, ?, 1) '
+            'ON CONFLICT(key) DO UPDATE SET refs = refs + 1, label = excluded.label',
+            rows()
+        )
+        gone = self.conn.execute(
+            'SELECT doc_id FROM docs WHERE kind = ? AND key NOT IN (SELECT key FROM seen)', (kind,)
+        ).fetchall()
+        for (doc_id,) in gone:
+            self._drop_doc(doc_id)
+        self.conn.execute(
+            'UPDATE docs SET (refs, label) = (SELECT refs, label FROM seen WHERE seen.key = docs.key) '
+            'WHERE kind = ? AND key IN (SELECT key FROM seen)', (kind,)
+        )
+        added = self.conn.execute('SELECT key, label, text, refs FROM seen WHERE key NOT IN (SELECT key FROM docs)').fetchall()
+        for key, label, text, refs in added:
+            self._add_doc(kind, key, label, text, refs)
+        self.conn.execute('DELETE FROM seen')
+        return len(added)
+
+    def _clear_kind(self, kind):
+        with self.conn:
+            self.conn.execute('DELETE FROM postings WHERE doc_id IN (SELECT doc_id FROM docs WHERE kind = ?)', (kind,))
+            self.conn.execute('DELETE FROM docs WHERE kind = ?', (kind,))
+            self.conn.execute('DELETE FROM terms')
+            self.conn.execute('INSERT INTO terms (term, df) SELECT term, COUNT(*) FROM postings GROUP BY term')
+            self.conn.execute('DELETE FROM checkpoints WHERE kind = ?', (kind,))
+
+    def _add(self, kind, record):
+        label, text = _record_fields(kind, record)
+        key = _doc_key(kind, label, text)
+        row = self.conn.execute('SELECT doc_id FROM docs WHERE key = ?', (key,)).fetchone()
+        if row:
+            self.conn.execute('UPDATE docs SET refs = refs + 1, label = ? WHERE doc_id = ?', (label, row[0]))
+            return
+        self._add_doc(kind, key, label, text, 1)
+
+    def _add_doc(self, kind, key, label, text, refs):
+        tokens = tokenize(text)
+        cursor = self.conn.execute(
+            'INSERT INTO docs (kind, key, label, text, length, refs) VALUES (?, ?, ?, ?, ?, ?)',
+            (kind, key, label, text, len(tokens), refs)
+        )
+        doc_id = cursor.lastrowid
+        positions = {}
+        for pos, term in enumerate(tokens):
+            positions.setdefault(term, []).append(pos)
+        self.conn.executemany(
+            'INSERT INTO postings (term, doc_id, tf, positions) VALUES (?, ?, ?, ?)',
+            [(term, doc_id, len(pos_list), ' '.join(map(str, pos_list))) for term, pos_list in positions.items()]
+        )
+        self.conn.executemany(
+            'INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1',
+            [(term,) for term in positions]
+        )
+
+    def _remove(self, kind, record):
+        label, text = _record_fields(kind, record)
+        row = self.conn.execute('SELECT doc_id, refs FROM docs WHERE key = ?', (_doc_key(kind, label, text),)).fetchone()
+        if not row:
+            return
+        doc_id, refs = row
+        if refs > 1:
+            self.conn.execute('UPDATE docs SET refs = refs - 1 WHERE doc_id = ?', (doc_id,))
+        else:
+            self._drop_doc(doc_id)
+
+    def _drop_doc(self, doc_id):
+        terms = [row[0] for row in self.conn.execute('SELECT term FROM postings WHERE doc_id = ?', (doc_id,))]
+        self.conn.executemany('UPDATE terms SET df = df - 1 WHERE term = ?', [(term,) for term in terms])
+        self.conn.executemany('DELETE FROM terms WHERE term = ? AND df <= 0', [(term,) for term in terms])
+        self.conn.execute('DELETE FROM postings WHERE doc_id = ?', (doc_id,))
+        self.conn.execute('DELETE FROM docs WHERE doc_id = ?', (doc_id,))
+
+    # Queries
+    def search(self, query, limit=20, kind=None):
+        """Return up to ``limit`` hits ranked by BM25.
+
+        Every term must match; quoted phrases must also appear contiguously.
+        """
+        terms, phrases = parse_query(query)
+        if not terms:
+            return []
+        doc_count, avg_length = self.conn.execute('SELECT COUNT(*), AVG(length) FROM docs').fetchone()
+        if not doc_count:
+            return []
+        avg_length = avg_length or 1
+
+        # Start from the rarest term so the candidate set is as small as possible
+        dfs = {}
+        for term in terms:
+            row = self.conn.execute('SELECT df FROM terms WHERE term = ?', (term,)).fetchone()
+            if not row:
+                return []
+            dfs[term] = row[0]
+        ordered = sorted(terms, key=dfs.get)
+
+        candidates = None
+        postings = {}
+        for term in ordered:
+            if candidates is None:
+                rows = self.conn.execute('SELECT doc_id, tf, positions FROM postings WHERE term = ?', (term,)).fetchall()
+            else:
+                rows = []
+                doc_ids = list(candidates)
+                for start in range(0, len(doc_ids), 500):
+                    batch = doc_ids[start:start + 500]
+                    placeholders = ','.join('?' * len(batch))
+                    rows.extend(self.conn.execute(
+                        f'SELECT doc_id, tf, positions FROM postings WHERE term = ? AND doc_id IN ({placeholders})',
+                        [term] + batch
+                    ))
+            postings[term] = {doc_id: (tf, positions) for doc_id, tf, positions in rows}
+            candidates = set(postings[term])
+            if not candidates:
+                return []
+
+        lengths = {}
+        doc_ids = list(candidates)
+        for start in range(0, len(doc_ids), 500):
+            batch = doc_ids[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            lengths.update(self.conn.execute(
+                f'SELECT doc_id, length FROM docs WHERE doc_id IN ({placeholders})', batch
+            ))
+
+        scored = []
+        for doc_id in candidates:
+            if phrases and not all(self._has_phrase(postings, doc_id, phrase) for phrase in phrases):
+                continue
+            score = 0.0
+            length = lengths[doc_id]
+            for term in terms:
+                tf = postings[term][doc_id][0]
+                idf = math.log(1 + (doc_count - dfs[term] + 0.5) / (dfs[term] + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+            scored.append((score, doc_id))
+
+        hits = []
+        for score, doc_id in heapq.nlargest(limit * 4 if kind else limit, scored):
+            doc_kind, label, text = self.conn.execute(
+                'SELECT kind, label, text FROM docs WHERE doc_id = ?', (doc_id,)
+            ).fetchone()
+            if kind and doc_kind != kind:
+                continue
+            hits.append(SearchHit(score, doc_kind, label, text))
+            if len(hits) == limit:
+                break
+        return hits
+
+    @staticmethod
+    def _has_phrase(postings, doc_id, phrase):
+        starts = {int(p) for p in postings[phrase[0]][doc_id][1].split()}
+        for offset, term in enumerate(phrase[1:], 1):
+            positions = {int(p) - offset for p in postings[term][doc_id][1].split()}
+            starts &= positions
+            if not starts:
+                return False
+        return True
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal_store import FlatFileStore, SQLiteStore  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run every test in its own directory, since the CLI uses relative paths"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def open_backend(backend, workdir):
+    if backend == 'flat':
+        # Compaction only runs when a test asks for it
+        return FlatFileStore(str(workdir / 'journal.txt'), str(workdir / 'tasks.txt'), compact_threshold=float('inf'))
+    return SQLiteStore(str(workdir / 'journal.db'))
+
+
+@pytest.fixture(params=['flat', 'sqlite'])
+def store(request, workdir):
+    store = open_backend(request.param, workdir)
+    yield store
+    store.close()
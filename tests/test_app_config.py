@@ -0,0 +1,16 @@
+import json
+
+from app_config import ConfigFile
+
+
+def test_nested_settings_are_not_shared_between_callers(workdir):
+    path = workdir / 'config.json'
+    path.write_text(json.dumps({'context_budgets': {'journal-analysis': 1200}}), encoding='utf-8')
+    config_file = ConfigFile(str(path))
+    config_file.load()['context_budgets']['journal-analysis'] = 1
+    assert config_file.load()['context_budgets'] == {'journal-analysis': 1200}
+
+    saved = {'context_budgets': {'mood-scores': 4000}}
+    config_file.save(saved)
+    saved['context_budgets']['mood-scores'] = 1
+    assert config_file.load()['context_budgets'] == {'mood-scores': 4000}
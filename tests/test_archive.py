@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import archive
+from journal_store import PRIORITIES, STATUSES
+
+from conftest import open_backend
+
+
+def write_jsonl(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+
+
+def test_round_trip_through_every_format(store, workdir):
+    store.add_entries('2026-01-01 09:00', ['plain', 'with | pipe, "quotes"'])
+    store.add_entries('2026-01-02 09:00', ['two'])
+    store.add_tasks('high', ['ship it'])
+    for name in ('out.jsonl', 'out.csv.gz'):
+        path = str(workdir / name)
+        assert archive.write_rows(archive.export_rows(store, 'journal'), path, 'journal') == 3
+        assert archive.write_rows(archive.export_rows(store, 'tasks'), path + '.tasks.jsonl', 'tasks') == 1
+
+        target_dir = workdir / name.replace('.', '_')
+        target_dir.mkdir()
+        target = open_backend(store.name, target_dir)
+        assert archive.import_rows(target, 'journal', path, PRIORITIES, STATUSES, since='2026-01-02') == (1, 0)
+        assert archive.import_rows(target, 'tasks', path + '.tasks.jsonl', PRIORITIES, STATUSES) == (1, 0)
+        assert [(entry.date, entry.text) for entry in target.iter_entries()] == [('2026-01-02 09:00', 'two')]
+        assert [(task.priority, task.description) for task in target.iter_tasks()] == [('high', 'ship it')]
+        target.close()
+
+
+def test_an_imported_archive_is_not_imported_twice(store, workdir):
+    path = str(workdir / 'out.jsonl')
+    store.add_entries('2026-01-01 09:00', ['a', 'b'])
+    archive.write_rows(archive.export_rows(store, 'journal'), path, 'journal')
+    archive.save_progress(path, 2)
+    assert archive.import_rows(store, 'journal', path, PRIORITIES, STATUSES) == (0, 2)
+
+
+def test_import_rejects_malformed_dates(store, workdir):
+    path = str(workdir / 'bad.jsonl')
+    write_jsonl(path, [{'date': '2026-01-01 09:00', 'text': 'ok'}, {'date': 'bad|date\nX', 'text': 'y'}])
+    with pytest.raises(ValueError):
+        archive.import_rows(store, 'journal', path, PRIORITIES, STATUSES)
+    assert list(store.iter_entries()) == []
+
+
+def test_export_a_date_range(store, workdir):
+    store.add_entries('2026-01-03 09:00', ['c'])
+    store.add_entries('2026-01-01 09:00', ['a'])
+    store.add_entries('2026-01-02 09:00', ['b'])
+    rows = archive.export_rows(store, 'journal', since='2026-01-02', until='2026-01-03')
+    assert [row['text'] for row in rows] == ['b', 'c']
@@ -0,0 +1,105 @@
+import io
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('rich')
+
+import journal_cli  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def finish_compactions():
+    """Let background compactions finish before the next test changes directory"""
+    yield
+    for thread in threading.enumerate():
+        if thread.name.startswith('compact-'):
+            thread.join()
+
+
+def json_lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_add_and_show_as_json(workdir, capsys, monkeypatch):
+    assert journal_cli.run_batch(['add', 'one,  with comma', 'two', '--json']) == 0
+    assert json_lines(capsys)[0]['added'] == 2
+    monkeypatch.setattr('sys.stdin', io.StringIO('three\n\nfour\n'))
+    assert journal_cli.run_batch(['add', '--stdin', '--json']) == 0
+    assert json_lines(capsys)[0]['added'] == 2
+    assert journal_cli.run_batch(['show', '--all', '--json']) == 0
+    assert [row['text'] for row in json_lines(capsys)] == ['one, with comma', 'two', 'three', 'four']
+
+
+def test_stdin_add_updates_the_search_index(workdir, capsys, monkeypatch):
+    from search_index import SearchIndex
+    journal_cli.run_batch(['add', 'seed entry'])
+    monkeypatch.setattr('sys.stdin', io.StringIO('piped zebra\n'))
+    assert journal_cli.run_batch(['add', '--stdin']) == 0
+    index = SearchIndex(journal_cli.SEARCH_INDEX_FILE)
+    assert [hit.text for hit in index.search('zebra')] == ['piped zebra']
+    index.close()
+
+
+def test_a_single_argument_command_runs_in_batch_mode(workdir, capsys, monkeypatch):
+    monkeypatch.setattr('sys.argv', ['journal_cli.py', journal_cli.ACTIVATION_CODE, 'add', 'word'])
+    with pytest.raises(SystemExit) as exit_info:
+        journal_cli.main()
+    assert exit_info.value.code == 0
+    assert (workdir / 'journal.txt').read_text(encoding='utf-8').endswith('|word\n')
+
+def test_add_rejects_a_malformed_date(workdir):
+    for value in ('bad|date\nX', '2026-1-2 9:05', '2026-01-02'):
+        with pytest.raises(SystemExit) as exit_info:
+            journal_cli.run_batch(['add', '--date', value, 'y'])
+        assert exit_info.value.code == 2
+    assert not (workdir / 'journal.txt').exists()
+
+
+def test_add_backfills_with_a_valid_date(workdir, capsys):
+    assert journal_cli.run_batch(['add', '--date', '2026-01-02 09:05', 'hello', '--json']) == 0
+    assert json_lines(capsys) == [{'added': 1, 'date': '2026-01-02 09:05'}]
+    assert (workdir / 'journal.txt').read_text(encoding='utf-8') == '2026-01-02 09:05|hello\n'
+
+
+@pytest.mark.parametrize('backend', ['flat', 'sqlite'])
+def test_task_done_reports_missing_ids(workdir, capsys, backend):
+    (workdir / 'config.json').write_text(json.dumps({'storage_backend': backend}), encoding='utf-8')
+    journal_cli.run_batch(['task', 'add', 'write tests'])
+    capsys.readouterr()
+    assert journal_cli.run_batch(['task', 'done', '1', '999', '--json']) == 1
+    assert json_lines(capsys) == [{'done': 1, 'missing': 1}]
+
+
+def test_done_from_the_menu_counts_only_tasks_that_still_exist(workdir, capsys, monkeypatch):
+    pytest.importorskip('numpy')
+    journal_cli.run_batch(['task', 'add', 'x', 'y'])
+
+    class DeleteThenPick:
+        @staticmethod
+        def ask(*args, **kwargs):
+            # Another session deletes y while the menu waits for input
+            from journal_stats import open_stats
+            store = journal_cli.get_store()
+            y = [task for task in store.iter_tasks() if task.description == 'y']
+            with open_stats(journal_cli.STATS_FILE, store) as stats:
+                store.delete_tasks([task.id for task in y])
+                stats.remove_tasks(y)
+            return '1,2'
+
+    monkeypatch.setattr(journal_cli, 'Prompt', DeleteThenPick)
+    journal_cli.mark_task_done()
+    capsys.readouterr()
+    assert journal_cli.run_batch(['stats', '--json']) == 0
+    assert json_lines(capsys)[0]['tasks']['all'] == {'open': 0, 'done': 1, 'completion_rate': 1.0}
+
+
+def test_stream_span_records_time_to_first_token(workdir):
+    from metrics import METRICS
+    (workdir / 'config.json').write_text(json.dumps({'api_provider': 'local'}), encoding='utf-8')
+    assert ''.join(journal_cli.stream_ai_content('how was my week', feature='journal-analysis'))
+    METRICS.flush()
+    stream = [record for record in METRICS.load() if record['op'] == 'ai.stream']
+    assert [record['feature'] for record in stream] == ['journal-analysis']
+    assert 0 <= stream[0]['ttft_ms'] <= stream[0]['ms']
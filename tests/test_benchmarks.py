@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from datagen import generate  # noqa: E402
+from suite import compare, parse_size  # noqa: E402
+
+from conftest import open_backend  # noqa: E402
+
+
+def test_generated_files_load_and_are_deterministic(workdir):
+    journal, task_file = generate(str(workdir), 20, 5)
+    store = open_backend('flat', workdir)
+    entries = list(store.iter_entries())
+    assert len(entries) == 20
+    assert [entry.date for entry in entries] == sorted(entry.date for entry in entries)
+    assert [task.id for task in store.iter_tasks()] == [1, 2, 3, 4, 5]
+    with open(journal, 'rb') as f:
+        first = f.read()
+    generate(str(workdir), 20, 5)
+    with open(journal, 'rb') as f:
+        assert f.read() == first
+
+
+def test_parse_size():
+    assert [parse_size(text) for text in ('1k', '1.5K', '10M', '250')] == [1000, 1500, 10000000, 250]
+
+
+def test_compare_flags_only_real_regressions(workdir):
+    baseline = workdir / 'old.json'
+    baseline.write_text(json.dumps({'results': [
+        {'name': 'show', 'size': 1000, 'median_s': 0.010},
+        {'name': 'tiny', 'size': 1000, 'median_s': 0.0001},
+    ]}), encoding='utf-8')
+    results = [
+        {'name': 'show', 'size': 1000, 'median_s': 0.020},
+        {'name': 'tiny', 'size': 1000, 'median_s': 0.0005},
+        {'name': 'new', 'size': 1000, 'median_s': 1.0},
+    ]
+    assert [r['name'] for r in compare(results, str(baseline), 1.25)] == ['show']
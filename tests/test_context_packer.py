@@ -0,0 +1,15 @@
+from context_packer import pack_entries, recent_entries
+
+CONFIG = {'context_budgets': {'journal-analysis': 40, 'journal-mood': 20}}
+
+
+def test_one_read_packs_like_separate_reads(store):
+    for day in range(1, 10):
+        store.add_entries(f'2026-01-0{day} 09:00', [f'entry for day {day}'])
+    for since, until in ((None, None), ('2026-01-03', '2026-01-07')):
+        newest = recent_entries(store, 40, since, until)
+        for feature in ('journal-analysis', 'journal-mood'):
+            assert pack_entries(store, CONFIG, feature, newest=newest) == pack_entries(store, CONFIG, feature, since=since, until=until)
+    ranked = [entry for entry in store.iter_entries() if entry.text == 'entry for day 1']
+    packed = pack_entries(store, CONFIG, 'journal-mood', ranked, newest=recent_entries(store, 40))
+    assert [entry.text for entry in packed.records] == ['entry for day 1', 'entry for day 9']
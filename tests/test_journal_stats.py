@@ -0,0 +1,48 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from journal_stats import open_stats, summarize  # noqa: E402
+
+
+def test_delete_then_re_add_keeps_counts_in_step(store, workdir):
+    base = str(workdir / 'stats')
+    store.add_entries('2026-01-01 09:00', ['a', 'b', 'c'])
+    store.add_tasks('low', ['x', 'y'])
+    with open_stats(base, store):
+        pass
+
+    with open_stats(base, store) as stats:
+        c = [entry for entry in store.iter_entries() if entry.text == 'c']
+        stats.remove_entries(store.delete_entries(c))
+        x = next(store.iter_tasks())
+        store.delete_tasks([x.id])
+        stats.remove_tasks([x])
+    store.add_entries('2026-01-02 09:00', ['d'])
+    store.add_tasks('high', ['z'])
+
+    with open_stats(base, store) as stats:
+        result = summarize(stats, date(2026, 1, 2))
+    assert result['entries'] == 3
+    assert result['recent_days'][-2:] == [{'date': '2026-01-01', 'entries': 2}, {'date': '2026-01-02', 'entries': 1}]
+    assert result['tasks']['all']['open'] == 2
+
+
+def test_task_updates_move_counts_between_priorities(store, workdir):
+    base = str(workdir / 'stats')
+    with open_stats(base, store):
+        pass
+    store.add_tasks('low', ['x', 'y'])
+    with open_stats(base, store) as stats:
+        x = next(store.iter_tasks())
+        updates = {x.id: {'status': 'done', 'priority': 'high'}}
+        store.update_tasks(updates)
+        stats.update_tasks([x], updates, now=stats.created_at(x.id) + 60)
+
+    with open_stats(base, store) as stats:
+        result = summarize(stats, date(2026, 1, 2))
+    assert result['tasks']['low'] == {'open': 1, 'done': 0, 'completion_rate': 0.0}
+    assert result['tasks']['high'] == {'open': 0, 'done': 1, 'completion_rate': 1.0}
+    assert result['time_to_done']['high']['median_s'] == 60
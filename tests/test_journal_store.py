@@ -0,0 +1,198 @@
+import os
+import threading
+
+from journal_store import COMPACT_MIN_GARBAGE, FlatFileStore, SQLiteStore, is_timestamp, migrate_flat_to_sqlite, single_line
+
+from conftest import open_backend
+
+
+def texts(entries):
+    return [entry.text for entry in entries]
+
+
+def test_add_delete_and_re_add_entries(store):
+    store.add_entries('2026-01-01 09:00', ['a', 'b', 'c'])
+    c = [entry for entry in store.iter_entries() if entry.text == 'c']
+    assert store.delete_entries(c) == c
+    assert store.delete_entries(c) == []
+    store.add_entries('2026-01-02 09:00', ['d'])
+    assert texts(store.iter_entries()) == ['a', 'b', 'd']
+
+
+def test_task_edits(store):
+    store.add_tasks('low', ['a', 'b'])
+    a, b = store.iter_tasks()
+    store.update_tasks({b.id: {'status': 'done', 'priority': 'high'}})
+    assert [(task.priority, task.status) for task in store.iter_tasks()] == [('low', 'not done'), ('high', 'done')]
+    store.delete_tasks([a.id])
+    assert [task.description for task in store.iter_tasks(status='done')] == ['b']
+
+
+def test_sqlite_never_reuses_deleted_ids(workdir):
+    store = SQLiteStore(str(workdir / 'journal.db'))
+    store.add_entries('2026-01-01 09:00', ['a', 'b'])
+    store.add_tasks('low', ['a', 'b'])
+    entry, task = list(store.iter_entries())[-1], list(store.iter_tasks())[-1]
+    store.delete_entries([entry])
+    store.delete_tasks([task.id])
+    store.add_entries('2026-01-02 09:00', ['c'])
+    store.add_tasks('low', ['c'])
+    assert list(store.iter_entries())[-1].id > entry.id
+    assert list(store.iter_tasks())[-1].id > task.id
+    store.close()
+
+
+def test_migration_copies_entries_and_keeps_task_ids(workdir):
+    flat = FlatFileStore(str(workdir / 'journal.txt'), str(workdir / 'tasks.txt'))
+    flat.add_entries('2026-01-01 09:00', ['a', 'b'])
+    flat.add_tasks('low', ['x', 'y', 'z'])
+    flat.delete_tasks([1])
+    assert migrate_flat_to_sqlite(flat.journal_file, flat.task_file, str(workdir / 'journal.db')) == (2, 2)
+    store = SQLiteStore(str(workdir / 'journal.db'))
+    assert texts(store.iter_entries()) == ['a', 'b']
+    assert [(task.id, task.description) for task in store.iter_tasks()] == [(2, 'y'), (3, 'z')]
+    store.add_tasks('low', ['new'])
+    assert store.get_task(4).description == 'new'
+    store.close()
+
+
+def test_flat_compaction_folds_the_mutation_log(workdir):
+    store = open_backend('flat', workdir)
+    store.add_entries('2026-01-01 09:00', ['a', 'b', 'c'])
+    store.add_tasks('low', ['x', 'y'])
+    b = [entry for entry in store.iter_entries() if entry.text == 'b']
+    x, y = store.iter_tasks()
+    assert store.delete_entries(b) == b
+    assert store.delete_entries(b) == []
+    store.update_tasks({y.id: {'status': 'done'}})
+    store.delete_tasks([x.id])
+    assert os.path.exists(store.journal_log.path)
+    assert texts(store.iter_entries()) == ['a', 'c']
+
+    store.compact()
+    assert not os.path.exists(store.journal_log.path)
+    with open(store.journal_file, encoding='utf-8') as f:
+        assert f.read() == '2026-01-01 09:00|a\n2026-01-01 09:00|c\n'
+    assert [(task.description, task.status) for task in store.iter_tasks()] == [('y', 'done')]
+
+
+def test_flat_background_compaction_waits_for_enough_garbage(workdir):
+    journal, tasks = str(workdir / 'journal.txt'), str(workdir / 'tasks.txt')
+    for min_garbage, compacted in ((COMPACT_MIN_GARBAGE, False), (0, True)):
+        store = FlatFileStore(journal, tasks, compact_min_garbage=min_garbage)
+        store.add_entries('2026-01-01 09:00', ['a', 'b'])
+        store.delete_entries(store.iter_entries())
+        for thread in threading.enumerate():
+            if thread.name.startswith('compact-'):
+                thread.join()
+        assert os.path.exists(store.journal_log.path) != compacted
+
+
+def test_flat_delete_of_a_moved_entry_is_rejected(workdir):
+    store = open_backend('flat', workdir)
+    store.add_entries('2026-01-01 09:00', ['a', 'b'])
+    a, b = store.iter_entries()
+    store.delete_entries([a])
+    store.compact('entry')
+    # b now sits at a's old offset; the stale b still points past it
+    assert store.delete_entries([a]) == []
+    assert store.delete_entries([b]) == []
+    assert texts(store.iter_entries()) == ['b']
+
+
+def test_flat_compaction_drops_deleted_lines_that_are_not_utf8(workdir):
+    store = open_backend('flat', workdir)
+    store.add_entries('2026-01-01 09:00', ['a'])
+    with open(store.journal_file, 'ab') as f:
+        f.write(b'2026-01-01 09:00|bad \xff\n')
+    bad = [entry for entry in store.iter_entries() if entry.text != 'a']
+    assert store.delete_entries(bad) == bad
+    store.compact('entry')
+    assert texts(store.iter_entries()) == ['a']
+
+
+def test_task_ids_are_stable_and_never_reused(store):
+    store.add_tasks('low', ['a', 'b', 'c'])
+    ids = [task.id for task in store.iter_tasks()]
+    store.delete_tasks([ids[2]])
+    store.add_tasks('high', ['d'])
+    tasks = list(store.iter_tasks())
+    assert [task.id for task in tasks[:2]] == ids[:2]
+    assert tasks[2].description == 'd' and tasks[2].id > ids[2]
+    assert store.get_task(ids[2]) is None
+
+
+def test_flat_task_ids_survive_compaction(workdir):
+    store = open_backend('flat', workdir)
+    with open(store.task_file, 'w', encoding='utf-8') as f:
+        f.write('low|legacy one|not done\nhigh|legacy two|not done\n')
+    one, two = store.iter_tasks()
+    store.delete_tasks([one.id])
+    store.compact('task')
+    store.add_tasks('low', ['new'])
+    assert [(task.id, task.description) for task in store.iter_tasks()] == [(two.id, 'legacy two'), (two.id + 1, 'new')]
+
+
+def test_date_ranges_match_a_full_scan(store):
+    # Enough text for the flat date index to span several blocks
+    for day in range(1, 29):
+        store.add_entries(f'2026-02-{day:02d} 09:00', [f'entry {day} {i} ' + 'x' * 60 for i in range(50)])
+    entries = list(store.iter_entries())
+    middle = [entry for entry in entries if '2026-02-10' <= entry.date[:10] <= '2026-02-12']
+    assert len(middle) == 150
+    assert list(store.entries_between('2026-02-10', '2026-02-12')) == middle
+    assert list(store.entries_between(since='2026-02-28')) == entries[-50:]
+    assert list(store.entries_between(until='2026-01')) == []
+
+
+def test_jump_to_date(store):
+    store.add_entries('2026-01-01 09:00', ['new year'])
+    store.add_entries('2026-03-01 09:00', ['march'])
+    assert texts(store.entries_from(store.entry_position_for_date('2026-02'), 5)) == ['march']
+
+
+def test_task_edits_count_only_existing_ids(store):
+    store.add_tasks('low', ['a'])
+    task_id = next(store.iter_tasks()).id
+    assert store.update_tasks({999: {'status': 'done'}}) == 0
+    assert store.update_tasks({task_id: {'status': 'done', 'priority': 'high'}}) == 1
+    assert store.get_task(task_id).status == 'done'
+    assert store.get_task(task_id).priority == 'high'
+    assert store.delete_tasks([task_id, task_id, 999]) == 1
+
+
+def test_is_timestamp():
+    assert is_timestamp('2026-01-02 09:05')
+    for value in ('2026-1-2 9:05', '2026-01-02', 'bad|date\nX', '2026-01-02 09:05\n', None):
+        assert not is_timestamp(value)
+
+
+def test_backfilled_date_ranges_are_oldest_first(store):
+    store.add_entries('2026-01-03 09:00', ['c'])
+    store.add_entries('2026-01-01 09:00', ['a'])
+    store.add_entries('2026-01-02 09:00', ['b'])
+    assert texts(store.entries_between('2026-01-01', '2026-01-03')) == ['a', 'b', 'c']
+
+
+def test_jump_to_date_does_not_skip_backfills(workdir):
+    store = open_backend('flat', workdir)
+    store.add_entries('2026-03-01 09:00', ['march'])
+    store.add_entries('2026-01-15 09:00', ['backfill'])
+    position = store.entry_position_for_date('2026-01-10')
+    assert texts(store.entries_from(position, 2)) == ['march', 'backfill']
+    assert store.entries_from(store.entry_position_for_date('2027'), 1) == []
+
+
+def test_records_since_follows_ids_after_a_backfill(store):
+    store.add_entries('2026-01-03 09:00', ['c'])
+    cursor, _ = store.checkpoint('entry')
+    store.add_entries('2026-01-01 09:00', ['a'])
+    store.add_entries('2026-01-02 09:00', ['b'])
+    assert texts(record for _, record in store.records_since('entry', cursor)) == ['a', 'b']
+
+
+def test_line_breaks_are_flattened_on_every_backend(store):
+    store.add_entries('2026-01-01 09:00', ['one\ntwo'])
+    store.add_tasks('low', ['first\r\nsecond'])
+    assert texts(store.iter_entries()) == [single_line('one\ntwo')]
+    assert [task.description for task in store.iter_tasks()] == [single_line('first\r\nsecond')]
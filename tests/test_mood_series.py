@@ -0,0 +1,56 @@
+import os
+
+from mood_series import journal_day_digests, mark_days_stale
+
+from conftest import open_backend
+
+
+def fresh_digests(store, path):
+    if os.path.exists(path):
+        os.remove(path)
+    return journal_day_digests(store, path)
+
+
+def test_only_days_with_new_entries_are_read_again(store, workdir, monkeypatch):
+    path = str(workdir / 'mood_digests.json')
+    store.add_entries('2026-01-01 09:00', ['one'])
+    store.add_entries('2026-01-05 09:00', ['five'])
+    first = journal_day_digests(store, path)
+    assert list(first) == ['2026-01-01', '2026-01-05']
+
+    store.add_entries('2026-01-01 21:00', ['one again'])
+    store.add_entries('2026-01-07 09:00', ['seven'])
+    reads = []
+    entries_between = store.entries_between
+    monkeypatch.setattr(store, 'entries_between', lambda *args: reads.append(args) or entries_between(*args))
+    digests = journal_day_digests(store, path)
+    assert reads == [('2026-01-01', '2026-01-07')]
+    assert digests['2026-01-05'] == first['2026-01-05']
+    assert digests['2026-01-01'] != first['2026-01-01']
+    monkeypatch.undo()
+    assert digests == fresh_digests(store, path)
+    assert list(journal_day_digests(store, path, since='2026-01-02', until='2026-01-05')) == ['2026-01-05']
+
+
+def test_stale_days_pick_up_deletes(store, workdir):
+    path = str(workdir / 'mood_digests.json')
+    store.add_entries('2026-01-01 09:00', ['one'])
+    store.add_entries('2026-01-02 09:00', ['two', 'two again'])
+    journal_day_digests(store, path)
+    removed = store.delete_entries([entry for entry in store.iter_entries() if entry.text == 'one'])
+    removed += store.delete_entries([entry for entry in store.iter_entries() if entry.text == 'two again'])
+    mark_days_stale(path, {entry.date[:10] for entry in removed})
+    digests = journal_day_digests(store, path)
+    assert list(digests) == ['2026-01-02']
+    assert digests == fresh_digests(store, path)
+
+
+def test_a_rewritten_journal_is_digested_again(workdir):
+    store = open_backend('flat', workdir)
+    path = str(workdir / 'mood_digests.json')
+    store.add_entries('2026-01-01 09:00', ['one', 'two'])
+    journal_day_digests(store, path)
+    with open(store.journal_file, 'w', encoding='utf-8') as f:
+        f.write('2026-01-01 09:00|one\n2026-01-03 09:00|three\n')
+    assert journal_day_digests(store, path) == fresh_digests(store, path)
+    assert list(fresh_digests(store, path)) == ['2026-01-01', '2026-01-03']
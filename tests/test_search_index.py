@@ -0,0 +1,86 @@
+from search_index import SearchIndex
+
+from conftest import open_backend
+
+
+def found(index, query):
+    return sorted(hit.text for hit in index.search(query))
+
+
+def test_sync_remove_and_re_add(store, workdir):
+    index = SearchIndex(str(workdir / 'search_index.db'))
+    store.add_entries('2026-01-01 09:00', ['alpha one', 'alpha two', 'alpha three'])
+    store.add_tasks('low', ['alpha task'])
+    assert index.sync(store) == 4
+    assert index.sync(store) == 0
+
+    three = [entry for entry in store.iter_entries() if entry.text == 'alpha three']
+    removed = store.delete_entries(three)
+    index.remove('entry', removed)
+    assert found(index, 'three') == []
+
+    store.add_entries('2026-01-02 09:00', ['alpha four'])
+    assert index.sync(store) == 1
+    assert found(index, 'alpha') == ['alpha four', 'alpha one', 'alpha task', 'alpha two']
+    index.close()
+
+
+def test_rewritten_store_is_re_indexed(workdir):
+    store = open_backend('flat', workdir)
+    index = SearchIndex(str(workdir / 'search_index.db'))
+    store.add_entries('2026-01-01 09:00', ['keep me', 'drop me'])
+    index.sync(store)
+    with open(store.journal_file, 'w', encoding='utf-8') as f:
+        f.write('2026-01-01 09:00|keep me\n2026-01-01 09:00|new me\n')
+    assert index.sync(store) == 1
+    assert found(index, 'me') == ['keep me', 'new me']
+    index.close()
+
+
+def test_compaction_only_touches_changed_documents(workdir):
+    store = open_backend('flat', workdir)
+    index = SearchIndex(str(workdir / 'search_index.db'))
+    store.add_entries('2026-01-01 09:00', ['keep me', 'keep me', 'drop me'])
+    store.add_tasks('low', ['plan trip'])
+    index.sync(store)
+    doc_ids = dict(index.conn.execute('SELECT text, doc_id FROM docs'))
+
+    removed = store.delete_entries([entry for entry in store.iter_entries() if entry.text == 'drop me'][:1])
+    index.remove('entry', removed)
+    keep = [entry for entry in store.iter_entries() if entry.text == 'keep me'][:1]
+    store.delete_entries(keep)
+    task = next(store.iter_tasks())
+    store.update_tasks({task.id: {'priority': 'high'}})
+    store.compact()
+    store.add_entries('2026-01-02 09:00', ['after compaction'])
+
+    assert index.sync(store) == 1
+    assert dict(index.conn.execute('SELECT text, refs FROM docs')) == {'keep me': 1, 'plan trip': 1, 'after compaction': 1}
+    assert dict(index.conn.execute('SELECT text, doc_id FROM docs WHERE text != ?', ('after compaction',))) == {
+        'keep me': doc_ids['keep me'], 'plan trip': doc_ids['plan trip']}
+    assert [hit.label for hit in index.search('trip')] == ['high']
+    assert index.sync(store) == 0
+    index.close()
+
+
+def test_remove_keeps_records_appended_by_another_process(store, workdir):
+    index = SearchIndex(str(workdir / 'search_index.db'))
+    store.add_entries('2026-01-01 09:00', ['alpha one', 'alpha two'])
+    index.sync(store)
+    listed = [entry for entry in store.iter_entries() if entry.text == 'alpha two']
+    store.add_entries('2026-01-02 09:00', ['alpha elsewhere'])
+    index.remove('entry', store.delete_entries(listed))
+    index.sync(store)
+    assert found(index, 'alpha') == ['alpha elsewhere', 'alpha one']
+    index.close()
+
+
+def test_relabel_shows_the_new_priority(store, workdir):
+    index = SearchIndex(str(workdir / 'search_index.db'))
+    store.add_tasks('low', ['plan trip'])
+    index.sync(store)
+    task = next(store.iter_tasks())
+    store.update_tasks({task.id: {'priority': 'high'}})
+    index.relabel('task', [store.get_task(task.id)])
+    assert [hit.label for hit in index.search('trip')] == ['high']
+    index.close()
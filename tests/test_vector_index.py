@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from vector_index import VectorIndex  # noqa: E402
+
+
+def test_sync_skips_deleted_and_picks_up_re_added_entries(store, workdir):
+    index = VectorIndex(str(workdir / 'entry_vectors'))
+    store.add_entries('2026-01-01 09:00', ['garden tomatoes', 'garden roses', 'garden fence'])
+    assert index.sync(store) == 3
+    assert index.sync(store) == 0
+
+    fence = [entry for entry in store.iter_entries() if entry.text == 'garden fence']
+    store.delete_entries(fence)
+    store.add_entries('2026-01-02 09:00', ['violin practice'])
+    assert index.sync(store) == 1
+
+    ids = [entry_id for _, entry_id in index.search('violin practice', k=5)]
+    assert [entry.text for entry in store.get_entries(ids)] == ['violin practice']
+    ids = [entry_id for _, entry_id in index.search('fence', k=5)]
+    assert store.get_entries(ids) == []
+    index.close()
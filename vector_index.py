@@ -0,0 +1,211 @@
+"""On-disk vector index for finding the journal entries most relevant to a query.
+
+Entries are embedded locally with a signed hashing vectorizer (no model, no
+network): non-stopword tokens are hashed into ``DIM`` buckets with sublinear
+term frequency and the vectors are L2-normalised. Queries are weighted by
+inverse document frequency per bucket, so rare words count for more, and
+scored by cosine similarity.
+
+Vectors are quantised to int8 (256 bytes per entry) and appended to
+``<base>.i8`` with the matching entry IDs in ``<base>.ids`` (int64);
+``<base>.json`` holds the row count,
+the bucket document frequencies and a checkpoint of the store. Like the
+full-text index, ``sync`` only embeds entries added since the checkpoint and
+starts over when the journal was rewritten behind its back. Search memory-maps
+both files and scores them in blocks with one float32 matrix product each, so
+millions of entries never have to fit in memory. Deleted entries keep their
+rows until the next rebuild; callers drop them when fetching the entries.
+"""
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from local_engine import STOPWORDS
+
+DIM = 256
+SCALE = 127
+BLOCK = 1 << 16
+SYNC_BATCH = 10000
+TOKEN_RE = re.compile(r"[a-z][a-z']+")
+
+
+class HashingVectorizer:
+    """Maps texts to L2-normalised signed hashed term-frequency vectors"""
+
+    def __init__(self, dim=DIM):
+        self.dim = dim
+        self._buckets = {}
+
+    def _bucket(self, token):
+        cached = self._buckets.get(token)
+        if cached is None:
+            if token in STOPWORDS or len(token) < 3:
+                cached = (0, 0.0)
+            else:
+                h = zlib.crc32(token.encode('utf-8'))
+                cached = (h % self.dim, 1.0 if (h >> 16) & 1 else -1.0)
+            self._buckets[token] = cached
+        return cached
+
+    def transform(self, texts):
+        """Return a float32 array of shape (len(texts), dim)"""
+        cells, values = [], []
+        for row, text in enumerate(texts):
+            base = row * self.dim
+            for token, count in Counter(TOKEN_RE.findall(text.lower())).items():
+                bucket, sign = self._bucket(token)
+                if sign:
+                    cells.append(base + bucket)
+                    values.append(sign * (1.0 + math.log(count)) if count > 1 else sign)
+        matrix = np.bincount(np.array(cells, dtype=np.int64), weights=values,
+                             minlength=len(texts) * self.dim).astype(np.float32).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+def weighted(vector, df, n):
+    """IDF-weight a query vector and renormalise it, so scores stay cosines"""
+    vector = vector * (np.log((n + 1) / (df + 1)) + 1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def top_k(scores, ids, k):
+    """Return ``(scores, ids)`` of the k best, best first"""
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k)[:k]
+        scores, ids = scores[keep], ids[keep]
+    order = np.argsort(-scores, kind='stable')
+    return scores[order], ids[order]
+
+
+class VectorIndex:
+    def __init__(self, base_path):
+        self.vectors_path = base_path + '.i8'
+        self.ids_path = base_path + '.ids'
+        self.meta_path = base_path + '.json'
+        self.vectorizer = HashingVectorizer()
+        self.meta = self._load_meta()
+        self._trim()
+
+    def _empty_meta(self):
+        return {'dim': DIM, 'count': 0, 'df': [0] * DIM, 'cursor': 0, 'token': None}
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return self._empty_meta()
+        return meta if meta.get('dim') == DIM else self._empty_meta()
+
+    def _save_meta(self):
+        tmp = self.meta_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def _trim(self):
+        """Drop rows written after the last saved count, e.g. by an interrupted sync"""
+        count = self.meta['count']
+        for path, itemsize in ((self.vectors_path, DIM), (self.ids_path, 8)):
+            if os.path.exists(path) and os.path.getsize(path) != count * itemsize:
+                with open(path, 'r+b') as f:
+                    f.truncate(count * itemsize)
+
+    def _reset(self):
+        self.meta = self._empty_meta()
+        for path in (self.vectors_path, self.ids_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        pass
+
+    @property
+    def count(self):
+        return self.meta['count']
+
+    # Maintenance
+    def sync(self, store):
+        """Embed entries added to ``store`` since the last checkpoint; returns how many"""
+        cursor, token = self.meta['cursor'], self.meta['token']
+        if token is not None and not store.verify_checkpoint('entry', cursor, token):
+            self._reset()
+            cursor = 0
+        # Take the checkpoint first so entries appended while we read are picked up next time
+        end_cursor, end_token = store.checkpoint('entry')
+        if (end_cursor, end_token) == (cursor, token):
+            return 0
+        added = 0
+        batch = []
+        for position, entry in store.records_since('entry', cursor):
+            if position >= end_cursor:
+                break
+            batch.append(entry)
+            if len(batch) >= SYNC_BATCH:
+                added += self._append(batch)
+                batch = []
+        if batch:
+            added += self._append(batch)
+        self.meta['cursor'], self.meta['token'] = end_cursor, end_token
+        self._save_meta()
+        return added
+
+    def _append(self, entries):
+        vectors = self.vectorizer.transform([entry.text for entry in entries])
+        with open(self.vectors_path, 'ab') as f:
+            f.write(np.rint(vectors * SCALE).astype(np.int8).tobytes())
+        with open(self.ids_path, 'ab') as f:
+            f.write(np.array([entry.id for entry in entries], dtype=np.int64).tobytes())
+        df = np.array(self.meta['df'], dtype=np.int64) + (vectors != 0).sum(axis=0)
+        self.meta['df'] = df.tolist()
+        self.meta['count'] += len(entries)
+        return len(entries)
+
+    # Queries
+    def query_vector(self, query):
+        vector = self.vectorizer.transform([query])[0]
+        df = np.array(self.meta['df'], dtype=np.float32)
+        return weighted(vector, df, self.count)
+
+    def search(self, query, k=20):
+        """Return ``[(score, entry_id)]`` for the k entries most similar to query, best first.
+
+        Returns [] when the query has no indexable words.
+        """
+        q = self.query_vector(query)
+        if not self.count or not q.any():
+            return []
+        vectors = np.memmap(self.vectors_path, dtype=np.int8, mode='r', shape=(self.count, DIM))
+        ids = np.memmap(self.ids_path, dtype=np.int64, mode='r', shape=(self.count,))
+        buffer = np.empty((min(BLOCK, self.count), DIM), dtype=np.float32)
+        best_scores = np.empty(0, dtype=np.float32)
+        best_ids = np.empty(0, dtype=np.int64)
+        for start in range(0, self.count, BLOCK):
+            rows = vectors[start:start + BLOCK]
+            block = buffer[:len(rows)]
+            np.copyto(block, rows, casting='unsafe')
+            block_scores, block_ids = top_k(block @ q, np.asarray(ids[start:start + BLOCK]), k)
+            best_scores, best_ids = top_k(np.concatenate([best_scores, block_scores]),
+                                          np.concatenate([best_ids, block_ids]), k)
+        return [(float(score) / SCALE, int(entry_id)) for score, entry_id in zip(best_scores, best_ids) if score > 0]
+
+
+def rank_texts(texts, query):
+    """Return indices of texts ordered by similarity to query, with scores; for small in-memory sets"""
+    if not texts:
+        return []
+    vectorizer = HashingVectorizer()
+    matrix = vectorizer.transform(texts)
+    df = (matrix != 0).sum(axis=0)
+    q = weighted(vectorizer.transform([query])[0], df, len(texts))
+    scores = matrix @ q
+    order = np.argsort(-scores, kind='stable')
+    return [(float(scores[i]), int(i)) for i in order]